@@ -0,0 +1,65 @@
+"""
+Microbenchmark of the attribute access throughput on Sample objects.
+
+Measures the reads of the attributes whose values are paths with environment
+variables, which are expanded on every read, and compares the memoized path
+expansion with the uncached one.
+
+Usage: python benchmarks/sample_attribute_access.py [-n NUMBER] [-a ATTRIBUTES]
+"""
+
+import argparse
+import os
+import timeit
+
+from ubiquerg import expandpath
+
+from peppy import Sample
+from peppy.utils import expand_path
+
+
+def build_sample(n_attrs):
+    """
+    Create a sample with a mix of path and plain attribute values
+
+    :param int n_attrs: number of attributes
+    :return peppy.Sample: sample
+    """
+    data = {"sample_name": "sample"}
+    for i in range(n_attrs):
+        if i % 2:
+            data["path{}".format(i)] = "$PEPPY_BENCH_DIR/sample/file{}.fq.gz".format(i)
+        else:
+            data["attr{}".format(i)] = "value{}".format(i)
+    return Sample(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", "--number", type=int, default=2000, help="repeats")
+    parser.add_argument(
+        "-a", "--attributes", type=int, default=20, help="attributes per sample"
+    )
+    args = parser.parse_args()
+    os.environ.setdefault("PEPPY_BENCH_DIR", "/data/project")
+    s = build_sample(args.attributes)
+    keys = list(s.keys())
+    path = "$PEPPY_BENCH_DIR/sample/file.fq.gz"
+    cases = [
+        ("expandpath", lambda: expandpath(path), 1),
+        ("expand_path (memoized)", lambda: expand_path(path), 1),
+        ("getattr", lambda: [getattr(s, k) for k in keys], len(keys)),
+        ("getitem", lambda: [s[k] for k in keys], len(keys)),
+        ("items(expand=True)", lambda: s.items(expand=True), len(keys)),
+        ("items()", lambda: s.items(), len(keys)),
+        ("raw_items()", lambda: s.raw_items(), len(keys)),
+        ("to_dict()", lambda: s.to_dict(), len(keys)),
+    ]
+    print("{:<24}{:>16}".format("operation", "reads/s"))
+    for name, fun, reads in cases:
+        seconds = min(timeit.repeat(fun, number=args.number, repeat=3))
+        print("{:<24}{:>16,.0f}".format(name, reads * args.number / seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Export the processed samples to Apache Arrow.
+"""
+
+from collections import OrderedDict
+from logging import getLogger
+
+import pandas as pd
+
+from .const import PKG_NAME
+from .multi_value import is_multi_value
+
+_LOGGER = getLogger(PKG_NAME)
+
+
+def import_pyarrow():
+    """
+    Import the optional pyarrow dependency
+
+    :return module: pyarrow module
+    :raises ImportError: if pyarrow is not installed
+    """
+    try:
+        import pyarrow
+        import pyarrow.ipc
+    except ImportError:
+        raise ImportError(
+            "pyarrow is required for the Arrow export. Install it with: "
+            "pip install pyarrow"
+        )
+    return pyarrow
+
+
+def _is_missing(value):
+    """Check whether a scalar sample attribute value is missing"""
+    return (
+        not is_multi_value(value) and not isinstance(value, dict) and pd.isnull(value)
+    )
+
+
+def _stringified(value):
+    """Convert a sample attribute value to string, keeping lists as lists"""
+    if is_multi_value(value):
+        return [None if _is_missing(i) else str(i) for i in value]
+    return None if _is_missing(value) else str(value)
+
+
+def _arrow_column(pa, name, values):
+    """
+    Create an Arrow array for a sample attribute.
+
+    Attributes that are lists for any of the samples, e.g. ones merged
+    from the subsample tables, become list-typed columns, in which the
+    scalar values are single-element lists. Attributes of mixed types,
+    which Arrow can't represent, are converted to strings.
+
+    :param module pa: pyarrow module
+    :param str name: attribute name
+    :param list values: attribute values, one per sample
+    :return pyarrow.Array: attribute values
+    """
+    if any(is_multi_value(v) for v in values):
+        values = [
+            None if _is_missing(v) else list(v) if is_multi_value(v) else [v]
+            for v in values
+        ]
+    try:
+        return pa.array(values, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        _LOGGER.debug("Converting mixed type attribute '{}' to string".format(name))
+        return pa.array([_stringified(v) for v in values], from_pandas=True)
+
+
+def records_to_arrow(records):
+    """
+    Create an Arrow table from the sample records.
+
+    The columns are created directly from the records, one attribute
+    at a time, and are ordered by their first appearance in the records.
+
+    :param Iterable[Mapping] records: sample attributes, one mapping per sample
+    :return pyarrow.Table: table with a row per sample
+    """
+    pa = import_pyarrow()
+    records = list(records)
+    columns = OrderedDict()
+    for rec in records:
+        for k in rec:
+            columns.setdefault(k, None)
+    return pa.table(
+        OrderedDict(
+            (c, _arrow_column(pa, c, [rec.get(c) for rec in records])) for c in columns
+        )
+    )
+
+
+def write_arrow_ipc(table, path):
+    """
+    Write an Arrow table to a file in the Arrow IPC file format.
+
+    The record batches are written uncompressed, so the file can be
+    memory-mapped by the readers instead of being parsed.
+
+    :param pyarrow.Table table: table to write
+    :param str path: path to the output file
+    """
+    pa = import_pyarrow()
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
@@ -0,0 +1,183 @@
+"""
+Conversion of the sample table columns to native types and their encoding.
+"""
+
+from logging import getLogger
+
+import pandas as pd
+
+from .const import CFG_SAMPLE_TABLE_TYPES_KEY, PKG_NAME
+from .exceptions import InvalidConfigFileException, SampleTableFileException
+
+_LOGGER = getLogger(PKG_NAME)
+
+TRUE_STRINGS = ("true", "t", "yes", "y", "1")
+FALSE_STRINGS = ("false", "f", "no", "n", "0")
+
+
+def _is_text(col):
+    """
+    :param pandas.Series col: column to check
+    :return bool: whether the column holds strings: it has the object dtype,
+        or the string dtype the text columns have by default in pandas>=3
+    """
+    return pd.api.types.is_object_dtype(col) or pd.api.types.is_string_dtype(col)
+
+
+def _to_bool(col):
+    """Convert a string column to a nullable boolean column"""
+    lowered = col.str.strip().str.lower()
+    converted = pd.Series(pd.NA, index=col.index, dtype="boolean")
+    converted[lowered.isin(TRUE_STRINGS)] = True
+    converted[lowered.isin(FALSE_STRINGS)] = False
+    invalid = col.notna() & converted.isna()
+    if invalid.any():
+        raise ValueError("not a boolean: {}".format(col[invalid].iloc[0]))
+    return converted
+
+
+def _to_int(col):
+    """Convert a string column to a nullable integer column"""
+    return pd.to_numeric(col).astype("Int64")
+
+
+def _to_float(col):
+    """Convert a string column to a float column"""
+    return pd.to_numeric(col).astype(float)
+
+
+def _to_datetime(col):
+    """Convert a string column to a column of datetime objects"""
+    converted = pd.to_datetime(col)
+    return pd.Series(
+        [None if pd.isnull(v) else v.to_pydatetime() for v in converted],
+        index=col.index,
+        dtype=object,
+    )
+
+
+COLUMN_TYPES = {
+    "str": lambda col: col,
+    "int": _to_int,
+    "float": _to_float,
+    "bool": _to_bool,
+    "datetime": _to_datetime,
+}
+
+
+def _infer_type(col):
+    """
+    Infer the numeric type of a string column.
+
+    Columns with values with leading zeros, e.g. barcodes, are not
+    considered numeric.
+
+    :param pandas.Series col: column to infer the type of
+    :return str | None: name of the inferred type, None if not numeric
+    """
+    values = col.dropna().str.strip()
+    if values.empty or values.str.match(r"^[+-]?0\d").any():
+        return None
+    try:
+        numeric = pd.to_numeric(values)
+    except (ValueError, TypeError):
+        return None
+    if numeric.dtype.kind in "iu":
+        return "int"
+    if numeric.dtype.kind == "f":
+        return "float"
+    return None
+
+
+def resolve_column_types(df, types=None, infer=False, skip=None):
+    """
+    Get the types the sample table columns are converted to: the declared
+    ones and, if requested, the numeric types inferred for the other columns.
+
+    :param pandas.DataFrame df: sample table read with string columns
+    :param Mapping[str, str] types: column names mapped to names
+        of the types to convert the columns to
+    :param bool infer: whether the numeric types of the remaining columns
+        should be inferred
+    :param Iterable[str] skip: names of the columns to exclude
+        from the type inference
+    :return dict[str, str]: column names mapped to names of the types
+    :raise InvalidConfigFileException: if an unknown type is declared
+    """
+    types = dict(types or {})
+    unknown = {t for t in types.values() if t not in COLUMN_TYPES}
+    if unknown:
+        raise InvalidConfigFileException(
+            "Unknown {} declared: {}; supported types: {}".format(
+                CFG_SAMPLE_TABLE_TYPES_KEY, unknown, list(COLUMN_TYPES)
+            )
+        )
+    if infer:
+        skip = set(skip or [])
+        for col in df.columns:
+            if col not in types and col not in skip and _is_text(df[col]):
+                inferred = _infer_type(df[col])
+                if inferred:
+                    types[col] = inferred
+    return types
+
+
+def apply_column_types(df, types=None, infer=False, skip=None):
+    """
+    Convert the sample table columns to native types.
+
+    The values of the converted columns are Python objects of the declared
+    type, e.g. ints, which are then carried over to the Sample objects.
+
+    :param pandas.DataFrame df: sample table read with string columns
+    :param Mapping[str, str] types: column names mapped to names
+        of the types to convert the columns to
+    :param bool infer: whether the numeric types of the remaining columns
+        should be inferred
+    :param Iterable[str] skip: names of the columns to exclude
+        from the type inference
+    :return pandas.DataFrame: sample table with the columns converted
+    :raise InvalidConfigFileException: if an unknown type is declared
+    :raise SampleTableFileException: if a column can't be converted
+    """
+    types = resolve_column_types(df, types=types, infer=infer, skip=skip)
+    for col, typ in types.items():
+        if col not in df.columns:
+            _LOGGER.debug("Typed column not in the sample table: {}".format(col))
+            continue
+        _LOGGER.debug("Converting column '{}' to {}".format(col, typ))
+        try:
+            df[col] = COLUMN_TYPES[typ](df[col])
+        except (ValueError, TypeError) as e:
+            raise SampleTableFileException(
+                "Could not convert column '{}' to {}: {}".format(col, typ, e)
+            )
+    return df
+
+
+def encode_categorical(df, threshold, skip=None):
+    """
+    Dictionary encode the low cardinality string columns.
+
+    The encoded columns store every distinct value once, so all the rows,
+    and the Sample objects created from them, share the same string objects.
+
+    :param pandas.DataFrame df: table to encode the columns of
+    :param int threshold: maximum number of distinct values
+        of a column to encode
+    :param Iterable[str] skip: names of the columns not to encode
+    :return pandas.DataFrame: table with the columns encoded
+    """
+    skip = set(skip or [])
+    for col in df.columns:
+        if col in skip or not _is_text(df[col]):
+            continue
+        try:
+            n = df[col].nunique()
+        except TypeError:
+            # unhashable values, e.g. merged attributes
+            continue
+        if n <= threshold:
+            _LOGGER.debug("Encoding column '{}' with {} values".format(col, n))
+            df[col] = df[col].astype("category")
+    return df
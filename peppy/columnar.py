@@ -0,0 +1,513 @@
+"""
+Apply sample modifiers to the sample table with column operations.
+"""
+
+from collections import OrderedDict
+from logging import getLogger
+from string import Formatter
+
+import numpy as np
+import pandas as pd
+
+from .const import *
+from .exceptions import InvalidConfigFileException, InvalidSampleTableFileException
+from .multi_value import merge_subsample_table
+from .sample import Sample, SharedAttributes, _glob_regex, derive_value
+from .utils import expand_path
+
+_LOGGER = getLogger(PKG_NAME)
+
+
+def _expand(value):
+    """Expand value the way a PathExAttMap does on attribute read"""
+    return expand_path(value) if isinstance(value, str) else value
+
+
+def _filled(n, value):
+    """Create an object array of the given length filled with one value"""
+    arr = np.empty(n, dtype=object)
+    arr.fill(value)
+    return arr
+
+
+class ColumnarSampleTable(object):
+    """
+    Columnar representation of the samples undergoing modification.
+
+    Every column is kept as an object array accompanied by a presence mask,
+    which corresponds to a Sample having the attribute defined. Order in which
+    the attributes are added to the rows is recorded so that the materialized
+    Sample objects are identical to the ones produced by the object-based
+    sample modifiers.
+
+    :param pandas.DataFrame df: raw sample table
+    """
+
+    def __init__(self, df):
+        self.nrow = len(df)
+        self.raw_columns = list(df.columns)
+        self.raw_values = {c: df[c].to_numpy(dtype=object) for c in df.columns}
+        self.raw_present = {c: df[c].notna().to_numpy() for c in df.columns}
+        self.values = OrderedDict((c, v.copy()) for c, v in self.raw_values.items())
+        self.present = OrderedDict((c, m.copy()) for c, m in self.raw_present.items())
+        self.removed = set()
+        self.additions = []
+        self.shared = _filled(self.nrow, None)
+        self.virtual = {}
+        self.aliased = {}
+        self.derived_done = [[] for _ in range(self.nrow)]
+
+    def __contains__(self, col):
+        return col in self.values
+
+    def has(self, col):
+        """
+        Get the mask of rows that define the attribute
+
+        :param str col: attribute name
+        :return numpy.ndarray: boolean mask
+        """
+        if col not in self.present:
+            return np.zeros(self.nrow, dtype=bool)
+        return self.present[col]
+
+    def get(self, col, expand=False):
+        """
+        Get the attribute values; undefined rows are None
+
+        :param str col: attribute name
+        :param bool expand: whether to expand the paths in the string values
+        :return numpy.ndarray: object array of values
+        """
+        if col not in self.values:
+            return _filled(self.nrow, None)
+        vals = self.values[col]
+        if not expand:
+            return vals
+        out = vals.copy()
+        idx = np.flatnonzero(self.present[col])
+        out[idx] = [_expand(v) for v in vals[idx]]
+        return out
+
+    def set(self, col, values, mask):
+        """
+        Set the attribute values in the selected rows
+
+        :param str col: attribute name
+        :param numpy.ndarray values: object array of values, aligned with rows
+        :param numpy.ndarray mask: rows to set the values in
+        """
+        if not mask.any():
+            return
+        if col not in self.values:
+            self.values[col] = _filled(self.nrow, None)
+            self.present[col] = np.zeros(self.nrow, dtype=bool)
+        self._freeze_aliases(col, mask)
+        added = mask & ~self.present[col]
+        if col in self.virtual:
+            # rows with a shared value get their own one
+            added |= mask & self.virtual[col]
+            self.virtual[col] = self.virtual[col] & ~mask
+            if col in self.aliased:
+                self.aliased[col] = self.aliased[col] & ~mask
+        if added.any():
+            self.additions.append((col, added))
+        self.values[col][mask] = values[mask]
+        self.present[col] = self.present[col] | mask
+
+    def share(self, shared):
+        """
+        Set the shared attributes of all rows. The attribute values are
+        available in the columns for the rows that do not define their own.
+
+        :param peppy.sample.SharedAttributes shared: shared attributes
+        """
+        self.shared = _filled(self.nrow, shared)
+        self.additions.append((SHARED_ATTRS_KEY, np.ones(self.nrow, dtype=bool)))
+        for col in shared.attributes():
+            if col not in self.values:
+                self.values[col] = _filled(self.nrow, None)
+                self.present[col] = np.zeros(self.nrow, dtype=bool)
+            mask = ~self.present[col]
+            self.values[col][mask] = _filled(self.nrow, shared.constants[col])[mask]
+            self.present[col] = self.present[col] | mask
+            self.virtual[col] = mask
+
+    def alias(self, aliases):
+        """
+        Declare the aliases, which take the values of other attributes.
+        The rows that define any of the alias names get the values copied,
+        in the other ones the alias values are available in the columns
+        like the shared attributes.
+
+        :param Iterable[(str, str)] aliases: names of the source attributes
+            and the aliases
+        """
+        aliases = list(aliases)
+        own = np.zeros(self.nrow, dtype=bool)
+        for _, new in aliases:
+            if new in self.virtual:
+                own |= self.has(new) & ~self.virtual[new]
+            else:
+                own |= self.has(new)
+        for attr, new in aliases:
+            self.set(new, self.get(attr, expand=True), self.has(attr) & own)
+        rows = ~own
+        holders = {}
+        for i in np.flatnonzero(rows):
+            shared = self.shared[i]
+            if id(shared) not in holders:
+                holders[id(shared)] = (shared or SharedAttributes()).with_aliases(
+                    aliases
+                )
+            self.shared[i] = holders[id(shared)]
+        self.additions.append((SHARED_ATTRS_KEY, rows))
+        for attr, new in aliases:
+            mask = self.has(attr) & rows
+            if new not in self.values:
+                self.values[new] = _filled(self.nrow, None)
+                self.present[new] = np.zeros(self.nrow, dtype=bool)
+            self.values[new][mask] = self.get(attr, expand=True)[mask]
+            self.present[new] = self.present[new] | mask
+            self.virtual[new] = self.virtual.get(new, mask) | mask
+            self.aliased[new] = self.aliased.get(new, mask) | mask
+
+    def _freeze_aliases(self, col, mask):
+        """
+        Make the alias values own ones in the selected rows before
+        the attribute they are resolved from is changed
+
+        :param str col: name of the attribute to be changed
+        :param numpy.ndarray mask: rows the attribute is changed in
+        """
+        holders = {}
+        for i in np.flatnonzero(mask):
+            shared = self.shared[i]
+            if shared is not None and col in shared.sources:
+                holders.setdefault(id(shared), (shared, []))[1].append(i)
+        for shared, rows in holders.values():
+            frozen = np.zeros(self.nrow, dtype=bool)
+            frozen[rows] = True
+            for name in shared.attributes():
+                if name in self.aliased and (self.aliased[name] & frozen).any():
+                    self.additions.append((name, self.aliased[name] & frozen))
+                    self.virtual[name] = self.virtual[name] & ~frozen
+                    self.aliased[name] = self.aliased[name] & ~frozen
+            self.shared[rows] = _filled(len(rows), shared.frozen_aliases())
+
+    def drop(self, col):
+        """
+        Remove the attribute from all rows
+
+        :param str col: attribute name
+        """
+        if col in self.values:
+            del self.values[col]
+            del self.present[col]
+            self.virtual.pop(col, None)
+            self.aliased.pop(col, None)
+            self.removed.add(col)
+
+    def row_items(self, i):
+        """
+        Get a mapping of the attributes defined in a row
+
+        :param int i: row number
+        :return dict: attribute values
+        """
+        return {c: self.values[c][i] for c in self.values if self.present[c][i]}
+
+    def to_frame(self):
+        """
+        Convert to a data frame; undefined values are represented as NaN
+
+        :return pandas.DataFrame: modified sample table
+        """
+        return pd.DataFrame(
+            OrderedDict(
+                (c, np.where(self.present[c], self.values[c], np.nan))
+                for c in self.values
+            )
+        )
+
+    def to_samples(self, prj):
+        """
+        Materialize Sample objects from the modified table
+
+        :param peppy.Project prj: project the samples belong to
+        :return list[peppy.Sample]: samples
+        """
+        samples = []
+        for i in range(self.nrow):
+            raw = OrderedDict(
+                (c, self.raw_values[c][i])
+                for c in self.raw_columns
+                if self.raw_present[c][i]
+            )
+            s = Sample(raw, prj=prj)
+            for c in list(raw.keys()):
+                if c in self.removed:
+                    del s[c]
+                elif self.values[c][i] is not raw[c]:
+                    s[c] = self.values[c][i]
+            for c, mask in self.additions:
+                if c == SHARED_ATTRS_KEY:
+                    if mask[i]:
+                        s[c] = self.shared[i]
+                elif mask[i] and self.present[c][i]:
+                    s[c] = self.values[c][i]
+            s._derived_cols_done = self.derived_done[i]
+            samples.append(s)
+        return samples
+
+
+class ColumnarModifiers(object):
+    """
+    Sample modifiers pipeline executed on the raw sample table.
+
+    This is an alternative to the per-Sample execution of the modifiers
+    in :class:`peppy.Project`: the sample table is processed column-wise and
+    the Sample objects are created once all the modifiers are applied.
+
+    :param peppy.Project prj: project to process the sample table for
+    """
+
+    def __init__(self, prj):
+        self.prj = prj
+        self.mods = prj[CONFIG_KEY][SAMPLE_MODS_KEY] if prj._modifier_exists() else {}
+
+    def run(self, df, subsample_dfs=None):
+        """
+        Apply all the sample modifiers to the sample table
+
+        :param pandas.DataFrame df: raw sample table
+        :param Iterable[pandas.DataFrame] subsample_dfs: raw subsample tables
+        :return ColumnarSampleTable: modified sample table
+        """
+        tab = ColumnarSampleTable(df)
+        self.remove(tab)
+        self.constants(tab)
+        self.synonyms(tab)
+        self.imply(tab)
+        self.assert_names(tab)
+        for sst in subsample_dfs or []:
+            self.merge(tab, sst)
+        self.derive(tab)
+        return tab
+
+    def remove(self, tab):
+        for attr in self.mods.get(REMOVE_KEY) or []:
+            tab.drop(attr)
+
+    def constants(self, tab):
+        if CONSTANT_KEY in self.mods:
+            tab.share(SharedAttributes((self.mods[CONSTANT_KEY] or {}).items()))
+
+    def synonyms(self, tab):
+        if DUPLICATED_KEY in self.mods:
+            tab.alias((self.mods[DUPLICATED_KEY] or {}).items())
+
+    def imply(self, tab):
+        if IMPLIED_KEY not in self.mods:
+            return
+        implications = self.mods[IMPLIED_KEY]
+        if not isinstance(implications, list):
+            raise InvalidConfigFileException(
+                "{}.{} has to be a list of key-value pairs".format(
+                    SAMPLE_MODS_KEY, IMPLIED_KEY
+                )
+            )
+        for implication in implications:
+            if not all([key in implication for key in IMPLIED_COND_KEYS]):
+                raise InvalidConfigFileException(
+                    "{}.{} section is invalid: {}".format(
+                        SAMPLE_MODS_KEY, IMPLIED_KEY, implication
+                    )
+                )
+            mask = np.ones(tab.nrow, dtype=bool)
+            for implier_attr, implier_val in implication[IMPLIED_IF_KEY].items():
+                vals = tab.get(implier_attr, expand=True)
+                if isinstance(implier_val, list):
+                    try:
+                        match = pd.Series(vals).isin(implier_val).to_numpy()
+                    except TypeError:
+                        match = None
+                else:
+                    match = None
+                if match is None:
+                    match = np.array([v in implier_val for v in vals], dtype=bool)
+                mask &= tab.has(implier_attr) & match
+            for implied_attr, imp_val in implication[IMPLIED_THEN_KEY].items():
+                tab.set(implied_attr, _filled(tab.nrow, imp_val), mask)
+
+    def assert_names(self, tab):
+        """
+        Make sure all rows define sample_name attribute, try to derive it first
+
+        :raise InvalidSampleTableFileException: if names are not specified
+        """
+        try:
+            if SAMPLE_NAME_ATTR in self.mods[DERIVED_KEY][DERIVED_ATTRS_KEY]:
+                self.derive(tab, attrs=[SAMPLE_NAME_ATTR])
+        except KeyError:
+            pass
+        missing = ~tab.has(SAMPLE_NAME_ATTR)
+        if not missing.any():
+            return
+        msg_base = "{st} is missing '{sn}' column; ".format(
+            st=CFG_SAMPLE_TABLE_KEY, sn=SAMPLE_NAME_ATTR
+        )
+        st_index = self.prj.st_index
+        if st_index == SAMPLE_NAME_ATTR:
+            raise InvalidSampleTableFileException(
+                msg_base
+                + "you must specify {sn}s in {st} or derive them".format(
+                    st=CFG_SAMPLE_TABLE_KEY, sn=SAMPLE_NAME_ATTR
+                )
+            )
+        if not tab.has(st_index)[missing].all():
+            raise AttributeError(st_index)
+        names = tab.get(st_index, expand=True)
+        _LOGGER.warning(
+            msg_base
+            + "using specified {} index ({}) instead".format(
+                CFG_SAMPLE_TABLE_KEY, st_index
+            )
+        )
+        tab.set(SAMPLE_NAME_ATTR, names, missing)
+
+    def merge(self, tab, sst):
+        """
+        Merge subsample table rows into the matching sample table rows
+
+        :param ColumnarSampleTable tab: table to merge into
+        :param pandas.DataFrame sst: subsample table
+        """
+        colname = self.prj.sample_name_colname
+        names = tab.get(SAMPLE_NAME_ATTR, expand=True)
+        if colname not in sst.columns:
+            raise KeyError("Subannotation requires column '{}'.".format(colname))
+        named = tab.has(SAMPLE_NAME_ATTR)
+        unmatched = set(sst[colname]) - set(names[named])
+        for n in unmatched:
+            _LOGGER.warning("Couldn't find matching sample for subsample: {}".format(n))
+        if tab.nrow == 0:
+            return
+        positions, merged, generated = merge_subsample_table(sst, colname)
+        groups = np.array(
+            [positions.get(n, -1) if named[i] else -1 for i, n in enumerate(names)]
+        )
+        rows = groups >= 0
+        if not rows.any():
+            return
+        _LOGGER.debug("Merging {} rows of {}".format(len(sst), CFG_SUBSAMPLE_TABLE_KEY))
+
+        def _merged(col, column, defined):
+            vals = _filled(tab.nrow, None)
+            has_col = np.zeros(tab.nrow, dtype=bool)
+            for i in np.flatnonzero(rows):
+                if defined[groups[i]]:
+                    vals[i] = column.view(groups[i])
+                    has_col[i] = True
+            tab.set(col, vals, has_col)
+
+        for col, (column, defined) in merged.items():
+            _merged(col, column, defined)
+        _merged(SUBSAMPLE_NAME_ATTR, *generated)
+
+    def derive(self, tab, attrs=None):
+        """
+        Set the derived attributes
+
+        :param ColumnarSampleTable tab: table to set the attributes in
+        :param Iterable[str] attrs: names of the attributes to derive,
+            all that are declared in the config by default
+        """
+        if DERIVED_KEY not in self.mods:
+            return
+        da = self.mods[DERIVED_KEY][DERIVED_ATTRS_KEY]
+        ds = self.mods[DERIVED_KEY][DERIVED_SOURCES_KEY]
+        derivations = attrs or (da if isinstance(da, list) else [da])
+        _LOGGER.debug("Derivations to be done: {}".format(derivations))
+        for attr in derivations:
+            rows = tab.has(attr) & np.array(
+                [attr not in d for d in tab.derived_done], dtype=bool
+            )
+            if not rows.any():
+                continue
+            source_keys = tab.get(attr, expand=True)
+            tab.set(ATTR_KEY_PREFIX + attr, source_keys, rows)
+            derived = _filled(tab.nrow, None)
+            if ds:
+                self._derive_rows(tab, ds, attr, source_keys, rows, derived)
+            keep = rows & np.array([bool(v) for v in derived], dtype=bool)
+            tab.set(attr, derived, keep)
+            for i in np.flatnonzero(rows):
+                tab.derived_done[i].append(attr)
+
+    def _derive_rows(self, tab, ds, attr, source_keys, rows, out):
+        """
+        Populate the data source templates, string concatenation is used for
+        the templates composed of plain fields, other cases are formatted
+        row by row.
+        """
+        names = tab.get(SAMPLE_NAME_ATTR, expand=True)
+        str_keys = rows & np.array([isinstance(k, str) for k in source_keys])
+        for i in np.flatnonzero(rows & ~str_keys):
+            out[i] = self._derive_row(tab, ds, attr, source_keys[i], names[i], i)
+        for key in pd.unique(source_keys[str_keys]):
+            sel = str_keys & (source_keys == key)
+            try:
+                regex = ds[key]
+            except KeyError:
+                out[sel] = ""
+                continue
+            if not isinstance(regex, str):
+                for i in np.flatnonzero(sel):
+                    out[i] = self._derive_row(tab, ds, attr, key, names[i], i)
+                continue
+            parsed = list(Formatter().parse(regex))
+            fields = [p[1] for p in parsed if p[1] is not None]
+            if not fields:
+                globbed = _glob_regex([regex])
+                for i in np.flatnonzero(sel):
+                    out[i] = list(globbed) if isinstance(globbed, list) else globbed
+                continue
+            if not all(
+                [
+                    p[1] is None or (p[1].isidentifier() and not p[2] and not p[3])
+                    for p in parsed
+                ]
+            ):
+                for i in np.flatnonzero(sel):
+                    out[i] = self._derive_row(tab, ds, attr, key, names[i], i)
+                continue
+            if "$" in regex:
+                _LOGGER.warning(
+                    "Not all environment variables were populated "
+                    "in derived attribute source: {}".format(regex)
+                )
+            plain = sel.copy()
+            for f in set(fields):
+                plain &= ~tab.has(f) | np.array(
+                    [isinstance(v, str) for v in tab.get(f)], dtype=bool
+                )
+            for i in np.flatnonzero(sel & ~plain):
+                out[i] = self._derive_row(tab, ds, attr, key, names[i], i)
+            idx = np.flatnonzero(plain)
+            if len(idx) == 0:
+                continue
+            formatted = pd.Series(_filled(len(idx), ""))
+            for literal, field, _, _ in parsed:
+                formatted = formatted + literal
+                if field is not None:
+                    vals = np.where(tab.has(field), tab.get(field), "{" + field + "}")
+                    formatted = formatted + pd.Series(vals[idx], dtype=object)
+            for i, val in zip(idx, formatted):
+                out[i] = _glob_regex([val]) if ("*" in val or "[" in val) else val
+
+    def _derive_row(self, tab, ds, attr, source_key, name, i):
+        """Derive the attribute for a single row"""
+        return derive_value(
+            ds, source_key, tab.row_items(i), attr, name or "this sample"
+        )
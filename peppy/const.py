@@ -64,15 +64,18 @@ PROJECT_CONSTANTS = [
 # Sample-related
 SAMPLE_YAML_FILE_KEY = "yaml_file"
 SAMPLE_YAML_EXT = (".yaml", ".yml")
+ROW_INDEX_EXT = ".rowidx.json"
 SAMPLE_NAME_ATTR = "sample_name"
 SUBSAMPLE_NAME_ATTR = "subsample_name"
 SAMPLE_SHEET_KEY = "sample_sheet"
 SUBSAMPLE_SHEET_KEY = "subsample_sheet"
 CFG_SAMPLE_TABLE_KEY = "sample_table"
 CFG_SUBSAMPLE_TABLE_KEY = "subsample_table"
+CFG_SAMPLE_TABLE_TYPES_KEY = "sample_table_types"
 SAMPLE_DF_KEY = "_sample_df"
 SUBSAMPLE_DF_KEY = "_subsample_df"
 PRJ_REF = "_project"
+SHARED_ATTRS_KEY = "_shared_attrs"
 ATTR_KEY_PREFIX = "_key_"
 INPUTS_ATTR_NAME = "input_attrs"
 REQ_INPUTS_ATTR_NAME = "required_" + INPUTS_ATTR_NAME
@@ -82,10 +85,12 @@ SAMPLE_CONSTANTS = [
     "SUBSAMPLE_SHEET_KEY",
     "SAMPLE_SHEET_KEY",
     "PRJ_REF",
+    "SHARED_ATTRS_KEY",
     "SAMPLE_NAME_ATTR",
     "ATTR_KEY_PREFIX",
     "CFG_SAMPLE_TABLE_KEY",
     "CFG_SUBSAMPLE_TABLE_KEY",
+    "CFG_SAMPLE_TABLE_TYPES_KEY",
     "SAMPLE_DF_KEY",
     "SUBSAMPLE_DF_KEY",
     "SUBSAMPLE_NAME_ATTR",
@@ -93,6 +98,7 @@ SAMPLE_CONSTANTS = [
     "REQ_INPUTS_ATTR_NAME",
     "SAMPLE_YAML_FILE_KEY",
     "SAMPLE_YAML_EXT",
+    "ROW_INDEX_EXT",
     "SAMPLE_MODIFIERS",
 ]
 
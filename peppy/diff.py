@@ -0,0 +1,137 @@
+"""
+Differences between two versions of a project, found by comparing
+the sample hashes and the attributes of only the samples that differ.
+"""
+
+from logging import getLogger
+
+from .const import PKG_NAME
+from .sample import samples_to_dicts
+
+_LOGGER = getLogger(PKG_NAME)
+
+
+class SampleDiff(object):
+    """
+    Attribute changes of a sample.
+
+    :param str name: sample name
+    :param dict added: values of the attributes the sample gained
+    :param dict removed: values of the attributes the sample lost
+    :param dict[str, (object, object)] changed: old and new values of the
+        attributes that changed
+    """
+
+    def __init__(self, name, added, removed, changed):
+        self.name = name
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+
+    def __repr__(self):
+        return "{}({!r}: {} added, {} removed, {} changed)".format(
+            self.__class__.__name__,
+            self.name,
+            len(self.added),
+            len(self.removed),
+            len(self.changed),
+        )
+
+
+class ProjectDiff(object):
+    """
+    Changes between two versions of a project, see :meth:`peppy.Project.diff`.
+
+    :param list[str] added: names of the added samples
+    :param list[str] removed: names of the removed samples
+    :param list[SampleDiff] changed: changes of the samples present
+        in both versions
+    :param bool config_changed: whether the config or the active
+        amendments changed
+    """
+
+    def __init__(self, added, removed, changed, config_changed):
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+        self.config_changed = config_changed
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed or self.config_changed)
+
+    def __repr__(self):
+        return "{}({} added, {} removed, {} changed samples{})".format(
+            self.__class__.__name__,
+            len(self.added),
+            len(self.removed),
+            len(self.changed),
+            ", config changed" if self.config_changed else "",
+        )
+
+
+def _sample_keys(samples, index):
+    """
+    Get the keys the samples are aligned by: the sample table index values,
+    numbered by occurrence if duplicated
+
+    :param Iterable[peppy.Sample] samples: samples
+    :param list[str] index: names of the sample table index columns
+    :return list[(object, int)]: keys of the samples
+    """
+    keys, seen = [], {}
+    for s in samples:
+        vals = tuple([s.get(c, expand=False) for c in index])
+        name = vals[0] if len(vals) == 1 else vals
+        n = seen.get(name, 0)
+        seen[name] = n + 1
+        keys.append((name, n))
+    return keys
+
+
+def _attr_diff(name, old, new):
+    """
+    :param str name: sample name
+    :param dict old: serialized sample
+    :param dict new: serialized version of the sample to compare to
+    :return SampleDiff: attribute changes
+    """
+    added = {k: v for k, v in new.items() if k not in old}
+    removed = {k: v for k, v in old.items() if k not in new}
+    changed = {k: (v, new[k]) for k, v in old.items() if k in new and new[k] != v}
+    return SampleDiff(name, added, removed, changed)
+
+
+def diff_samples(old, new, old_hashes, new_hashes, index):
+    """
+    Find the added, removed and changed samples. The samples are aligned
+    by the sample table index, and only the attributes of the samples
+    with different hashes are compared.
+
+    :param list[peppy.Sample] old: samples
+    :param list[peppy.Sample] new: samples to compare to
+    :param list[str] old_hashes: hashes of the samples
+    :param list[str] new_hashes: hashes of the samples to compare to
+    :param list[str] index: names of the sample table index columns
+    :return (list, list, list[SampleDiff]): names of the added and removed
+        samples and the changes of the samples present in both lists
+    """
+    old_keys, new_keys = _sample_keys(old, index), _sample_keys(new, index)
+    new_pos = {k: i for i, k in enumerate(new_keys)}
+    old_pos = {k: i for i, k in enumerate(old_keys)}
+    added = [k[0] for k in new_keys if k not in old_pos]
+    removed = [k[0] for k in old_keys if k not in new_pos]
+    pairs = [
+        (k[0], i, new_pos[k])
+        for i, k in enumerate(old_keys)
+        if k in new_pos and old_hashes[i] != new_hashes[new_pos[k]]
+    ]
+    _LOGGER.debug(
+        "Comparing the attributes of {} of {} samples".format(len(pairs), len(old))
+    )
+    old_records = samples_to_dicts([old[i] for _, i, _ in pairs])
+    new_records = samples_to_dicts([new[j] for _, _, j in pairs])
+    changed = [
+        _attr_diff(name, o, n)
+        for (name, _, _), o, n in zip(pairs, old_records, new_records)
+    ]
+    return added, removed, changed
@@ -0,0 +1,213 @@
+"""
+Out-of-core sort-merge join of the sample and subsample tables,
+for the tables that do not fit in memory.
+"""
+
+import heapq
+import os
+import pickle
+from itertools import groupby, islice
+from logging import getLogger
+
+import numpy as np
+import pandas as pd
+
+from .const import PKG_NAME
+
+_LOGGER = getLogger(PKG_NAME)
+
+MAX_FAN_IN = 32
+
+
+def sorted_runs(chunks, colname, tmpdir, fan_in=MAX_FAN_IN):
+    """
+    Sort the chunks of a table by the values of a column and write every
+    chunk to a temporary run file, in blocks of rows.
+
+    The rows with equal values keep the order of the table; the labels
+    of the rows are kept as well. If there are more runs than can be merged
+    at once, they are merged into longer runs, so that at most a block
+    of every one of the fan_in runs is held in memory during a merge.
+
+    :param Iterable[pandas.DataFrame] chunks: consecutive chunks of a table
+    :param str colname: name of the column to sort the rows by
+    :param str tmpdir: directory to write the run files to
+    :param int fan_in: maximum number of runs to merge at once
+    :return (list[str], list[str]): names of the table columns
+        and paths to the run files
+    :raise KeyError: if the column does not exist
+    """
+    columns, runs, block_size = None, [], 1
+    for chunk in chunks:
+        if colname not in chunk.columns:
+            raise KeyError("Subannotation requires column '{}'.".format(colname))
+        if columns is None:
+            columns = list(chunk.columns)
+            block_size = max(1, len(chunk) // fan_in)
+        keys = _sort_keys(chunk[colname])
+        order = np.argsort(keys, kind="stable")
+        rows = zip(
+            keys[order],
+            chunk.index[order],
+            chunk.iloc[order].itertuples(index=False, name=None),
+        )
+        runs.append(_write_run(tmpdir, len(runs), rows, block_size))
+        _LOGGER.debug("Sorted {} rows into run: {}".format(len(chunk), runs[-1]))
+    n = len(runs)
+    while len(runs) > fan_in:
+        merged = []
+        for i in range(0, len(runs), fan_in):
+            group = runs[i : i + fan_in]
+            merged.append(_write_run(tmpdir, n, merged_rows(group), block_size))
+            n += 1
+            for r in group:
+                os.remove(r)
+        _LOGGER.debug("Merged {} runs into {}".format(len(runs), len(merged)))
+        runs = merged
+    return columns or [], runs
+
+
+def _sort_keys(col):
+    """
+    :param pandas.Series col: column to sort the rows by
+    :return numpy.ndarray: string keys of the rows, empty for missing values
+    """
+    return np.array(
+        ["" if pd.isnull(v) else str(v) for v in col.to_numpy(dtype=object)],
+        dtype=object,
+    )
+
+
+def _write_run(tmpdir, i, rows, block_size):
+    """
+    Write the sorted rows to a run file, in blocks of rows
+
+    :param str tmpdir: directory to write the run file to
+    :param int i: number of the run
+    :param Iterable[(str, int, tuple)] rows: key, label and values of every row
+    :param int block_size: number of rows in a block
+    :return str: path to the run file
+    """
+    path = os.path.join(tmpdir, "run{}.pkl".format(i))
+    rows = iter(rows)
+    with open(path, "wb") as f:
+        while True:
+            block = list(islice(rows, block_size))
+            if not block:
+                break
+            pickle.dump(block, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return path
+
+
+def _iter_run(path):
+    """
+    Read the rows of a run file, one block at a time
+
+    :param str path: path to the run file
+    :return Iterator[(str, int, tuple)]: key, label and values of every row
+    """
+    with open(path, "rb") as f:
+        while True:
+            try:
+                block = pickle.load(f)
+            except EOFError:
+                return
+            yield from block
+
+
+def merged_rows(runs):
+    """
+    Merge the rows of the sorted run files of a table
+
+    :param Iterable[str] runs: paths to the run files
+    :return Iterator[(str, int, tuple)]: key, label and values of every row,
+        in the order of the keys
+    """
+    return heapq.merge(*[_iter_run(r) for r in runs])
+
+
+def _frame(columns, rows):
+    """
+    :param list[str] columns: names of the table columns
+    :param list[(str, int, tuple)] rows: rows of the table
+    :return pandas.DataFrame: table with object columns
+    """
+    return pd.DataFrame(
+        [r[2] for r in rows],
+        columns=columns,
+        index=[r[1] for r in rows],
+        dtype=object,
+    )
+
+
+def iter_joined_chunks(samples, subsamples, chunksize):
+    """
+    Join the rows of the sample table with the rows of the subsample tables,
+    both sorted by the sample names, with a single pass over each.
+
+    The samples are produced in chunks, each along with the subsample rows
+    that match them. The samples with equal names are never split between
+    the chunks. The subsample rows that do not match any sample are skipped.
+
+    :param (list[str], Iterator) samples: columns and sorted rows
+        of the sample table
+    :param Iterable[(list[str], Iterator)] subsamples: columns and sorted rows
+        of every subsample table
+    :param int chunksize: number of samples in a chunk
+    :return Iterator[(pandas.DataFrame, list[pandas.DataFrame])]: chunks of the
+        sample table and the matching rows of every subsample table
+    """
+    streams = [(cols, _Peekable(rows)) for cols, rows in subsamples]
+    chunk = []
+
+    def _joined():
+        keys = {r[0] for r in chunk}
+        last = chunk[-1][0]
+        matched = []
+        for cols, rows in streams:
+            taken = list(rows.take_until(last))
+            _warn_unmatched([r[0] for r in taken if r[0] not in keys])
+            matched.append(_frame(cols, [r for r in taken if r[0] in keys]))
+        return _frame(samples[0], chunk), matched
+
+    for _, group in groupby(samples[1], key=lambda r: r[0]):
+        chunk.extend(group)
+        if len(chunk) >= chunksize:
+            yield _joined()
+            chunk = []
+    if chunk:
+        yield _joined()
+    for _, rows in streams:
+        _warn_unmatched([r[0] for r in rows.take_until(None)])
+
+
+def _warn_unmatched(names):
+    """
+    :param Iterable[str] names: names of the subsample rows without samples
+    """
+    for n in dict.fromkeys(names):
+        _LOGGER.warning("Couldn't find matching sample for subsample: {}".format(n))
+
+
+class _Peekable(object):
+    """
+    Iterator over the sorted rows of a table, which can be consumed
+    up to a key
+
+    :param Iterator[(str, int, tuple)] rows: rows sorted by the keys
+    """
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._head = next(self._rows, None)
+
+    def take_until(self, key):
+        """
+        Consume the rows with keys not greater than the key
+
+        :param str | None key: last key to consume, None to consume all rows
+        :return Iterator[(str, int, tuple)]: consumed rows
+        """
+        while self._head is not None and (key is None or self._head[0] <= key):
+            yield self._head
+            self._head = next(self._rows, None)
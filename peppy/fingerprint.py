@@ -0,0 +1,239 @@
+"""
+Content fingerprints of the samples and projects, which are compared
+instead of the attributes to tell whether the samples or projects differ.
+"""
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    # for py2
+    from collections import Mapping
+
+import json
+import weakref
+from hashlib import blake2b
+from logging import getLogger
+from numbers import Number
+
+import numpy as np
+
+from .const import PKG_NAME
+
+_LOGGER = getLogger(PKG_NAME)
+
+_DIGEST_SIZE = 16
+_SCALAR_TYPES = (str, int, float, bool)
+
+
+def _normalized(value):
+    """
+    Convert a value to a JSON serializable one, which is the same
+    for the values that compare equal, e.g. 1, 1.0 and True
+
+    :param object value: serialized attribute value
+    :return object: normalized value
+    """
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, Number) and not isinstance(value, (int, float)):
+        try:
+            value = float(value) if float(value) == value else value
+        except (TypeError, ValueError):
+            pass
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, bool):
+        return int(value)
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    if isinstance(value, Mapping):
+        return {_canonical(k): _normalized(v) for k, v in value.items()}
+    if isinstance(value, (set, frozenset)):
+        return sorted([_normalized(v) for v in value], key=_canonical)
+    if isinstance(value, (list, tuple)):
+        return [_normalized(v) for v in value]
+    return str(value)
+
+
+def _canonical(value):
+    """
+    :param object value: serialized attribute value
+    :return str: representation of the value, independent of the key order,
+        the same for the values that compare equal
+    """
+    return json.dumps(_normalized(value), sort_keys=True)
+
+
+def _digest(data):
+    """
+    :param str data: data to hash
+    :return bytes: digest of the data
+    """
+    data = data.encode("utf-8", "surrogatepass")
+    return blake2b(data, digest_size=_DIGEST_SIZE).digest()
+
+
+def sample_hashes(records):
+    """
+    Hash many serialized samples at once.
+
+    The attribute values are hashed column-wise, a column at a time, and each
+    distinct value of a column is hashed only once. The digests of the
+    attributes of a sample are combined with XOR, so the hash does not depend
+    on the order of the attributes.
+
+    :param list[dict] records: serialized samples,
+        see :func:`peppy.sample.samples_to_dicts`
+    :return list[str]: hexadecimal hashes of the samples
+    """
+    columns = {}
+    for i, record in enumerate(records):
+        for k, v in record.items():
+            try:
+                rows, values = columns[k]
+            except KeyError:
+                rows, values = columns[k] = ([], [])
+            rows.append(i)
+            values.append(v)
+    acc = np.zeros((len(records), _DIGEST_SIZE // 8), dtype=np.uint64)
+    for k, (rows, values) in columns.items():
+        prefix = _canonical(k) + ":"
+        digests, seen = [], {}
+        for v in values:
+            key = (type(v), v) if isinstance(v, _SCALAR_TYPES) else _canonical(v)
+            try:
+                d = seen[key]
+            except KeyError:
+                d = seen[key] = _digest(prefix + _canonical(v))
+            digests.append(d)
+        acc[rows] ^= np.frombuffer(b"".join(digests), dtype=np.uint64).reshape(
+            len(rows), -1
+        )
+    _LOGGER.debug("Hashed {} samples, {} attributes".format(len(records), len(columns)))
+    return [row.tobytes().hex() for row in acc]
+
+
+class SampleHashes(object):
+    """
+    Cache of the content hashes of the samples of a project.
+
+    The hashes are kept with weak references to the samples, so the hash
+    of a garbage collected sample is dropped rather than picked up by
+    a new sample.
+
+    The hashes of the samples with list or mapping values, which can be changed
+    in place without the cache noticing, are not used to compare the samples.
+
+    :param dict[int, (weakref.ref, str, bool)] hashes: cached hashes, references
+        to the samples and whether the hashes can be used to compare the
+        samples, by the ids of the samples
+    """
+
+    def __init__(self, hashes=None):
+        self._hashes = {}
+        for ref, h, comparable in (hashes or {}).values():
+            sample = ref()
+            if sample is not None:
+                self._store(sample, h, comparable)
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def _store(self, sample, digest, comparable):
+        """
+        :param peppy.Sample sample: hashed sample
+        :param str digest: hash of the sample
+        :param bool comparable: whether the hash can be used to compare
+            the sample
+        """
+        sid = id(sample)
+
+        def _forget(ref, hashes=self._hashes):
+            if hashes.get(sid, (None,))[0] is ref:
+                del hashes[sid]
+
+        self._hashes[sid] = (weakref.ref(sample, _forget), digest, comparable)
+
+    def _entry(self, sample):
+        """
+        :param peppy.Sample sample: sample to get the hash for
+        :return (str, bool) | None: cached hash of the sample and whether
+            it can be used to compare the sample, None if not cached
+        """
+        ref, digest, comparable = self._hashes.get(id(sample), (None, None, False))
+        return (digest, comparable) if ref is not None and ref() is sample else None
+
+    def comparable(self, sample):
+        """
+        :param peppy.Sample sample: sample to get the hash for
+        :return str | None: cached hash of the sample, None if not cached or
+            if the sample has values that can be changed in place
+        """
+        entry = self._entry(sample)
+        return entry[0] if entry is not None and entry[1] else None
+
+    def get(self, samples, to_dicts, is_mutable=None):
+        """
+        Get the hashes of the samples, hashing the ones not cached all at once
+
+        :param Iterable[peppy.Sample] samples: samples to get the hashes for
+        :param callable to_dicts: function serializing the samples,
+            see :func:`peppy.sample.samples_to_dicts`
+        :param callable is_mutable: function telling whether a sample has
+            values that can be changed in place; the hashes are not used
+            to compare the samples if not given
+        :return list[str]: hexadecimal hashes of the samples
+        """
+        samples = list(samples)
+        entries = [self._entry(s) for s in samples]
+        missing = [i for i, e in enumerate(entries) if e is None]
+        if missing:
+            new = sample_hashes(to_dicts([samples[i] for i in missing]))
+            for i, h in zip(missing, new):
+                comparable = is_mutable is not None and not is_mutable(samples[i])
+                self._store(samples[i], h, comparable)
+                entries[i] = (h, comparable)
+        return [e[0] for e in entries]
+
+    def discard(self, sample):
+        """
+        :param peppy.Sample sample: edited sample, which has to be hashed again
+        """
+        self._hashes.pop(id(sample), None)
+
+    def copy(self):
+        """
+        :return SampleHashes: copy of the cache
+        """
+        return SampleHashes(self._hashes)
+
+    def remapped(self, pairs):
+        """
+        :param Iterable[(peppy.Sample, peppy.Sample)] pairs: samples
+            and the copies made of them
+        :return SampleHashes: hashes of the sample copies
+        """
+        hashes = SampleHashes()
+        for original, copy in pairs:
+            entry = self._entry(original)
+            if entry is not None:
+                hashes._store(copy, *entry)
+        return hashes
+
+
+def combine_hashes(hashes):
+    """
+    :param Iterable[str] hashes: hexadecimal hashes, in order
+    :return str: hexadecimal hash of the sequence of the hashes
+    """
+    return _digest("\n".join(hashes)).hex()
+
+
+def config_fingerprint(config, amendments):
+    """
+    :param Mapping config: project config
+    :param Iterable[str] amendments: names of the active amendments
+    :return str: hexadecimal fingerprint of the config
+        with the amendments activated
+    """
+    return combine_hashes([_canonical(config), _canonical(list(amendments or []))])
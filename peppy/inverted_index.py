@@ -0,0 +1,302 @@
+"""
+Per-attribute inverted indexes of the Project samples.
+"""
+
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from logging import getLogger
+from math import isnan
+
+from .const import PKG_NAME
+from .multi_value import MultiValue
+
+_LOGGER = getLogger(PKG_NAME)
+
+COMPARISON_OPERATORS = ["==", "!=", "<", "<=", ">", ">="]
+
+
+def _index_keys(value):
+    """
+    Determine the keys a sample attribute value is indexed under.
+
+    List values, e.g. ones merged from the subsample tables, are indexed
+    under each of their elements. Unhashable values are not indexed.
+
+    :param object value: sample attribute value
+    :return tuple: index keys
+    """
+    values = value if isinstance(value, (list, tuple, set, MultiValue)) else [value]
+    keys = []
+    for v in values:
+        try:
+            hash(v)
+        except TypeError:
+            continue
+        if v not in keys:
+            keys.append(v)
+    return tuple(keys)
+
+
+class AttributeIndex(object):
+    """
+    Inverted indexes of the sample attributes, which map the attribute values
+    to the positions of the samples in the Project.
+
+    The index of an attribute is built when it is queried for the first time
+    and then updated incrementally for the edited and added samples.
+
+    :param list[peppy.Sample] samples: samples to index
+    """
+
+    def __init__(self, samples):
+        self.samples = samples
+        self.nrow = 0
+        self._indexed = []
+        self._positions = {}
+        self._buckets = {}
+        self._keys = {}
+        self._sorted = {}
+        self._dirty_samples = set()
+        self._dirty_attrs = set()
+        self._add_new_samples()
+
+    def is_current(self, samples):
+        """
+        Check whether the index can be updated to reflect the samples
+
+        :param list[peppy.Sample] samples: current Project samples
+        :return bool: whether the index is valid for the samples: the indexed
+            samples were not reordered or removed
+        """
+        if samples is not self.samples or len(samples) < self.nrow:
+            return False
+        if not all([a is b for a, b in zip(samples, self._indexed)]):
+            _LOGGER.debug("Samples were reordered or removed")
+            return False
+        return True
+
+    def touch(self, sample, key=None):
+        """
+        Register a Sample edit
+
+        :param peppy.Sample sample: edited sample
+        :param str key: name of the edited attribute, all attributes
+            are considered edited if not provided
+        """
+        self._dirty_samples.add(id(sample))
+        self._dirty_attrs.add(key)
+
+    def _add_new_samples(self):
+        """Register the samples added since the last update"""
+        for i in range(self.nrow, len(self.samples)):
+            sid = id(self.samples[i])
+            self._positions[sid] = i
+            self._dirty_samples.add(sid)
+        self._indexed.extend(self.samples[self.nrow :])
+        if len(self.samples) > self.nrow:
+            self._dirty_attrs.add(None)
+        self.nrow = len(self.samples)
+
+    def _index_sample(self, attr, pos):
+        """Index the attribute value of the sample at the given position"""
+        buckets, keys = self._buckets[attr], self._keys[attr]
+        for k in keys.pop(pos, ()):
+            bucket = buckets[k]
+            bucket.discard(pos)
+            if not bucket:
+                del buckets[k]
+        sample = self.samples[pos]
+        if attr not in sample:
+            return
+        new_keys = _index_keys(sample[attr])
+        if new_keys:
+            keys[pos] = new_keys
+        for k in new_keys:
+            buckets.setdefault(k, set()).add(pos)
+
+    def _update(self):
+        """Apply the registered edits to the built indexes"""
+        self._add_new_samples()
+        if not self._dirty_samples:
+            return
+        if None in self._dirty_attrs:
+            attrs = list(self._buckets)
+            self._sorted = {}
+        else:
+            attrs = [a for a in self._dirty_attrs if a in self._buckets]
+            for a in self._dirty_attrs:
+                self._sorted.pop(a, None)
+        rows = [self._positions[s] for s in self._dirty_samples if s in self._positions]
+        _LOGGER.debug(
+            "Updating indexes of attributes {} for {} samples".format(attrs, len(rows))
+        )
+        for attr in attrs:
+            for pos in rows:
+                self._index_sample(attr, pos)
+        self._dirty_samples = set()
+        self._dirty_attrs = set()
+
+    def _attribute_index(self, attr):
+        """
+        Get the inverted index of an attribute, build it if needed
+
+        :param str attr: attribute name
+        :return dict[object, set[int]]: sample positions keyed by
+            the attribute values
+        """
+        self._update()
+        if attr not in self._buckets:
+            _LOGGER.debug("Building index of attribute: {}".format(attr))
+            self._buckets[attr] = {}
+            self._keys[attr] = {}
+            for pos in range(self.nrow):
+                self._index_sample(attr, pos)
+        return self._buckets[attr]
+
+    def positions(self, attr, values):
+        """
+        Get the positions of the samples which attribute matches
+        any of the values
+
+        :param str attr: attribute name
+        :param Iterable values: attribute values to match
+        :return set[int]: positions of the matching samples
+        """
+        index = self._attribute_index(attr)
+        matched = set()
+        for v in values:
+            try:
+                matched.update(index.get(v, ()))
+            except TypeError:
+                continue
+        return matched
+
+    def groups(self, attrs):
+        """
+        Group the sample positions by the values of the attributes.
+        Samples that lack any of the attributes are not included.
+
+        :param Iterable[str] attrs: attribute names
+        :return OrderedDict[tuple, list[int]]: sorted sample positions keyed by
+            the attribute values, in order of their first appearance
+        """
+        indexes = [self._attribute_index(a) for a in attrs]
+        groups = [((), set(range(self.nrow)))]
+        for index in indexes:
+            if len(groups) * len(index) > self.nrow:
+                return self._scan_groups(attrs)
+            groups = [
+                (k + (v,), b & bucket)
+                for k, b in groups
+                for v, bucket in index.items()
+                if not b.isdisjoint(bucket)
+            ]
+        groups = [(sorted(b), k) for k, b in groups]
+        groups.sort(key=lambda g: g[0][0])
+        return OrderedDict((k, b) for b, k in groups)
+
+    def _scan_groups(self, attrs):
+        """
+        Group the sample positions by the values of the attributes,
+        sample by sample. Used for high cardinality attributes, for which
+        intersecting the indexes is slower.
+
+        :param Iterable[str] attrs: attribute names
+        :return OrderedDict[tuple, list[int]]: sorted sample positions keyed by
+            the attribute values, in order of their first appearance
+        """
+        keys = [self._keys[a] for a in attrs]
+        groups = OrderedDict()
+        for pos in range(self.nrow):
+            combos = [()]
+            for k in keys:
+                combos = [c + (v,) for c in combos for v in k.get(pos, ())]
+            for c in combos:
+                groups.setdefault(c, []).append(pos)
+        return groups
+
+    def _sorted_index(self, attr):
+        """
+        Get the sorted index of an attribute, build it if needed.
+        The index is rebuilt on the first query after the attribute was edited.
+
+        :param str attr: attribute name
+        :return (list, list[int]): sorted attribute values and
+            the corresponding sample positions
+        :raise TypeError: if the attribute values can't be compared
+        """
+        self._update()
+        if attr not in self._sorted:
+            _LOGGER.debug("Building sorted index of attribute: {}".format(attr))
+            pairs = []
+            for pos in range(self.nrow):
+                sample = self.samples[pos]
+                if attr in sample:
+                    value = sample[attr]
+                    if not isinstance(
+                        value, (list, tuple, set, dict, MultiValue)
+                    ) and not (isinstance(value, float) and isnan(value)):
+                        pairs.append((value, pos))
+            try:
+                pairs.sort()
+            except TypeError as e:
+                raise TypeError(
+                    "Values of attribute '{}' can't be ordered: {}. Declare "
+                    "the attribute type to compare the values".format(attr, e)
+                )
+            self._sorted[attr] = ([p[0] for p in pairs], [p[1] for p in pairs])
+        return self._sorted[attr]
+
+    def compared(self, attr, op, value):
+        """
+        Get the positions of the samples which attribute value
+        satisfies the comparison
+
+        :param str attr: attribute name
+        :param str op: comparison operator, one of: ==, !=, <, <=, >, >=
+        :param object value: value to compare with
+        :return list[int]: sorted positions of the matching samples
+        :raise ValueError: if the operator is not supported
+        :raise TypeError: if the attribute values can't be compared with the value
+        """
+        if op not in COMPARISON_OPERATORS:
+            raise ValueError(
+                "Unsupported operator: {}; use one of: {}".format(
+                    op, COMPARISON_OPERATORS
+                )
+            )
+        values, positions = self._sorted_index(attr)
+        try:
+            lo, hi = bisect_left(values, value), bisect_right(values, value)
+        except TypeError as e:
+            raise TypeError(
+                "Values of attribute '{}' can't be compared with {!r}: {}".format(
+                    attr, value, e
+                )
+            )
+        matched = {
+            "==": positions[lo:hi],
+            "!=": positions[:lo] + positions[hi:],
+            "<": positions[:lo],
+            "<=": positions[:hi],
+            ">": positions[hi:],
+            ">=": positions[lo:],
+        }[op]
+        return sorted(matched)
+
+    def ordered(self, attr, descending=False):
+        """
+        Get the positions of the samples ordered by the attribute value.
+        Samples with equal values are kept in the Project order. Samples that
+        lack the attribute, or have a list value, are placed last.
+
+        :param str attr: attribute name
+        :param bool descending: whether to order by decreasing value
+        :return list[int]: sample positions
+        """
+        values, positions = self._sorted_index(attr)
+        if descending:
+            order = sorted(range(len(values)), key=values.__getitem__, reverse=True)
+            positions = [positions[i] for i in order]
+        ordered = set(positions)
+        return positions + [i for i in range(self.nrow) if i not in ordered]
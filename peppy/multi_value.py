@@ -0,0 +1,197 @@
+"""
+Compact storage of the multi-valued sample attributes merged
+from the subsample tables.
+"""
+
+from collections import OrderedDict
+from logging import getLogger
+
+try:
+    from collections.abc import Sequence
+except ImportError:
+    # for py2
+    from collections import Sequence
+
+import numpy as np
+import pandas as pd
+
+from .const import PKG_NAME, SUBSAMPLE_NAME_ATTR
+
+_LOGGER = getLogger(PKG_NAME)
+
+
+class MultiValueColumn(object):
+    """
+    Values of a multi-valued attribute of many samples, stored in a single
+    buffer. The values of each sample are a contiguous range of the buffer,
+    delimited by an array of offsets.
+
+    :param list values: values of all the samples, grouped by sample
+    :param numpy.ndarray offsets: positions in the buffer at which the values
+        of consecutive samples start, followed by the buffer length
+    """
+
+    __slots__ = ("values", "offsets")
+
+    def __init__(self, values, offsets):
+        self.values = values
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def view(self, i):
+        """
+        Get the values of a sample
+
+        :param int i: position of the sample in the column
+        :return MultiValue: read-only view of the values
+        """
+        return MultiValue(self, i)
+
+
+class MultiValue(Sequence):
+    """
+    Read-only, list-like view of the values of a multi-valued attribute
+    of a sample, e.g. one merged from a subsample table.
+
+    The views compare equal to the lists of the same values.
+
+    :param MultiValueColumn column: column the values are stored in
+    :param int index: position of the sample in the column
+    """
+
+    __slots__ = ("column", "index")
+
+    def __init__(self, column, index):
+        self.column = column
+        self.index = index
+
+    def _bounds(self):
+        """
+        :return (int, int): range of the values in the column buffer
+        """
+        offsets = self.column.offsets
+        return int(offsets[self.index]), int(offsets[self.index + 1])
+
+    def __len__(self):
+        start, stop = self._bounds()
+        return stop - start
+
+    def __getitem__(self, item):
+        start, stop = self._bounds()
+        if isinstance(item, slice):
+            return self.column.values[start:stop][item]
+        if item < 0:
+            item += stop - start
+        if not 0 <= item < stop - start:
+            raise IndexError("{} index out of range".format(self.__class__.__name__))
+        return self.column.values[start + item]
+
+    def __iter__(self):
+        start, stop = self._bounds()
+        return iter(self.column.values[start:stop])
+
+    def __eq__(self, other):
+        if isinstance(other, (MultiValue, list, tuple)):
+            return self.tolist() == list(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        eq = self.__eq__(other)
+        return eq if eq is NotImplemented else not eq
+
+    __hash__ = None
+
+    def __add__(self, other):
+        return self.tolist() + list(other)
+
+    def __radd__(self, other):
+        return list(other) + self.tolist()
+
+    def __repr__(self):
+        return repr(self.tolist())
+
+    def __reduce__(self):
+        return self.__class__, (self.column, self.index)
+
+    def tolist(self):
+        """
+        Copy the values to a list
+
+        :return list: values
+        """
+        start, stop = self._bounds()
+        return self.column.values[start:stop]
+
+
+def is_multi_value(value):
+    """
+    Check whether a sample attribute value has multiple values
+
+    :param object value: attribute value
+    :return bool: whether the value is a list or a multi-value view
+    """
+    return isinstance(value, (list, MultiValue))
+
+
+def _grouped_column(codes, values, ngroups):
+    """
+    Create a column of the values grouped by the group codes.
+    Values with negative codes are excluded.
+
+    :param numpy.ndarray codes: group codes of the values
+    :param numpy.ndarray values: object array of values
+    :param int ngroups: number of groups
+    :return MultiValueColumn: column with a range of values for each group
+    """
+    keep = codes >= 0
+    order = np.flatnonzero(keep)[np.argsort(codes[keep], kind="stable")]
+    counts = np.bincount(codes[keep], minlength=ngroups)
+    offsets = np.zeros(ngroups + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return MultiValueColumn(values[order].tolist(), offsets)
+
+
+def merge_subsample_table(sst, colname):
+    """
+    Group the subsample table rows by the sample names and store the values
+    of every attribute as a multi-valued column.
+
+    An attribute is merged into a sample only if any of the sample's rows
+    defines it. The rows that do not define the subsample name attribute
+    are identified by the row labels.
+
+    :param pandas.DataFrame sst: subsample table
+    :param str colname: name of the column with the sample names
+    :return (dict[str, int], OrderedDict[str, (MultiValueColumn, numpy.ndarray)],
+        (MultiValueColumn, numpy.ndarray)): positions of the sample names in
+        the columns, the merged columns with the masks of the samples that
+        define the attributes, and the subsample names generated from the row
+        labels with the mask of the samples that need them
+    """
+    codes, names = pd.factorize(sst[colname], sort=False)
+    ngroups = len(names)
+    merged = OrderedDict()
+    for col in sst.columns:
+        if col == colname:
+            continue
+        values = sst[col].to_numpy(dtype=object)
+        defined = np.bincount(
+            codes[codes >= 0],
+            weights=sst[col].notna().to_numpy()[codes >= 0],
+            minlength=ngroups,
+        ).astype(bool)
+        present = np.array([bool(v) for v in values], dtype=bool)
+        merged[col] = (
+            _grouped_column(np.where(present, codes, -1), values, ngroups),
+            defined,
+        )
+    labels = np.array([str(i) for i in sst.index], dtype=object)
+    if SUBSAMPLE_NAME_ATTR in merged:
+        undefined = ~merged[SUBSAMPLE_NAME_ATTR][1]
+    else:
+        undefined = np.ones(ngroups, dtype=bool)
+    generated = (_grouped_column(codes, labels, ngroups), undefined)
+    _LOGGER.debug("Merged {} rows of {} samples".format(len(sst), ngroups))
+    return {n: i for i, n in enumerate(names)}, merged, generated
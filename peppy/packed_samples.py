@@ -0,0 +1,158 @@
+"""
+Compact, column-wise representation of the Sample objects, used to pickle
+the projects.
+"""
+
+from collections import OrderedDict
+from logging import getLogger
+
+import numpy as np
+
+from .const import PKG_NAME, PRJ_REF
+from .sample import _restored_sample
+
+_LOGGER = getLogger(PKG_NAME)
+
+
+_STRINGS = "str"
+_STRING_LISTS = "list"
+
+
+def _factorize(values):
+    """
+    :param list values: hashable values
+    :return (numpy.ndarray, list): codes of the values, with the
+        smallest sufficient integer type, and the distinct values
+    """
+    uniques, codes = {}, []
+    for v in values:
+        codes.append(uniques.setdefault(v, len(uniques)))
+    dtype = np.min_scalar_type(max(len(uniques) - 1, 0))
+    return np.array(codes, dtype=dtype), list(uniques)
+
+
+def _encode_strings(strings):
+    """
+    Store the strings in a single buffer
+
+    :param Iterable[str] strings: strings to store
+    :return (numpy.ndarray, numpy.ndarray): UTF-8 encoded strings
+        and the offsets at which they start, followed by the buffer length
+    """
+    encoded = [s.encode("utf-8", "surrogatepass") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _decode_strings(buffer, offsets):
+    """
+    :param numpy.ndarray buffer: UTF-8 encoded strings
+    :param numpy.ndarray offsets: offsets at which the strings start,
+        followed by the buffer length
+    :return list[str]: strings
+    """
+    data = buffer.tobytes()
+    bounds = offsets.tolist()
+    return [
+        data[start:stop].decode("utf-8", "surrogatepass")
+        for start, stop in zip(bounds[:-1], bounds[1:])
+    ]
+
+
+class PackedSamples(object):
+    """
+    Attributes of many samples, stored column-wise.
+
+    The string attributes are dictionary encoded: every distinct value is
+    stored once in a contiguous buffer and the samples refer to the values
+    with an array of codes. The arrays are pickled out-of-band with pickle
+    protocol 5 if a buffer callback is provided. The attributes with lists
+    of strings are dictionary encoded as well, and unpacked to new lists.
+    Other values are stored as lists.
+
+    The samples bound to a project are stored without the project reference,
+    which is set to the project the samples are unpacked for.
+
+    :param Iterable[peppy.Sample] samples: samples to pack
+    :param peppy.Project prj: project the samples belong to
+    """
+
+    def __init__(self, samples, prj=None):
+        samples = list(samples)
+        self.size = len(samples)
+        self.cls = type(samples[0]) if samples else None
+        layouts, layout_ids, columns, bound = {}, [], OrderedDict(), []
+        for s in samples:
+            items = OrderedDict.items(s)
+            keys = tuple(k for k, _ in items)
+            layout_ids.append(layouts.setdefault(keys, len(layouts)))
+            for k, v in items:
+                if k == PRJ_REF and v is prj and prj is not None:
+                    bound.append(True)
+                    v = None
+                elif k == PRJ_REF:
+                    bound.append(False)
+                columns.setdefault(k, []).append(v)
+        self.layouts = list(layouts)
+        self.layout_ids = np.array(layout_ids, dtype=np.int32)
+        self.bound = np.array(bound, dtype=bool)
+        self.columns = OrderedDict((k, self._pack(v)) for k, v in columns.items())
+        _LOGGER.debug(
+            "Packed {} samples; {} attributes, {} layouts".format(
+                self.size, len(self.columns), len(self.layouts)
+            )
+        )
+
+    @staticmethod
+    def _pack(values):
+        """
+        :param list values: values of an attribute
+        :return tuple | list: dictionary encoded strings or lists of strings,
+            or the values
+        """
+        if all(type(v) is str for v in values):
+            codes, uniques = _factorize(values)
+            return (_STRINGS, codes) + _encode_strings(uniques)
+        if all(type(v) is list and all(type(i) is str for i in v) for v in values):
+            codes, uniques = _factorize([tuple(v) for v in values])
+            return _STRING_LISTS, codes, list(uniques)
+        return values
+
+    @staticmethod
+    def _unpack(column):
+        """
+        :param tuple | list column: packed values of an attribute
+        :return list: values
+        """
+        if isinstance(column, list):
+            return column
+        if column[0] == _STRINGS:
+            uniques = _decode_strings(*column[2:])
+            return [uniques[c] for c in column[1].tolist()]
+        uniques = column[2]
+        return [list(uniques[c]) for c in column[1].tolist()]
+
+    def __len__(self):
+        return self.size
+
+    def unpack(self, prj=None):
+        """
+        Create the Sample objects
+
+        :param peppy.Project prj: project to bind the samples to
+        :return list[peppy.Sample]: samples
+        """
+        columns = {k: iter(self._unpack(v)) for k, v in self.columns.items()}
+        bound = iter(self.bound.tolist())
+        samples = []
+        for layout_id in self.layout_ids.tolist():
+            items = []
+            for k in self.layouts[layout_id]:
+                v = next(columns[k])
+                if k == PRJ_REF and next(bound):
+                    v = prj
+                items.append((k, v))
+            samples.append(_restored_sample(self.cls, items))
+        _LOGGER.debug("Unpacked {} samples".format(len(samples)))
+        return samples
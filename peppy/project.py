@@ -1,23 +1,96 @@
 """
 Build a Project object.
 """
+try:
+    from collections.abc import Mapping
+except ImportError:
+    # for py2
+    from collections import Mapping
+
+import glob
+import io
 import os
-from collections import Mapping
+import shutil
+import sys
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from copy import deepcopy
 from logging import getLogger
 
+import numpy as np
 import pandas as pd
 from attmap import PathExAttMap
-from ubiquerg import is_url
+from ubiquerg import expandpath, is_url
 
+from .arrow import records_to_arrow, write_arrow_ipc
+from .column_types import apply_column_types, encode_categorical, resolve_column_types
+from .columnar import ColumnarModifiers
 from .const import *
+from .diff import ProjectDiff, diff_samples
 from .exceptions import *
-from .sample import Sample
-from .utils import copy, load_yaml, make_abs_via_cfg, make_list
+from .external_merge import iter_joined_chunks, merged_rows, sorted_runs
+from .fingerprint import SampleHashes, combine_hashes, config_fingerprint
+from .inverted_index import AttributeIndex
+from .multi_value import MultiValue, merge_subsample_table
+from .packed_samples import PackedSamples
+from .row_index import RowIndex
+from .sample import Sample, SharedAttributes, has_mutable_values, samples_to_dicts
+from .shared_samples import SharedSamples
+from .utils import (
+    dump_yaml,
+    grab_project_data,
+    load_yaml,
+    make_abs_via_cfg,
+    make_list,
+    write_atomically,
+)
+from .watch import (
+    ProjectWatcher,
+    SourceRows,
+    TableMark,
+    file_changed,
+    file_state,
+    same_file_state,
+)
 
 _LOGGER = getLogger(PKG_NAME)
 
+# derived and transient state, which is reset rather than pickled
+_UNPICKLED_ITEMS = (
+    "_samples",
+    "_deferred_samples",
+    "_shared_samples",
+    "_config_shared",
+    "_sample_table",
+    "_table_sample_ids",
+    "_attr_index",
+    "_subsample_index",
+    "_batch_depth",
+    "_dirty_samples",
+    "_dirty_columns",
+    "_sample_hashes",
+    "_samples_digest",
+    "_source_rows",
+)
+
+# bookkeeping of the sources and the options, ignored when comparing projects;
+# the samples are compared instead
+_UNCOMPARED_ITEMS = _UNPICKLED_ITEMS + (
+    "_source_files",
+    "_sample_table_mark",
+    "_vectorized_modifiers",
+    "_infer_column_types",
+    "_categorical_threshold",
+    "_keep_raw_tables",
+    "_raw_tables_released",
+    SAMPLE_EDIT_FLAG_KEY,
+    SAMPLE_DF_KEY,
+    SUBSAMPLE_DF_KEY,
+)
+
 
-@copy
 class Project(PathExAttMap):
     """
     A class to model a Project (collection of samples and metadata).
@@ -30,6 +103,19 @@ class Project(PathExAttMap):
         the subsample_table index to
     :param str | Iterable[str] amendments: names of the amendments to activate
     :param Iterable[str] amendments: amendments to use within configuration file
+    :param bool defer_samples_creation: whether the sample creation should be skipped
+    :param bool vectorized_modifiers: whether the sample modifiers should be
+        applied to the sample table with column operations before the Sample
+        objects are created, rather than to each Sample object
+    :param bool infer_column_types: whether the numeric sample table columns
+        should be converted to ints and floats. The column types can also be
+        declared in the config, in the sample_table_types section
+    :param int categorical_threshold: maximum number of distinct values of
+        a sample table column to store it dictionary encoded, as a pandas
+        categorical column. Columns are not encoded by default
+    :param bool keep_raw_tables: whether the sample and subsample tables read
+        from the files should be kept after the samples are created. By default
+        they are released, the samples being the only copy of the metadata
 
     :Example:
 
@@ -47,6 +133,10 @@ class Project(PathExAttMap):
         sample_table_index=None,
         subsample_table_index=None,
         defer_samples_creation=False,
+        vectorized_modifiers=False,
+        infer_column_types=False,
+        categorical_threshold=None,
+        keep_raw_tables=False,
     ):
         _LOGGER.debug(
             "Creating {}{}".format(
@@ -54,12 +144,34 @@ class Project(PathExAttMap):
             )
         )
         super(Project, self).__init__()
+        self._batch_depth = 0
+        self._dirty_samples = set()
+        self._dirty_columns = set()
+        self._sample_table = None
+        self._attr_index = None
+        self._subsample_index = None
+        self._sample_hashes = SampleHashes()
+        self._samples_digest = None
+        if self.get("_shared_samples"):
+            # reinitialized, the copies keep the samples they share
+            self._detach_shared_samples()
+        self._shared_samples = []
+        self._config_shared = self.get("_config_shared", False)
+        self._source_files = []
+        self._source_rows = None
+        self._sample_table_mark = None
         if isinstance(cfg, str):
             self[CONFIG_FILE_KEY] = cfg
             self.parse_config_file(cfg, amendments)
         else:
             self[CONFIG_FILE_KEY] = None
         self._samples = []
+        self._deferred_samples = None
+        self._vectorized_modifiers = vectorized_modifiers
+        self._infer_column_types = infer_column_types
+        self._categorical_threshold = categorical_threshold
+        self._keep_raw_tables = keep_raw_tables
+        self._raw_tables_released = False
         self[SAMPLE_EDIT_FLAG_KEY] = False
         self.st_index = sample_table_index or SAMPLE_NAME_ATTR
         self.sst_index = subsample_table_index or [
@@ -70,23 +182,114 @@ class Project(PathExAttMap):
         self.description = self.get_description()
         if not defer_samples_creation:
             self.create_samples()
-        self._sample_table = self._get_table_from_samples(index=self.st_index)
 
     def create_samples(self):
         """
         Populate Project with Sample objects
         """
-        self._samples = self.load_samples()
-        self.modify_samples()
+        self._attr_index = None
+        self._deferred_samples = None
+        self._sample_hashes = SampleHashes()
+        self._samples_digest = None
+        with self.batch_edit():
+            if self._vectorized_modifiers:
+                self._samples = self.load_modified_samples()
+            else:
+                self._samples = self.load_samples()
+                self.modify_samples()
+        if not self._keep_raw_tables:
+            self._release_raw_tables()
+
+    def _release_raw_tables(self):
+        """
+        Release the sample and subsample tables read from the files,
+        which are not needed once the samples are created
+        """
+        for key in [SAMPLE_DF_KEY, SUBSAMPLE_DF_KEY]:
+            if self.get(key) is not None:
+                _LOGGER.debug("Releasing raw table: {}".format(key))
+                self[key] = None
+                self._raw_tables_released = True
+
+    @contextmanager
+    def batch_edit(self):
+        """
+        Context manager for bulk Sample edits.
+
+        Sample edits performed within the context only record the touched
+        samples and attributes, rather than invalidating the sample table on
+        every write. The sample table is invalidated once, when the outermost
+        context exits.
+
+        :Example:
+
+        .. code-block:: python
+
+            with prj.batch_edit():
+                for s in prj.samples:
+                    s.genome = "hg38"
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self._commit_sample_edits()
+
+    def _sample_touched(self, sample, key=None):
+        """
+        Register a Sample edit
+
+        :param peppy.Sample sample: edited sample
+        :param str key: name of the edited attribute, all attributes
+            are considered edited if not provided
+        """
+        if self._shared_samples:
+            self._detach_shared_samples()
+        if self._attr_index is not None:
+            self._attr_index.touch(sample, key)
+        self._sample_hashes.discard(sample)
+        self._samples_digest = None
+        if self._sample_table is None:
+            # no table has been built yet, nothing to invalidate
+            return
+        self._dirty_samples.add(id(sample))
+        self._dirty_columns.add(key)
+        if not self._batch_depth and not self[SAMPLE_EDIT_FLAG_KEY]:
+            self[SAMPLE_EDIT_FLAG_KEY] = True
+
+    def _commit_sample_edits(self):
+        """
+        Invalidate the sample table if any samples were edited within
+        a batch edit context
+        """
+        if self._dirty_samples and not self[SAMPLE_EDIT_FLAG_KEY]:
+            _LOGGER.debug(
+                "Committing edits of {} samples".format(len(self._dirty_samples))
+            )
+            self[SAMPLE_EDIT_FLAG_KEY] = True
 
     def _reinit(self):
         """
         Clear all object attributes and initialize again
         """
         cfg_path = self[CONFIG_FILE_KEY] if CONFIG_FILE_KEY in self else None
+        vectorized = self.get("_vectorized_modifiers", False)
+        infer_types = self.get("_infer_column_types", False)
+        threshold = self.get("_categorical_threshold")
+        keep_raw = self.get("_keep_raw_tables", False)
+        if self.get("_shared_samples"):
+            self._detach_shared_samples()
         for attr in self.keys():
             del self[attr]
-        self.__init__(cfg=cfg_path)
+        self.__init__(
+            cfg=cfg_path,
+            vectorized_modifiers=vectorized,
+            infer_column_types=infer_types,
+            categorical_threshold=threshold,
+            keep_raw_tables=keep_raw,
+        )
 
     def _get_table_from_samples(self, index):
         """
@@ -96,11 +299,44 @@ class Project(PathExAttMap):
         :param str | Iterable[str] index: name of the columns to set the index to
         :return pandas.DataFrame: a data frame with current samples attributes
         """
-        df = pd.DataFrame()
-        for sample in self.samples:
-            sd = sample.to_dict()
-            ser = pd.Series({k: v for (k, v) in sd.items() if not k.startswith("_")})
-            df = df.append(ser, ignore_index=True)
+        samples = self.samples or []
+        df = pd.DataFrame(samples_to_dicts(samples))
+        self._table_sample_ids = pd.Index([id(s) for s in samples])
+        self._dirty_samples = set()
+        self._dirty_columns = set()
+        self[SAMPLE_EDIT_FLAG_KEY] = False
+        return self._set_table_index(self._encode_table(df), index)
+
+    def _index_columns(self):
+        """
+        :return list[str]: names of the sample table index columns
+        """
+        if isinstance(self.st_index, str):
+            return [self.st_index]
+        return list(self.st_index)
+
+    def _encode_table(self, df):
+        """
+        Dictionary encode the low cardinality sample table columns,
+        if a categorical threshold was set
+
+        :param pandas.DataFrame df: sample table
+        :return pandas.DataFrame: sample table with the columns encoded
+        """
+        if self._categorical_threshold is None:
+            return df
+        return encode_categorical(
+            df, self._categorical_threshold, skip=self._index_columns()
+        )
+
+    def _set_table_index(self, df, index):
+        """
+        Set the sample table index, if the requested columns exist
+
+        :param pandas.DataFrame df: sample table
+        :param str | Iterable[str] index: name of the columns to set the index to
+        :return pandas.DataFrame: a data frame with the index set
+        """
         index = [index] if isinstance(index, str) else index
         if not all([i in df.columns for i in index]):
             _LOGGER.debug(
@@ -114,6 +350,68 @@ class Project(PathExAttMap):
         df.set_index(keys=index, drop=False, inplace=True)
         return df
 
+    def _patch_table_from_samples(self, index):
+        """
+        Update the rows and columns of the stashed sample table that
+        correspond to the edited and added samples. The patched columns
+        get the dtypes and the order they have in a regenerated table.
+
+        :param str | Iterable[str] index: name of the columns to set the index to
+        :return pandas.DataFrame | None: a data frame with current samples
+            attributes or None if the table can't be patched and has to be
+            regenerated
+        """
+        df = self.get("_sample_table")
+        ids = self.get("_table_sample_ids")
+        samples = self.samples or []
+        if df is None or ids is None or not self._dirty_samples:
+            return None
+        nrow = len(df)
+        if len(ids) != nrow or not ids.is_unique:
+            return None
+        if len(samples) < nrow or not ids.equals(
+            pd.Index([id(s) for s in samples[:nrow]])
+        ):
+            _LOGGER.debug("Samples were reordered or removed")
+            return None
+        rows = ids.get_indexer(list(self._dirty_samples))
+        rows = sorted(set(rows[rows >= 0]))
+        records = samples_to_dicts([samples[i] for i in rows])
+        if None in self._dirty_columns:
+            cols = set().union(df.columns, *records)
+        else:
+            cols = {c for c in self._dirty_columns if not c.startswith("_")}
+        _LOGGER.debug(
+            "Patching {} sample_table rows; columns: {}".format(len(rows), cols)
+        )
+        df = df.reset_index(drop=True)
+        for col in cols:
+            if col in df.columns:
+                df[col] = df[col].astype(object)
+            else:
+                df[col] = pd.Series(np.nan, index=df.index, dtype=object)
+        for col in cols:
+            loc = df.columns.get_loc(col)
+            for i, r in zip(rows, records):
+                df.iat[i, loc] = r.get(col, np.nan)
+            if df[col].isna().all() and not _first_seen_order(samples, [col]):
+                del df[col]
+        new = samples[nrow:]
+        if new:
+            added = pd.DataFrame(samples_to_dicts(new))
+            df = pd.concat([df.astype(object), added.astype(object)], ignore_index=True)
+            ids = ids.append(pd.Index([id(s) for s in new]))
+            cols = set(df.columns)
+        order = _first_seen_order(samples, df.columns)
+        if len(order) != len(df.columns):
+            _LOGGER.debug("Sample table columns do not match the samples")
+            return None
+        df = _records_dtypes(df[order], cols)
+        self._table_sample_ids = ids
+        self._dirty_samples = set()
+        self._dirty_columns = set()
+        return self._set_table_index(self._encode_table(df), index)
+
     def parse_config_file(self, cfg_path, amendments=None):
         """
         Parse provided yaml config file and check required fields exist.
@@ -124,8 +422,10 @@ class Project(PathExAttMap):
         """
         if CONFIG_KEY not in self:
             self[CONFIG_KEY] = PathExAttMap()
+        self._own_config()
         if not os.path.exists(cfg_path) and not is_url(cfg_path):
             raise OSError(f"Project config file path does not exist: {cfg_path}")
+        self._record_sources(CONFIG_FILE_KEY, [cfg_path], reset=False)
         config = load_yaml(cfg_path)
         assert isinstance(
             config, Mapping
@@ -198,7 +498,103 @@ class Project(PathExAttMap):
             samples_list.append(Sample(r.dropna(), prj=self))
         return samples_list
 
+    def load_modified_samples(self):
+        """
+        Apply the sample modifiers to the sample table with column operations
+        and create Sample objects from the result.
+
+        The produced samples are identical to the ones created with
+        :meth:`load_samples` followed by :meth:`modify_samples`.
+
+        :return list[peppy.Sample]: modified samples
+        """
+        self._read_sample_data()
+        if SAMPLE_DF_KEY not in self or self[SAMPLE_DF_KEY] is None:
+            return []
+        self._check_modifiers()
+        modifiers = ColumnarModifiers(self)
+        tab = modifiers.run(self[SAMPLE_DF_KEY], self.get(SUBSAMPLE_DF_KEY))
+        return tab.to_samples(self)
+
+    def iter_samples(self, chunksize=10000, tmpdir=None):
+        """
+        Stream the samples of a project whose tables do not fit in memory.
+
+        The sample and subsample tables are read in chunks, sorted by the
+        sample names into temporary files and joined with a sort-merge, so
+        that only a chunk of samples, with their subsample rows, is held
+        in memory at a time. The sample modifiers are applied to every
+        chunk with column operations, like with ``vectorized_modifiers``.
+
+        The samples are produced in the order of the sample names and are not
+        stored in the project. The sample table must have the sample names
+        column. The declared column types are applied, but not inferred.
+
+        :param int chunksize: number of the table rows to process at a time
+        :param str tmpdir: directory to create the temporary files in,
+            the default one if not provided
+        :return Iterator[peppy.Sample]: modified samples
+        :raise InvalidSampleTableFileException: if the sample table
+            has no sample names column
+        """
+        try:
+            st = self[CONFIG_KEY][CFG_SAMPLE_TABLE_KEY]
+        except KeyError:
+            st = None
+        if not st:
+            _LOGGER.debug("No {} to stream".format(CFG_SAMPLE_TABLE_KEY))
+            return
+        self._check_modifiers()
+        colname = self.sample_name_colname
+        sst = self[CONFIG_KEY].get(CFG_SUBSAMPLE_TABLE_KEY)
+        workdir = tempfile.mkdtemp(prefix="peppy_", dir=tmpdir)
+        try:
+            try:
+                st_runs = sorted_runs(
+                    _read_table(st, chunksize=chunksize), colname, workdir
+                )
+            except KeyError:
+                raise InvalidSampleTableFileException(
+                    "{} is missing '{}' column, which is required to stream "
+                    "the samples".format(CFG_SAMPLE_TABLE_KEY, colname)
+                )
+            sst_runs = []
+            for i, pth in enumerate(make_list(sst or [], str)):
+                rundir = os.path.join(workdir, "sst{}".format(i))
+                os.mkdir(rundir)
+                sst_runs.append(
+                    sorted_runs(_read_table(pth, chunksize=chunksize), colname, rundir)
+                )
+            chunks = iter_joined_chunks(
+                (st_runs[0], merged_rows(st_runs[1])),
+                [(cols, merged_rows(runs)) for cols, runs in sst_runs],
+                chunksize,
+            )
+            modifiers = ColumnarModifiers(self)
+            for df, ssts in chunks:
+                df = apply_column_types(
+                    df, types=self[CONFIG_KEY].get(CFG_SAMPLE_TABLE_TYPES_KEY)
+                )
+                _LOGGER.debug("Streaming a chunk of {} samples".format(len(df)))
+                for s in modifiers.run(df, ssts).to_samples(self):
+                    yield s
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
     def modify_samples(self):
+        self._check_modifiers()
+        self.attr_remove()
+        self.attr_constants()
+        self.attr_synonyms()
+        self.attr_imply()
+        self._assert_samples_have_names()
+        self.attr_merge()
+        self.attr_derive()
+
+    def _check_modifiers(self):
+        """
+        Warn about the unrecognized sample modifiers
+        """
         if self._modifier_exists():
             mod_diff = set(self[CONFIG_KEY][SAMPLE_MODS_KEY].keys()) - set(
                 SAMPLE_MODIFIERS
@@ -208,13 +604,6 @@ class Project(PathExAttMap):
                     "Config '{}' section contains unrecognized "
                     "subsections: {}".format(SAMPLE_MODS_KEY, mod_diff)
                 )
-        self.attr_remove()
-        self.attr_constants()
-        self.attr_synonyms()
-        self.attr_imply()
-        self._assert_samples_have_names()
-        self.attr_merge()
-        self.attr_derive()
 
     def _modifier_exists(self, modifier_key=None):
         """
@@ -255,24 +644,43 @@ class Project(PathExAttMap):
         """
         Update each Sample with constants declared by a Project.
         If Project does not declare constants, no update occurs.
+
+        The constants are stored once and shared by the samples, in which
+        they are resolved on lookup unless a sample defines its own value.
         """
         if self._modifier_exists(CONSTANT_KEY):
             to_append = self[CONFIG_KEY][SAMPLE_MODS_KEY][CONSTANT_KEY]
             _LOGGER.debug("Applying constant attributes: {}".format(to_append))
-            for attr, val in to_append.items():
-                [s.update({attr: val}) for s in self.samples if attr not in s]
+            shared = SharedAttributes((to_append or {}).items())
+            for s in self.samples:
+                s[SHARED_ATTRS_KEY] = shared
 
     def attr_synonyms(self):
         """
         Copy attribute values for all samples to a new one
+
+        The new attributes are declared as aliases shared by the samples,
+        which resolve them on lookup from the attributes they duplicate.
+        Values are copied only to the samples that already define
+        any of the new attributes.
         """
         if self._modifier_exists(DUPLICATED_KEY):
             synonyms = self[CONFIG_KEY][SAMPLE_MODS_KEY][DUPLICATED_KEY]
             _LOGGER.debug("Applying synonyms: {}".format(synonyms))
+            aliases = list((synonyms or {}).items())
+            holders = {}
             for sample in self.samples:
-                for attr, new in synonyms.items():
-                    if attr in sample:
-                        setattr(sample, new, getattr(sample, attr))
+                if any([dict.__contains__(sample, new) for _, new in aliases]):
+                    for attr, new in aliases:
+                        if attr in sample:
+                            setattr(sample, new, getattr(sample, attr))
+                    continue
+                shared = dict.get(sample, SHARED_ATTRS_KEY)
+                if id(shared) not in holders:
+                    holders[id(shared)] = (shared or SharedAttributes()).with_aliases(
+                        aliases
+                    )
+                sample[SHARED_ATTRS_KEY] = holders[id(shared)]
 
     def _assert_samples_have_names(self):
         """
@@ -317,75 +725,53 @@ class Project(PathExAttMap):
         """
         Merge sample subannotations (from subsample table) with
         sample annotations (from sample_table)
+
+        The merged values of an attribute are stored in a single buffer,
+        the samples get read-only, list-like views of their values.
         """
         if SUBSAMPLE_DF_KEY not in self or self[SUBSAMPLE_DF_KEY] is None:
             _LOGGER.debug("No {} found, skipping merge".format(CFG_SUBSAMPLE_TABLE_KEY))
             return
+        sample_colname = self.sample_name_colname
         for subsample_table in self[SUBSAMPLE_DF_KEY]:
-            for n in list(subsample_table[self.sample_name_colname]):
-                if n not in [s[SAMPLE_NAME_ATTR] for s in self.samples]:
+            if sample_colname not in subsample_table.columns:
+                raise KeyError(
+                    "Subannotation requires column '{}'.".format(sample_colname)
+                )
+            _LOGGER.debug(
+                "Using '{}' as sample name column from "
+                "subannotation table".format(sample_colname)
+            )
+            positions, merged, generated = merge_subsample_table(
+                subsample_table, sample_colname
+            )
+            sample_names = set()
+            for sample in self.samples:
+                try:
+                    sample_names.add(sample[SAMPLE_NAME_ATTR])
+                except TypeError:
+                    continue
+            for n in list(subsample_table[sample_colname]):
+                if n not in sample_names:
                     _LOGGER.warning(
                         ("Couldn't find matching sample for " "subsample: {}").format(n)
                     )
             for sample in self.samples:
-                sample_colname = self.sample_name_colname
-                if sample_colname not in subsample_table.columns:
-                    raise KeyError(
-                        "Subannotation requires column '{}'.".format(sample_colname)
-                    )
-                _LOGGER.debug(
-                    "Using '{}' as sample name column from "
-                    "subannotation table".format(sample_colname)
-                )
-                sample_indexer = (
-                    subsample_table[sample_colname] == sample[SAMPLE_NAME_ATTR]
-                )
-                this_sample_rows = subsample_table[sample_indexer].dropna(
-                    how="all", axis=1
-                )
-                if len(this_sample_rows) == 0:
+                try:
+                    i = positions[sample[SAMPLE_NAME_ATTR]]
+                except (KeyError, TypeError):
                     _LOGGER.debug(
                         "No merge rows for sample '%s', skipping",
                         sample[SAMPLE_NAME_ATTR],
                     )
                     continue
-                _LOGGER.debug("%d rows to merge", len(this_sample_rows))
-                _LOGGER.debug(
-                    "Merge rows dict: " "{}".format(this_sample_rows.to_dict())
+                merged_attrs = OrderedDict(
+                    (attname, column.view(i))
+                    for attname, (column, defined) in merged.items()
+                    if defined[i]
                 )
-
-                merged_attrs = {key: list() for key in this_sample_rows.columns}
-                _LOGGER.debug(this_sample_rows)
-                for subsample_row_id, row in this_sample_rows.iterrows():
-                    try:
-                        row[SUBSAMPLE_NAME_ATTR]
-                    except KeyError:
-                        row[SUBSAMPLE_NAME_ATTR] = str(subsample_row_id)
-                    rowdata = row.to_dict()
-
-                    def _select_new_attval(merged_attrs, attname, attval):
-                        """Select new attribute value for the merged columns
-                        dictionary"""
-                        if attname in merged_attrs:
-                            return merged_attrs[attname] + [attval]
-                        return [str(attval).rstrip()]
-
-                    for attname, attval in rowdata.items():
-                        if attname == sample_colname or not attval:
-                            _LOGGER.debug("Skipping KV: {}={}".format(attname, attval))
-                            continue
-                        _LOGGER.debug(
-                            "merge: sample '{}'; '{}'='{}'".format(
-                                sample[SAMPLE_NAME_ATTR], attname, attval
-                            )
-                        )
-                        merged_attrs[attname] = _select_new_attval(
-                            merged_attrs, attname, attval
-                        )
-
-                # remove sample name from the data with which to update sample
-                merged_attrs.pop(sample_colname, None)
-
+                if generated[1][i]:
+                    merged_attrs[SUBSAMPLE_NAME_ATTR] = generated[0].view(i)
                 _LOGGER.debug(
                     "Updating Sample {}: {}".format(
                         sample[SAMPLE_NAME_ATTR], merged_attrs
@@ -516,7 +902,14 @@ class Project(PathExAttMap):
             )
         prev = [(k, v) for k, v in self.items() if not k.startswith("_")]
         conf_file = self[CONFIG_FILE_KEY]
-        self.__init__(cfg=conf_file, amendments=amendments)
+        self.__init__(
+            cfg=conf_file,
+            amendments=amendments,
+            vectorized_modifiers=self._vectorized_modifiers,
+            infer_column_types=self._infer_column_types,
+            categorical_threshold=self._categorical_threshold,
+            keep_raw_tables=self._keep_raw_tables,
+        )
         for k, v in prev:
             if k.startswith("_"):
                 continue
@@ -552,10 +945,11 @@ class Project(PathExAttMap):
         :param peppy.Sample | Iterable[peppy.Sample] samples: samples to add
         """
         samples = [samples] if isinstance(samples, Sample) else samples
+        self._unpack_samples()
         for sample in samples:
             if isinstance(sample, Sample):
                 self._samples.append(sample)
-                self[SAMPLE_EDIT_FLAG_KEY] = True
+                self._sample_touched(sample)
             else:
                 _LOGGER.warning("not a peppy.Sample object, not adding")
 
@@ -630,6 +1024,7 @@ class Project(PathExAttMap):
             msg += " ({})".format(self[CONFIG_FILE_KEY])
         if DESC_KEY in self and self[DESC_KEY] is not None:
             msg += "\n{}: {}".format(DESC_KEY, self[DESC_KEY])
+        self._unpack_samples()
         try:
             num_samples = len(self._samples)
         except (AttributeError, TypeError):
@@ -637,7 +1032,10 @@ class Project(PathExAttMap):
             num_samples = 0
         if num_samples > 0:
             msg = "{}\n{} samples".format(msg, num_samples)
-            sample_names = list(self[SAMPLE_DF_KEY][self.sample_name_colname])
+            sample_names = [
+                str(s.get(self.sample_name_colname, expand=False))
+                for s in self._samples[:MAX_PROJECT_SAMPLES_REPR]
+            ]
             repr_names = sample_names[:MAX_PROJECT_SAMPLES_REPR]
             context = (
                 " (showing first {})".format(MAX_PROJECT_SAMPLES_REPR)
@@ -665,6 +1063,463 @@ class Project(PathExAttMap):
             )
         return msg
 
+    def __eq__(self, other):
+        """
+        Compare the projects by their config and their samples,
+        see :meth:`peppy.Sample.__eq__`
+        """
+        if not isinstance(other, Project):
+            return super(Project, self).__eq__(other)
+        if self is other:
+            return True
+        if type(self) != type(other):
+            return False
+        items = [
+            (k, v) for k, v in OrderedDict.items(self) if not self._excl_from_eq(k)
+        ]
+        other_items = [
+            (k, v) for k, v in OrderedDict.items(other) if not self._excl_from_eq(k)
+        ]
+        if [k for k, _ in items] != [k for k, _ in other_items]:
+            return False
+        for (_, v), (_, other_v) in zip(items, other_items):
+            if isinstance(v, PathExAttMap) and isinstance(other_v, PathExAttMap):
+                # compared as stored, without the paths expanded on item access
+                v, other_v = v.to_dict(), other_v.to_dict()
+            if not self._cmp(v, other_v):
+                return False
+        return (self.samples or []) == (other.samples or [])
+
+    def __ne__(self, other):
+        return not self == other
+
+    def _excl_from_eq(self, k):
+        """ Exclude the derived and the bookkeeping state from comparison. """
+        return k in _UNCOMPARED_ITEMS or super(Project, self)._excl_from_eq(k)
+
+    def __reduce_ex__(self, protocol):
+        """
+        Pickle the project with the samples packed column-wise,
+        see :class:`~peppy.packed_samples.PackedSamples`.
+
+        The samples are unpacked on first access, so the pickled projects
+        are quick to load in processes that use only the project config.
+        With pickle protocol 5 and a buffer callback the packed attribute
+        values are passed out-of-band, without copying.
+
+        :param int protocol: pickle protocol
+        :return (callable, tuple): function recreating the project
+            and its arguments
+        """
+        packed = self._deferred_samples
+        if not isinstance(packed, PackedSamples):
+            self._unpack_samples()
+            packed = PackedSamples(self._samples, self)
+        items = [
+            (k, None if k in _UNPICKLED_ITEMS else v)
+            for k, v in OrderedDict.items(self)
+        ]
+        return _restored_project, (self.__class__, items, packed)
+
+    def copy(self):
+        """
+        Copy the project, in constant time.
+
+        The copy shares the config, the tables and the samples with the
+        project until either of them changes them. The copy creates its
+        samples on first access, or when the project edits any of its
+        samples; they share the attribute values with the samples of the
+        project, except for the lists and mappings, which are copied.
+        The config is copied when first accessed with
+        :attr:`config` in either of the projects. The tables are replaced
+        rather than changed on sample edits.
+
+        :return peppy.Project: copy of the project
+        """
+        deferred = self._deferred_samples
+        if deferred is None:
+            deferred = SharedSamples(self._samples, self)
+            self._samples = []
+            self._deferred_samples = deferred
+            self._shared_samples.append(deferred)
+        prj = self._shallow_copy()
+        if isinstance(deferred, SharedSamples):
+            deferred.share(prj)
+        _LOGGER.debug("Copied project, sharing {} samples".format(len(deferred)))
+        return prj
+
+    def _shallow_copy(self):
+        """
+        Create a project with the same items, sharing the config,
+        and with own sample edit tracking state
+
+        :return peppy.Project: copy of the project
+        """
+        prj = self.__class__.__new__(self.__class__)
+        OrderedDict.__init__(prj)
+        for k, v in OrderedDict.items(self):
+            OrderedDict.__setitem__(prj, k, v)
+        prj._shared_samples = []
+        prj._attr_index = None
+        prj._batch_depth = 0
+        prj._dirty_samples = set(self._dirty_samples)
+        prj._dirty_columns = set(self._dirty_columns)
+        prj._sample_hashes = self._sample_hashes.copy()
+        prj._config_shared = self._config_shared = True
+        return prj
+
+    def watch(self, interval=None, content_hash=False):
+        """
+        Watch the files the project was loaded from: the config, the imported
+        configs and the sample and subsample tables.
+
+        The returned watcher holds the current version of the project,
+        refreshed with :meth:`refresh_if_changed` on every check.
+
+        :Example:
+
+        .. code-block:: python
+
+            watcher = Project("project_config.yaml").watch(interval=10)
+            samples = watcher.project.samples
+
+        :param float interval: seconds between the checks in a background
+            thread; the checks are made only on ``watcher.refresh()``
+            calls if not given
+        :param bool content_hash: whether to compare the file content hashes
+            when the modification times or sizes change
+        :return peppy.watch.ProjectWatcher: watcher holding the project
+        """
+        return ProjectWatcher(self, interval=interval, content_hash=content_hash)
+
+    def refresh_if_changed(self, content_hash=False):
+        """
+        Reload the project if any of the files it was loaded from changed.
+
+        Changes of the config or the imported configs reload the whole
+        project. Changes of the sample or subsample tables recreate only the
+        samples whose table rows changed, if the rows were hashed when the
+        project started being watched, see :meth:`watch`; the other samples
+        are copied.
+
+        The project is not changed; a refreshed project is returned instead,
+        so that it can replace this one at once.
+
+        :param bool content_hash: whether to compare the file content hashes
+            when the modification times or sizes change, to tell the files that
+            were only touched; the hashes have to be recorded by :meth:`watch`
+        :return peppy.Project: refreshed project, or this one if no files changed
+        """
+        if not self[CONFIG_FILE_KEY]:
+            return self
+        changed, sources = set(), []
+        for kind, path, state in self._source_files:
+            is_changed, current = file_changed(state, path, content_hash)
+            if is_changed:
+                _LOGGER.debug("Changed {}: {}".format(kind, path))
+                changed.add(kind)
+            sources.append((kind, path, current))
+        if not changed:
+            self._source_files = sources
+            return self
+        if CONFIG_FILE_KEY not in changed:
+            prj = self._refreshed_samples(content_hash)
+            if prj is not None:
+                return prj
+        return self._reloaded(content_hash)
+
+    def refresh_appended_rows(self):
+        """
+        Add the samples for the rows appended to the sample table file
+        since it was read.
+
+        Only the appended rows are parsed, after verifying with the header and
+        a hash of the part of the file read before that the earlier rows did
+        not change. The sample modifiers are applied to the new samples only,
+        and the sample table and the attribute indexes are updated with the new
+        rows. The column types resolved when the table was read are applied to
+        the new rows. The samples are created from scratch if the sample table
+        changed otherwise, or the subsample tables changed.
+
+        :return list[peppy.Sample]: added samples; all the samples
+            if they were created from scratch
+        """
+        mark = self.get("_sample_table_mark")
+        appended = None
+        if mark is not None and not self._subsample_tables_changed():
+            state = file_state(mark.path)
+            appended = mark.appended()
+        if appended is None:
+            _LOGGER.info("Sample table changed, recreating the samples")
+            self.create_samples()
+            return list(self.samples)
+        tail, mark = appended
+        if not tail.strip():
+            return []
+        try:
+            df = _read_table(
+                io.BytesIO(mark.header + tail), sep=infer_delimiter(mark.path)
+            )
+            df = apply_column_types(df, types=mark.types)
+        except SampleTableFileException as e:
+            _LOGGER.info("Could not read the appended rows, recreating the samples")
+            _LOGGER.debug(getattr(e, "message", repr(e)))
+            self.create_samples()
+            return list(self.samples)
+        _LOGGER.info("Adding {} appended samples".format(len(df)))
+        mark.nrows = self._sample_table_mark.nrows + len(df)
+        df.index = pd.RangeIndex(self._sample_table_mark.nrows, mark.nrows)
+        df = self._encode_table(df)
+        colname = self.sample_name_colname
+        names = df[colname] if isinstance(colname, str) and colname in df else None
+        ssts = self._subsample_rows(names)
+        samples = ColumnarModifiers(self).run(df, ssts).to_samples(self)
+        with self.batch_edit():
+            self.add_samples(samples)
+        if self.get(SAMPLE_DF_KEY) is not None:
+            self[SAMPLE_DF_KEY] = pd.concat([self[SAMPLE_DF_KEY], df])
+        self._source_files = [
+            (kind, p, state if kind == CFG_SAMPLE_TABLE_KEY else st)
+            for kind, p, st in self._source_files
+        ]
+        # the rows of the appended samples are not hashed
+        self._source_rows = None
+        self._sample_table_mark = mark
+        return samples
+
+    def _subsample_tables_changed(self):
+        """
+        :return bool: whether any of the subsample table files changed
+            since they were read
+        """
+        return any(
+            [
+                file_changed(st, p)[0]
+                for kind, p, st in self._source_files
+                if kind == CFG_SUBSAMPLE_TABLE_KEY
+            ]
+        )
+
+    def _subsample_rows(self, names):
+        """
+        Get the rows of the subsample tables that belong to the samples
+
+        :param Iterable[str] names: sample names, None if not known
+        :return list[pandas.DataFrame]: rows of every subsample table
+        """
+        sdf, positions = self._get_subsample_index()
+        if sdf is None or names is None:
+            return []
+        names = set([str(n) for n in names])
+        rows = []
+        for sst, pos in zip(sdf, positions):
+            selected = [p for n, p in pos.items() if n in names]
+            if not selected:
+                rows.append(sst.iloc[:0])
+                continue
+            rows.append(sst.iloc[np.sort(np.concatenate(selected))])
+        return rows
+
+    def _record_sources(self, kind, paths, reset=True):
+        """
+        Record the state of the files the project is loaded from
+
+        :param str kind: kind of the files: config, sample or subsample table
+        :param Iterable[str] paths: paths to the files
+        :param bool reset: whether to forget the earlier files of the kind
+        """
+        sources = [s for s in self._source_files if not reset or s[0] != kind]
+        self._source_files = sources + [(kind, p, file_state(p)) for p in paths]
+
+    def _snapshot_sources(self, content_hash=False):
+        """
+        Hash the table rows of every sample, and the file contents if requested,
+        for :meth:`refresh_if_changed` to compare to. Nothing is hashed if the
+        files changed since the project was loaded, the project has to be
+        reloaded then.
+
+        :param bool content_hash: whether to hash the file contents
+        """
+        if any([file_changed(st, p)[0] for _, p, st in self._source_files]):
+            _LOGGER.debug("Project files changed since the project was loaded")
+            return
+        if content_hash:
+            self._source_files = [
+                (kind, p, file_state(p, content_hash=True))
+                for kind, p, _ in self._source_files
+            ]
+        df = self.get(SAMPLE_DF_KEY)
+        ssts = self.get(SUBSAMPLE_DF_KEY)
+        if df is None:
+            df, ssts, _ = self._read_tables()
+        self._source_rows = self._hash_source_rows(df, ssts)
+
+    def _read_tables(self):
+        """
+        :return (pandas.DataFrame, list[pandas.DataFrame],
+            peppy.watch.TableMark) | (None, None, None): sample and subsample
+            tables and the position up to which the sample table was read,
+            Nones if the project has no sample table
+        """
+        st = self[CONFIG_KEY].get(CFG_SAMPLE_TABLE_KEY) if CONFIG_KEY in self else None
+        if not st:
+            return None, None, None
+        df, mark = self._read_sample_table(st)
+        return df, self._read_subsample_tables(), mark
+
+    def _hash_source_rows(self, df, subsample_dfs):
+        """
+        :param pandas.DataFrame df: sample table
+        :param list[pandas.DataFrame] subsample_dfs: subsample tables
+        :return peppy.watch.SourceRows | None: hashes of the table rows of
+            every sample, None if they can't be matched with the samples
+        """
+        colname = self.sample_name_colname
+        if df is None or not isinstance(colname, str):
+            return None
+        ssts = make_list(subsample_dfs or [], pd.DataFrame)
+        return SourceRows.from_tables(df, ssts, colname)
+
+    def _refreshed_samples(self, content_hash=False):
+        """
+        Create a project that shares the config with this one, and has the
+        samples whose table rows changed recreated from the current tables
+
+        :param bool content_hash: whether to hash the file contents
+        :return peppy.Project | None: refreshed project, None if the project
+            has to be reloaded
+        """
+        prev = self._source_rows
+        if prev is None:
+            return None
+        sources = [
+            (kind, p, file_state(p, content_hash)) for kind, p, _ in self._source_files
+        ]
+        df, ssts, mark = self._read_tables()
+        rows = self._hash_source_rows(df, ssts)
+        if rows is None or rows.columns != prev.columns:
+            return None
+        colname = self.sample_name_colname
+        names = rows.changed(prev)
+        _LOGGER.info("Recreating {} changed samples".format(len(names)))
+        prj = self._shallow_copy()
+        fresh = {}
+        if names:
+            selected = df[df[colname].isin(names)].reset_index(drop=True)
+            sub = [sst[sst[colname].isin(names)] for sst in ssts or []]
+            tab = ColumnarModifiers(prj).run(selected, sub)
+            fresh = {s.get(colname, expand=False): s for s in tab.to_samples(prj)}
+        old = {s.get(colname, expand=False): s for s in self.samples or []}
+        try:
+            samples = [
+                fresh[n] if n in names else old[n].copy(prj=prj) for n in df[colname]
+            ]
+        except KeyError:
+            _LOGGER.debug("Could not match the samples with the table rows")
+            return None
+        pairs = [(old[n], s) for n, s in zip(df[colname], samples) if n not in names]
+        prj._sample_hashes = self._sample_hashes.remapped(pairs)
+        prj._samples = samples
+        prj._deferred_samples = None
+        prj._sample_table = None
+        prj._table_sample_ids = None
+        prj._dirty_samples = set()
+        prj._dirty_columns = set()
+        prj[SAMPLE_EDIT_FLAG_KEY] = False
+        prj._subsample_index = None
+        prj._samples_digest = None
+        prj._source_files = sources
+        prj._source_rows = rows
+        prj._sample_table_mark = mark
+        if self._keep_raw_tables:
+            prj[SAMPLE_DF_KEY] = df
+            prj[SUBSAMPLE_DF_KEY] = ssts
+        else:
+            prj._release_raw_tables()
+        return prj
+
+    def _reloaded(self, content_hash=False):
+        """
+        Load the project again from the config file, with the same settings,
+        and hash the table rows of every sample
+
+        :param bool content_hash: whether to hash the file contents
+        :return peppy.Project: reloaded project
+        """
+        _LOGGER.info("Reloading project: {}".format(self[CONFIG_FILE_KEY]))
+        hashed = {}
+        if content_hash:
+            hashed = {p: file_state(p, True) for _, p, _ in self._source_files}
+        prj = self.__class__(
+            cfg=self[CONFIG_FILE_KEY],
+            amendments=self.amendments,
+            sample_table_index=self.st_index,
+            subsample_table_index=self.sst_index,
+            vectorized_modifiers=self._vectorized_modifiers,
+            infer_column_types=self._infer_column_types,
+            categorical_threshold=self._categorical_threshold,
+            keep_raw_tables=True,
+        )
+        prj._source_rows = prj._hash_source_rows(
+            prj.get(SAMPLE_DF_KEY), prj.get(SUBSAMPLE_DF_KEY)
+        )
+        prj._keep_raw_tables = self._keep_raw_tables
+        if not prj._keep_raw_tables:
+            prj._release_raw_tables()
+        # keep the content hashes of the files that did not change while reloaded
+        prj._source_files = [
+            (kind, p, hashed[p] if same_file_state(hashed.get(p), st) else st)
+            for kind, p, st in prj._source_files
+        ]
+        return prj
+
+    def _own_config(self):
+        """
+        Copy the config shared with a project copy, before it is changed
+        """
+        if self._config_shared:
+            self._config_shared = False
+            self[CONFIG_KEY] = deepcopy(self[CONFIG_KEY])
+
+    def _detach_shared_samples(self):
+        """
+        Make the project copies create their own samples,
+        before the samples shared with them are edited
+        """
+        shared, self._shared_samples = self._shared_samples, []
+        for s in shared:
+            s.detach()
+
+    def _unpack_samples(self):
+        """
+        Create the samples of an unpickled or copied project,
+        if not yet created
+        """
+        deferred = self._deferred_samples
+        if deferred is None:
+            return
+        self._deferred_samples = None
+        samples = deferred.unpack(self)
+        if isinstance(deferred, SharedSamples) and samples:
+            if samples[0] is not deferred.samples[0]:
+                self._track_sample_copies(deferred.samples, samples)
+        self._samples = samples
+
+    def _track_sample_copies(self, originals, copies):
+        """
+        Refer to the copies of the samples in the sample table
+        bookkeeping, which refers to the samples the table was built from
+
+        :param list[peppy.Sample] originals: samples the copies were made of
+        :param list[peppy.Sample] copies: copies of the samples
+        """
+        ids = {id(o): id(c) for o, c in zip(originals, copies)}
+        table_ids = self.get("_table_sample_ids")
+        if table_ids is not None:
+            self._table_sample_ids = pd.Index([ids.get(i, i) for i in table_ids])
+        self._dirty_samples = {ids.get(i, i) for i in self._dirty_samples}
+        self._sample_hashes = self._sample_hashes.remapped(zip(originals, copies))
+
     @property
     def amendments(self):
         """
@@ -699,6 +1554,7 @@ class Project(PathExAttMap):
         :return Mapping: config. May be formatted to comply with the most
             recent version specifications
         """
+        self._own_config()
         return self[CONFIG_KEY]
 
     @property
@@ -718,12 +1574,84 @@ class Project(PathExAttMap):
         :return Iterable[Sample]: Sample instance for each
             of this Project's samples
         """
+        self._unpack_samples()
         if self._samples:
             return self._samples
         if SAMPLE_DF_KEY not in self or self[SAMPLE_DF_KEY] is None:
             _LOGGER.debug("No samples are defined")
             return []
 
+    @property
+    def fingerprint(self):
+        """
+        Content fingerprint of the project, built from the config, the active
+        amendments and the sample hashes, see :attr:`peppy.Sample.fingerprint`.
+
+        The hashes of the samples are cached until the attributes of the samples
+        are set, so the fingerprint is recomputed cheaply. Values changed in
+        place, e.g. appended to a list, are not detected.
+
+        :return str: hexadecimal fingerprint of the project
+        """
+        digest = self._samples_digest
+        if digest is None:
+            digest = combine_hashes(self._get_sample_hashes(self.samples or []))
+            self._samples_digest = digest
+        return combine_hashes([self._config_fingerprint(), digest])
+
+    def _config_fingerprint(self):
+        """
+        :return str: hexadecimal fingerprint of the config
+            and the active amendments
+        """
+        config = self[CONFIG_KEY].to_dict() if CONFIG_KEY in self else {}
+        return config_fingerprint(config, self.amendments)
+
+    def _get_sample_hashes(self, samples):
+        """
+        Get the content hashes of the samples, hashing the samples
+        not hashed since they were last edited all at once
+
+        :param Iterable[peppy.Sample] samples: samples of the project
+        :return list[str]: hexadecimal hashes of the samples
+        """
+        return self._sample_hashes.get(samples, samples_to_dicts, has_mutable_values)
+
+    def diff(self, other):
+        """
+        Find the changes between this project and another version of it.
+
+        The samples are aligned by the sample table index. Only the
+        attributes of the samples with different content hashes are
+        compared, see :attr:`peppy.Sample.fingerprint`.
+
+        :Example:
+
+        .. code-block:: python
+
+            changes = prj.diff(Project("project_config.yaml"))
+            rerun = changes.added + [c.name for c in changes.changed]
+
+        :param peppy.Project other: project to compare to
+        :return peppy.diff.ProjectDiff: names of the added and removed
+            samples, attribute changes of the changed samples and whether
+            the config changed
+        """
+        old, new = self.samples or [], other.samples or []
+        added, removed, changed = diff_samples(
+            old,
+            new,
+            self._get_sample_hashes(old),
+            other._get_sample_hashes(new),
+            self._index_columns(),
+        )
+        return ProjectDiff(
+            added,
+            removed,
+            changed,
+            self._config_fingerprint() != other._config_fingerprint(),
+        )
+
     @property
     def sample_name_colname(self):
         """
@@ -740,15 +1668,22 @@ class Project(PathExAttMap):
     @property
     def sample_table(self):
         """
-        Get sample table. If any sample edits were performed,
-        it will be re-generated
+        Get sample table. The table is built on first access and cached.
+        If any sample edits were performed since, it will be re-generated
 
         :return pandas.DataFrame: a data frame with current samples attributes
         """
+        if self._sample_table is None:
+            _LOGGER.debug("Generating sample_table DataFrame")
+            self._sample_table = self._get_table_from_samples(index=self.st_index)
+            return self._sample_table
+        self._commit_sample_edits()
         if self[SAMPLE_EDIT_FLAG_KEY]:
-            _LOGGER.debug("Generating new sample_table DataFrame")
             self[SAMPLE_EDIT_FLAG_KEY] = False
-            new_df = self._get_table_from_samples(index=self.st_index)
+            new_df = self._patch_table_from_samples(index=self.st_index)
+            if new_df is None:
+                _LOGGER.debug("Generating new sample_table DataFrame")
+                new_df = self._get_table_from_samples(index=self.st_index)
             self._sample_table = new_df
             return new_df
 
@@ -758,14 +1693,55 @@ class Project(PathExAttMap):
     @property
     def subsample_table(self):
         """
-        Get subsample table
+        Get subsample table. If the raw tables were released after
+        the samples creation, the subsample tables are read again.
+        The index is set once and the indexed tables are cached
 
         :return pandas.DataFrame: a data frame with subsample attributes
         """
-        sdf = self[SUBSAMPLE_DF_KEY]
+        sdf = self._get_subsample_index()[0]
         if sdf is None:
             return
-        index = self.sst_index
+        return sdf if len(sdf) > 1 else sdf[0]
+
+    def subsamples_of(self, sample_name):
+        """
+        Get the subsample table rows of a sample.
+
+        The rows are located with a lookup of the sample name in the cached
+        subsample table index, rather than by scanning the tables.
+
+        :param str sample_name: name of the sample
+        :return pandas.DataFrame | list[pandas.DataFrame]: rows of the sample
+            in the subsample table, or in each of them if there are many;
+            None if no subsample tables are defined
+        """
+        sdf, positions = self._get_subsample_index()
+        if sdf is None:
+            return
+        rows = [
+            sst.iloc[pos.get(str(sample_name), [])] for sst, pos in zip(sdf, positions)
+        ]
+        return rows if len(rows) > 1 else rows[0]
+
+    def _get_subsample_index(self):
+        """
+        Get the subsample tables indexed with the sst_index columns and the
+        positions of the rows of every sample in them, built on first access
+
+        :return (list[pandas.DataFrame], list[dict[str, numpy.ndarray]]):
+            subsample tables and the positions of the sample rows in each,
+            keyed by the sample names; Nones if no subsample tables exist
+        """
+        index = make_list(self.sst_index, str)
+        cached = self._subsample_index
+        if cached is not None and cached[0] == index:
+            return cached[1:]
+        sdf = self[SUBSAMPLE_DF_KEY]
+        if sdf is None and self.get("_raw_tables_released"):
+            sdf = self._read_subsample_tables()
+        if sdf is None:
+            return None, None
         sdf = make_list(sdf, pd.DataFrame)
         for sst in sdf:
             if not all([i in sst.columns for i in index]):
@@ -775,38 +1751,27 @@ class Project(PathExAttMap):
                         CFG_SUBSAMPLE_TABLE_KEY, index
                     )
                 )
-                return sst
+                sdf = [sst]
+                break
             sst.set_index(keys=index, drop=False, inplace=True)
             _LOGGER.info("Setting subsample_table index to: {}".format(index))
-            sst.index = sst.index.set_levels([i.astype(str) for i in sst.index.levels])
-        return sdf if len(sdf) > 1 else sdf[0]
+            if isinstance(sst.index, pd.MultiIndex):
+                sst.index = sst.index.set_levels(
+                    [i.astype(str) for i in sst.index.levels]
+                )
+            else:
+                sst.index = sst.index.astype(str)
+        colname = index[0] if index[0] in sdf[0].columns else self.sample_name_colname
+        positions = [_row_positions(sst, colname) for sst in sdf]
+        self._subsample_index = (index, sdf, positions)
+        return sdf, positions
 
     def _read_sample_data(self):
         """
         Read the sample_table and subsample_table into dataframes
         and store in the object root
         """
-
-        def _read_tab(pth):
-            """
-            Internal read table function
-
-            :param str pth: absolute path to the file to read
-            :return pandas.DataFrame: table object
-            """
-            csv_kwargs = {
-                "dtype": str,
-                "index_col": False,
-                "keep_default_na": False,
-                "na_values": [""],
-            }
-            try:
-                return pd.read_csv(pth, sep=infer_delimiter(pth), **csv_kwargs)
-            except Exception as e:
-                raise SampleTableFileException(
-                    f"Could not read table: {pth}. "
-                    f"Caught exception: {getattr(e, 'message', repr(e))}"
-                )
+        self._subsample_index = None
 
         no_metadata_msg = "No {} specified"
         if CONFIG_KEY not in self:
@@ -817,18 +1782,62 @@ class Project(PathExAttMap):
             return
         st = self[CONFIG_KEY][CFG_SAMPLE_TABLE_KEY]
         if st:
-            self[SAMPLE_DF_KEY] = _read_tab(st)
+            self._record_sources(CFG_SAMPLE_TABLE_KEY, [st])
+            df, self._sample_table_mark = self._read_sample_table(st)
+            self[SAMPLE_DF_KEY] = df
         else:
             _LOGGER.warning(no_metadata_msg.format(CFG_SAMPLE_TABLE_KEY))
             self[SAMPLE_DF_KEY] = None
         if CFG_SUBSAMPLE_TABLE_KEY in self[CONFIG_KEY]:
-            if self[CONFIG_KEY][CFG_SUBSAMPLE_TABLE_KEY] is not None:
-                sst = make_list(self[CONFIG_KEY][CFG_SUBSAMPLE_TABLE_KEY], str)
-                self[SUBSAMPLE_DF_KEY] = [_read_tab(x) for x in sst]
+            sst = self[CONFIG_KEY][CFG_SUBSAMPLE_TABLE_KEY]
+            if sst is not None:
+                self._record_sources(CFG_SUBSAMPLE_TABLE_KEY, make_list(sst, str))
+                self[SUBSAMPLE_DF_KEY] = self._read_subsample_tables()
         else:
             _LOGGER.debug(no_metadata_msg.format(CFG_SUBSAMPLE_TABLE_KEY))
             self[SUBSAMPLE_DF_KEY] = None
 
+    def _read_sample_table(self, st):
+        """
+        Read the sample table and apply the column types
+
+        :param str st: path to the sample table
+        :return (pandas.DataFrame, peppy.watch.TableMark | None): sample
+            table and the position up to which the file was read,
+            None if the table is not a local file
+        """
+        data = None
+        if is_url(st):
+            df = _read_table(st)
+        else:
+            with open(st, "rb") as f:
+                data = f.read()
+            df = _read_table(io.BytesIO(data), sep=infer_delimiter(st))
+        types = resolve_column_types(
+            df,
+            types=self[CONFIG_KEY].get(CFG_SAMPLE_TABLE_TYPES_KEY),
+            infer=self._infer_column_types,
+            skip=[SAMPLE_NAME_ATTR] + self._index_columns(),
+        )
+        df = apply_column_types(df, types=types)
+        mark = None if data is None else TableMark.from_bytes(st, data, len(df), types)
+        return self._encode_table(df), mark
+
+    def _read_subsample_tables(self):
+        """
+        Read the subsample tables declared in the config
+
+        :return list[pandas.DataFrame] | None: subsample tables,
+            None if not declared
+        """
+        try:
+            sst = self[CONFIG_KEY][CFG_SUBSAMPLE_TABLE_KEY]
+        except KeyError:
+            return None
+        if sst is None:
+            return None
+        return [_read_table(x) for x in make_list(sst, str)]
+
     def _get_cfg_v(self):
         """
         Get config file version number
@@ -973,6 +1982,556 @@ class Project(PathExAttMap):
         """
         return [s for s in self.samples if s[SAMPLE_NAME_ATTR] in sample_names]
 
+    def _get_attr_index(self):
+        """
+        Get the inverted index of the sample attributes, create it if needed
+
+        :return peppy.inverted_index.AttributeIndex: sample attributes index
+        """
+        samples = self.samples or []
+        if self._attr_index is None or not self._attr_index.is_current(samples):
+            _LOGGER.debug("Creating sample attributes index")
+            self._attr_index = AttributeIndex(samples)
+        return self._attr_index
+
+    def select(self, **attrs):
+        """
+        Select the samples with the requested attribute values.
+
+        The attributes are looked up in inverted indexes, which are built
+        on first use and kept up to date with the sample edits. A list of values
+        matches any of them; samples with list attributes, e.g. the ones merged
+        from the subsample tables, match any of the list elements.
+
+        :Example:
+
+        .. code-block:: python
+
+            prj.select(protocol="RNA-seq", organism=["human", "mouse"])
+
+        :param attrs: attribute values to match, all of them need to match
+        :return list[peppy.Sample]: matching samples, in the Project order
+        """
+        samples = self.samples or []
+        if not attrs:
+            return list(samples)
+        index = self._get_attr_index()
+        matched = None
+        for attr, values in attrs.items():
+            values = values if isinstance(values, (list, tuple, set)) else [values]
+            positions = index.positions(attr, values)
+            matched = positions if matched is None else matched & positions
+            if not matched:
+                return []
+        return [samples[i] for i in sorted(matched)]
+
+    def group_by(self, *attrs):
+        """
+        Group the samples by the values of the attributes.
+
+        The groups are determined with the same inverted indexes as
+        :meth:`select`. Samples that lack any of the attributes are not
+        included; samples with list attributes are included in a group
+        for every list element.
+
+        :Example:
+
+        .. code-block:: python
+
+            for (protocol, genome), samples in prj.group_by("protocol", "genome").items():
+                ...
+
+        :param str attrs: names of the attributes to group by
+        :return OrderedDict[object, list[peppy.Sample]]: samples keyed by the
+            attribute value, or by a tuple of values if multiple attributes
+            were requested, in order of their first appearance
+        """
+        if not attrs:
+            raise TypeError("At least one attribute to group by is required")
+        samples = self.samples or []
+        groups = self._get_attr_index().groups(attrs)
+        return OrderedDict(
+            (k if len(attrs) > 1 else k[0], [samples[i] for i in positions])
+            for k, positions in groups.items()
+        )
+
+    def where(self, attr, op, value):
+        """
+        Select the samples which attribute value satisfies the comparison.
+
+        The comparisons are resolved with a sorted index of the attribute
+        values, which is built on first use and rebuilt after the attribute
+        is edited. The sample table columns are strings unless their types are
+        declared in the config or inferred, see :class:`peppy.Project`.
+
+        :Example:
+
+        .. code-block:: python
+
+            prj.where("read_length", ">=", 100)
+
+        :param str attr: attribute name
+        :param str op: comparison operator, one of: ==, !=, <, <=, >, >=
+        :param object value: value to compare with
+        :return list[peppy.Sample]: matching samples, in the Project order
+        :raise ValueError: if the operator is not supported
+        :raise TypeError: if the attribute values can't be compared with the value
+        """
+        samples = self.samples or []
+        return [samples[i] for i in self._get_attr_index().compared(attr, op, value)]
+
+    def order_by(self, attr, descending=False):
+        """
+        Order the samples by the attribute value, using the same sorted index
+        as :meth:`where`. Samples that lack the attribute are placed last.
+
+        :param str attr: attribute name
+        :param bool descending: whether to order by decreasing value
+        :return list[peppy.Sample]: ordered samples
+        :raise TypeError: if the attribute values can't be compared
+        """
+        samples = self.samples or []
+        return [samples[i] for i in self._get_attr_index().ordered(attr, descending)]
+
+    def memory_summary(self):
+        """
+        Estimate the memory used by the sample metadata.
+
+        The sizes of the Sample objects include their attribute values;
+        values shared by multiple samples, e.g. the dictionary encoded ones,
+        are counted once. The sample table is not generated if it has not been
+        accessed yet.
+
+        :return dict[str, int | list[str]]: sizes in bytes of the raw sample
+            table ("sample_df"), the Sample objects ("samples") and the sample
+            table ("sample_table"), and names of the dictionary encoded
+            columns ("categorical_columns")
+        """
+        tables = [self.get(SAMPLE_DF_KEY), self.get("_sample_table")]
+        sizes = [
+            0 if t is None else int(t.memory_usage(deep=True).sum()) for t in tables
+        ]
+        categorical = []
+        for t in tables:
+            if t is None:
+                continue
+            for col in t.columns:
+                if t[col].dtype.name == "category" and col not in categorical:
+                    categorical.append(col)
+        return {
+            "sample_df": sizes[0],
+            "samples": _samples_sizeof(self.samples or []),
+            "sample_table": sizes[1],
+            "categorical_columns": categorical,
+        }
+
+    def to_dicts(self):
+        """
+        Serialize the samples as dict objects, in bulk.
+
+        The attribute values are converted a column at a time, which is
+        faster than serializing the samples one by one.
+
+        :return list[dict]: dict representations of the samples, identical
+            to the ones produced by :meth:`peppy.Sample.to_dict`
+        """
+        return samples_to_dicts(self.samples or [])
+
+    def write_sample_yamls(
+        self,
+        outdir,
+        name_template="{sample_name}.yaml",
+        workers=None,
+        add_prj_ref=False,
+    ):
+        """
+        Write a YAML file for every sample, like :meth:`peppy.Sample.to_yaml`.
+
+        The samples are serialized in bulk and the project data, if requested,
+        once for all the samples. The files are written concurrently, on a pool
+        of threads, each to a temporary file that is then renamed. The libyaml
+        based dumper is used if available, which may line-break long strings
+        differently than :meth:`peppy.Sample.to_yaml` does.
+
+        :param str outdir: directory to write the files to, created if needed
+        :param str name_template: template of the file paths relative to
+            the directory, formatted with the sample attributes
+        :param int workers: number of threads writing the files
+        :param bool add_prj_ref: whether the project data should be included
+            in the YAML representations
+        :return list[str]: paths to the written files
+        """
+        outdir = expandpath(outdir)
+        serials = self.to_dicts()
+        paths = [os.path.join(outdir, name_template.format(**s)) for s in serials]
+        for d in set(os.path.dirname(p) for p in paths):
+            os.makedirs(d, exist_ok=True)
+        prj_yaml = dump_yaml({"prj": grab_project_data(self)}) if add_prj_ref else None
+
+        def _write(path, serial):
+            write_atomically(path, _sample_yaml(serial, prj_yaml))
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for _ in executor.map(_write, paths, serials):
+                pass
+        _LOGGER.debug("Wrote {} sample YAML files to: {}".format(len(paths), outdir))
+        return paths
+
+    @classmethod
+    def from_sample_yamls(cls, path, workers=None):
+        """
+        Create a Project from the sample YAML files, e.g. the ones written
+        with :meth:`write_sample_yamls`.
+
+        The files are parsed concurrently, on a pool of threads, and the
+        samples are created directly from the parsed data. The project data
+        sections included in the files are skipped.
+
+        :param str path: directory with the sample YAML files
+            or a glob pattern matching them
+        :param int workers: number of threads parsing the files
+        :return peppy.Project: project with a sample for every file
+        :raise InvalidSampleTableFileException: if a file does not
+            represent a sample
+        """
+        path = expandpath(path)
+        if os.path.isdir(path):
+            paths = [
+                os.path.join(path, f)
+                for f in sorted(os.listdir(path))
+                if f.endswith(SAMPLE_YAML_EXT)
+            ]
+        else:
+            paths = sorted(glob.glob(path))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            data = list(executor.map(load_yaml, paths))
+        prj = cls()
+        samples = []
+        for pth, d in zip(paths, data):
+            if not isinstance(d, Mapping):
+                raise InvalidSampleTableFileException(
+                    "Not a sample YAML file: {}".format(pth)
+                )
+            d.pop("prj", None)
+            samples.append(Sample(d, prj=prj))
+        prj._samples = samples
+        _LOGGER.debug("Read {} samples from: {}".format(len(samples), path))
+        return prj
+
+    def write_row_indexes(self):
+        """
+        Write the row index files of the sample and subsample tables, used
+        by :meth:`load_sample`. The index files are placed next to the tables
+        and map the sample names to the byte offsets of their rows.
+
+        :return list[str]: paths to the written index files; none are written
+            if the tables are not local files with known delimiters, lack
+            the sample names column or changed since they were read
+        """
+        mark = self.get("_sample_table_mark")
+        colname = self.sample_name_colname
+        sep = infer_delimiter(mark.path) if mark is not None else None
+        if sep is None or not isinstance(colname, str):
+            _LOGGER.info("Sample table can't be indexed")
+            return []
+        declared = self[CONFIG_KEY].get(CFG_SAMPLE_TABLE_TYPES_KEY) or {}
+        inferred = {c: t for c, t in mark.types.items() if c not in declared}
+        indexes = [
+            RowIndex.build(
+                mark.path,
+                colname,
+                sep,
+                types=inferred,
+                infer=self._infer_column_types,
+                size=mark.size,
+            )
+        ]
+        ssts = make_list(self[CONFIG_KEY].get(CFG_SUBSAMPLE_TABLE_KEY) or [], str)
+        for pth in ssts:
+            sst_sep = None if is_url(pth) else infer_delimiter(pth)
+            if sst_sep is None:
+                indexes.append(None)
+                continue
+            indexes.append(RowIndex.build(pth, colname, sst_sep))
+        if not all(indexes):
+            _LOGGER.info("Sample or subsample tables can't be indexed")
+            return []
+        return [idx.write() for idx in indexes]
+
+    @classmethod
+    def load_sample(cls, cfg, sample_name, amendments=None, infer_column_types=False):
+        """
+        Load a single sample of a project, e.g. in an array job processing
+        one sample per task.
+
+        The rows of the sample are read from the sample and subsample tables
+        at the offsets stored in the row index files, see
+        :meth:`write_row_indexes`, and the sample modifiers are applied to
+        the sample alone. If any of the index files is missing or stale, all
+        the samples are loaded instead and the index files are written.
+
+        :param str cfg: path to the project config file
+        :param str sample_name: name of the sample to load
+        :param Iterable[str] amendments: names of the amendments to activate
+        :param bool infer_column_types: whether the numeric types of the sample
+            table columns should be inferred
+        :return peppy.Sample: the sample, bound to a project that holds
+            only this sample if loaded from the index
+        :raise ValueError: if the project has no sample with the name
+        """
+        prj = cls(
+            cfg=cfg,
+            amendments=amendments,
+            defer_samples_creation=True,
+            infer_column_types=infer_column_types,
+        )
+        samples = prj._load_indexed_samples(sample_name)
+        if samples is None:
+            _LOGGER.info("Row indexes missing or stale, loading all the samples")
+            prj.create_samples()
+            try:
+                prj.write_row_indexes()
+            except OSError as e:
+                _LOGGER.warning(
+                    "Could not write the row indexes: {}".format(
+                        getattr(e, "message", repr(e))
+                    )
+                )
+            return prj.get_sample(sample_name)
+        if not samples:
+            raise ValueError("Project has no sample named {}.".format(sample_name))
+        prj._samples = samples
+        return samples[0]
+
+    def _load_indexed_samples(self, sample_name):
+        """
+        Create the samples with the name from their table rows, read at the
+        offsets stored in the row index files
+
+        :param str sample_name: sample name
+        :return list[peppy.Sample] | None: samples, None if any of
+            the index files is missing or stale
+        """
+        st = self[CONFIG_KEY].get(CFG_SAMPLE_TABLE_KEY) if CONFIG_KEY in self else None
+        colname = self.sample_name_colname
+        if not st or is_url(st) or not isinstance(colname, str):
+            return None
+        idx = RowIndex.load(st, colname)
+        if idx is None or idx.infer != self._infer_column_types:
+            return None
+        ssts = make_list(self[CONFIG_KEY].get(CFG_SUBSAMPLE_TABLE_KEY) or [], str)
+        sst_indexes = [None if is_url(p) else RowIndex.load(p, colname) for p in ssts]
+        if not all(sst_indexes):
+            return None
+        data, _ = idx.read_rows(sample_name)
+        df = _read_table(io.BytesIO(data), sep=idx.sep)
+        if df.empty:
+            return []
+        types = dict(idx.types)
+        types.update(self[CONFIG_KEY].get(CFG_SAMPLE_TABLE_TYPES_KEY) or {})
+        df = self._encode_table(apply_column_types(df, types=types))
+        sub = []
+        for sst_idx in sst_indexes:
+            data, positions = sst_idx.read_rows(sample_name)
+            sst = _read_table(io.BytesIO(data), sep=sst_idx.sep)
+            sst.index = pd.Index(positions)
+            sub.append(sst)
+        _LOGGER.debug("Loaded sample '{}' from the row indexes".format(sample_name))
+        return ColumnarModifiers(self).run(df, sub).to_samples(self)
+
+    def to_arrow(self):
+        """
+        Convert the processed samples to an Arrow table.
+
+        Attributes merged from the subsample tables are represented as
+        list-typed columns. Requires pyarrow.
+
+        :return pyarrow.Table: table with a row per sample
+        """
+        return records_to_arrow(self.to_dicts())
+
+    def write_arrow_ipc(self, path):
+        """
+        Write the processed samples to a file in the Arrow IPC file format,
+        which can be memory-mapped by other processes and languages
+        without parsing. Requires pyarrow.
+
+        :param str path: path to the output file
+        """
+        path = expandpath(path)
+        write_arrow_ipc(self.to_arrow(), path)
+        _LOGGER.debug("Samples written to: {}".format(path))
+
+
+def _restored_project(cls, items, packed):
+    """
+    Recreate a pickled project, without running the constructor
+
+    :param type cls: class of the project
+    :param list[(str, object)] items: stored attribute names and values
+    :param peppy.packed_samples.PackedSamples packed: samples of the project
+    :return peppy.Project: project
+    """
+    prj = cls.__new__(cls)
+    OrderedDict.__init__(prj)
+    for k, v in items:
+        OrderedDict.__setitem__(prj, k, v)
+    prj._samples = []
+    prj._deferred_samples = packed if len(packed) else None
+    prj._shared_samples = []
+    prj._config_shared = False
+    prj._batch_depth = 0
+    prj._dirty_samples = set()
+    prj._dirty_columns = set()
+    prj._sample_hashes = SampleHashes()
+    return prj
+
+
+def _sample_yaml(serial, prj_yaml=None):
+    """
+    Get the YAML representation of a serialized sample, identical
+    to the one written by :meth:`peppy.Sample.to_yaml`
+
+    :param dict serial: serialized sample
+    :param str prj_yaml: YAML representation of the project data section,
+        which is placed among the sample attributes in the key order
+    :return str: YAML representation of the sample
+    """
+    if prj_yaml is None:
+        return dump_yaml(serial)
+    before = {k: v for k, v in serial.items() if k < "prj"}
+    after = {k: v for k, v in serial.items() if k > "prj"}
+    return "".join(
+        [
+            dump_yaml(before) if before else "",
+            prj_yaml,
+            dump_yaml(after) if after else "",
+        ]
+    )
+
+
+def _row_positions(df, colname):
+    """
+    Get the positions of the rows of a table grouped by the column values
+
+    :param pandas.DataFrame df: table to group the rows of
+    :param str colname: name of the column to group the rows by
+    :return dict[str, numpy.ndarray]: row positions keyed by the column values
+    """
+    if colname not in df.columns:
+        return {}
+    groups = df.groupby(df[colname].values, sort=False).indices
+    return {str(k): v for k, v in groups.items()}
+
+
+def _samples_sizeof(samples):
+    """
+    Estimate the memory used by the samples and their attribute values,
+    counting the objects shared by the samples once
+
+    :param Iterable[peppy.Sample] samples: samples to estimate the size of
+    :return int: size in bytes
+    """
+    seen = set()
+
+    def _sizeof(obj):
+        if id(obj) in seen:
+            return 0
+        seen.add(id(obj))
+        size = sys.getsizeof(obj)
+        if isinstance(obj, Mapping):
+            size += sum([_sizeof(k) + _sizeof(v) for k, v in obj.items()])
+        elif isinstance(obj, (list, tuple, set)):
+            size += sum([_sizeof(i) for i in obj])
+        elif isinstance(obj, MultiValue):
+            column = obj.column
+            if id(column) not in seen:
+                seen.add(id(column))
+                size += sys.getsizeof(column) + _sizeof(column.values)
+                size += column.offsets.nbytes
+        return size
+
+    total = 0
+    for sample in samples:
+        seen.add(id(sample))
+        total += sys.getsizeof(sample)
+        for k, v in sample.items():
+            if k != PRJ_REF:
+                total += _sizeof(k) + _sizeof(v)
+    return total
+
+
+def _first_seen_order(samples, columns):
+    """
+    Order the sample table columns by their first appearance in the samples,
+    which is the order of the columns in the regenerated sample table
+
+    :param Iterable[peppy.Sample] samples: samples to determine the order with
+    :param Iterable[str] columns: sample table columns
+    :return list[str]: ordered columns
+    """
+    target = set(columns)
+    order = []
+    seen = set()
+    for sample in samples:
+        for k in sample.keys():
+            if k in target and k not in seen:
+                seen.add(k)
+                order.append(k)
+        if len(order) == len(target):
+            break
+    return order
+
+
+def _records_dtypes(df, cols):
+    """
+    Convert the patched sample table columns to the dtypes pandas infers
+    for the columns of a table created from the serialized samples
+
+    :param pandas.DataFrame df: sample table with a range index
+    :param Iterable[str] cols: names of the patched columns
+    :return pandas.DataFrame: sample table with the columns converted
+    """
+    cols = [c for c in df.columns if c in set(cols)]
+    if not cols:
+        return df
+    rows = zip(*[df[c].to_numpy(dtype=object) for c in cols])
+    converted = pd.DataFrame.from_records(list(rows), columns=cols)
+    for c in cols:
+        df[c] = converted[c]
+    return df
+
+
+def _read_table(pth, chunksize=None, sep=None):
+    """
+    Read a sample or subsample table with string columns
+
+    :param str | io.BytesIO pth: absolute path to the file to read,
+        or the file content
+    :param int chunksize: number of rows to read at a time, if provided
+        the table is read lazily
+    :param str sep: delimiter, inferred from the file extension if not provided
+    :return pandas.DataFrame | Iterator[pandas.DataFrame]: table object,
+        or its consecutive chunks
+    :raise SampleTableFileException: if the table can't be read
+    """
+    csv_kwargs = {
+        "dtype": str,
+        "index_col": False,
+        "keep_default_na": False,
+        "na_values": [""],
+        "chunksize": chunksize,
+    }
+    if sep is None and isinstance(pth, str):
+        sep = infer_delimiter(pth)
+    try:
+        return pd.read_csv(pth, sep=sep, **csv_kwargs)
+    except Exception as e:
+        raise SampleTableFileException(
+            f"Could not read table: {pth}. "
+            f"Caught exception: {getattr(e, 'message', repr(e))}"
+        )
+
 
 def infer_delimiter(filepath):
     """
@@ -0,0 +1,205 @@
+"""
+Sidecar index files with the byte offsets of the table rows of every sample,
+used to load single samples without parsing the whole tables.
+"""
+
+import csv
+import json
+from logging import getLogger
+
+from .const import PKG_NAME, ROW_INDEX_EXT
+from .utils import write_atomically
+from .watch import file_state, same_file_state
+
+_LOGGER = getLogger(PKG_NAME)
+
+_VERSION = 1
+
+
+def _split_records(data):
+    """
+    Split the table content into records; a record spans several lines
+    if a quoted value contains line breaks
+
+    :param bytes data: table content
+    :return Iterator[(int, bytes)]: offsets and content of the records
+    """
+    start, pending = 0, False
+    pos = 0
+    while pos < len(data):
+        end = data.find(b"\n", pos)
+        end = len(data) if end < 0 else end + 1
+        if data.count(b'"', pos, end) % 2:
+            pending = not pending
+        pos = end
+        if not pending:
+            yield start, data[start:end]
+            start = end
+    if start < len(data):
+        yield start, data[start:]
+
+
+def _fields(record, sep):
+    """
+    :param bytes record: table record
+    :param str sep: delimiter
+    :return list[str]: values of the record
+    """
+    text = record.decode("utf-8", "surrogatepass").rstrip("\r\n")
+    if '"' not in text:
+        return text.split(sep)
+    return next(csv.reader([text], delimiter=sep))
+
+
+class RowIndex(object):
+    """
+    Byte offsets and lengths of the rows of a sample or subsample table,
+    grouped by the sample names.
+
+    :param str path: path to the table
+    :param str column: name of the column with the sample names
+    :param str sep: delimiter of the table
+    :param (int, int, None) state: modification time and size of the table
+        when indexed, see :func:`peppy.watch.file_state`
+    :param int header_size: number of bytes of the header line
+    :param dict[str, list[(int, int, int)]] rows: offset, length and
+        position of the rows of every sample
+    :param dict[str, str] types: types inferred for the sample table columns
+    :param bool infer: whether the column types were inferred
+    """
+
+    def __init__(
+        self, path, column, sep, state, header_size, rows, types=None, infer=False
+    ):
+        self.path = path
+        self.column = column
+        self.sep = sep
+        self.state = state
+        self.header_size = header_size
+        self.rows = rows
+        self.types = types or {}
+        self.infer = infer
+
+    @staticmethod
+    def index_path(path):
+        """
+        :param str path: path to the table
+        :return str: path to the index file of the table
+        """
+        return path + ROW_INDEX_EXT
+
+    @classmethod
+    def build(cls, path, column, sep, types=None, infer=False, size=None):
+        """
+        Index the rows of a table
+
+        :param str path: path to the table
+        :param str column: name of the column with the sample names
+        :param str sep: delimiter of the table
+        :param dict[str, str] types: types inferred for the sample table columns
+        :param bool infer: whether the column types were inferred
+        :param int size: expected size of the table, e.g. when the types were
+            inferred; the table is not indexed if it has a different size
+        :return RowIndex | None: index, None if the table lacks the column
+            or changed while indexed
+        """
+        state = file_state(path)
+        with open(path, "rb") as f:
+            data = f.read()
+        if state is None or state[1] != len(data):
+            return None
+        if size is not None and size != len(data):
+            _LOGGER.debug("Table changed since it was read: {}".format(path))
+            return None
+        records = _split_records(data)
+        try:
+            _, header = next(records)
+        except StopIteration:
+            return None
+        try:
+            col = _fields(header, sep).index(column)
+        except ValueError:
+            _LOGGER.debug("No '{}' column to index: {}".format(column, path))
+            return None
+        rows, pos = {}, 0
+        for offset, record in records:
+            if not record.strip():
+                continue
+            fields = _fields(record, sep)
+            name = fields[col] if col < len(fields) else ""
+            if name:
+                rows.setdefault(name, []).append((offset, len(record), pos))
+            pos += 1
+        _LOGGER.debug("Indexed {} rows of {}".format(pos, path))
+        return cls(path, column, sep, state, len(header), rows, types, infer)
+
+    @classmethod
+    def load(cls, path, column):
+        """
+        Load the index of a table, if it is current
+
+        :param str path: path to the table
+        :param str column: name of the column with the sample names
+        :return RowIndex | None: index, None if it is missing, made for another
+            column or stale: the table changed since it was indexed
+        """
+        try:
+            with open(cls.index_path(path)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != _VERSION or data.get("column") != column:
+            return None
+        state = tuple(data["state"]) + (None,)
+        if not same_file_state(state, file_state(path)):
+            _LOGGER.debug("Stale row index: {}".format(cls.index_path(path)))
+            return None
+        rows = {k: [tuple(r) for r in v] for k, v in data["rows"].items()}
+        return cls(
+            path,
+            column,
+            data["sep"],
+            state,
+            data["header_size"],
+            rows,
+            data["types"],
+            data["infer"],
+        )
+
+    def write(self):
+        """
+        Write the index next to the table
+
+        :return str: path to the index file
+        """
+        path = self.index_path(self.path)
+        data = {
+            "version": _VERSION,
+            "column": self.column,
+            "sep": self.sep,
+            "state": list(self.state[:2]),
+            "header_size": self.header_size,
+            "types": self.types,
+            "infer": self.infer,
+            "rows": self.rows,
+        }
+        write_atomically(path, json.dumps(data))
+        return path
+
+    def read_rows(self, name):
+        """
+        Read the header and the rows of a sample from the table
+
+        :param str name: sample name
+        :return (bytes, list[int]): header followed by the rows,
+            and the positions of the rows in the table
+        """
+        rows = self.rows.get(name, [])
+        with open(self.path, "rb") as f:
+            header = f.read(self.header_size)
+            chunks = [header if header.endswith(b"\n") else header + b"\n"]
+            for offset, length, _ in rows:
+                f.seek(offset)
+                record = f.read(length)
+                chunks.append(record if record.endswith(b"\n") else record + b"\n")
+        return b"".join(chunks), [pos for _, _, pos in rows]
@@ -6,18 +6,22 @@ except ImportError:
 
 import glob
 import os
-import warnings
 from collections import OrderedDict
 from copy import copy as cp
+from copy import deepcopy
 from logging import getLogger
 from string import Formatter
 
+import numpy as np
 import yaml
-from attmap import PathExAttMap
+from attmap import AttMap, PathExAttMap
+from pandas import Series, isnull
 
 from .const import *
 from .exceptions import InvalidSampleTableFileException
-from .utils import copy, grab_project_data
+from .fingerprint import sample_hashes
+from .multi_value import MultiValue, is_multi_value
+from .utils import expand_path, grab_project_data
 
 _LOGGER = getLogger(PKG_NAME)
 
@@ -27,7 +31,190 @@ class SafeDict(dict):
         return "{" + key + "}"
 
 
-@copy
+class SharedAttributes(object):
+    """
+    Attributes shared by multiple samples, stored once rather than in
+    every Sample.
+
+    The shared attributes are resolved on lookup in the samples that do not
+    define their own values. In iteration they are listed in the position of
+    the sample's shared attributes key, like the attributes set at that point.
+
+    Aliases are attributes that take the value of another attribute of the
+    sample. They are available in the samples that define the source
+    attribute and take precedence over the constants. An alias resolves
+    to the value the source attribute had when the aliases were declared:
+    a sample's aliases are stored as its own attributes before any
+    of the source attributes is changed.
+
+    :param Iterable[(str, object)] constants: attribute names and values
+    :param Iterable[(str, str)] aliases: names of the source attributes
+        and the aliases, in order of declaration
+    :param bool frozen: whether the aliases are no longer resolved, because
+        the samples store them as their own attributes
+    """
+
+    def __init__(self, constants=None, aliases=None, frozen=False):
+        self.constants = OrderedDict(constants or [])
+        self.aliases = list(aliases or [])
+        self.frozen = frozen
+        self._declared = {}
+        for i, (attr, new) in enumerate(self.aliases):
+            self._declared.setdefault(new, []).append((i, attr))
+        self.sources = set() if frozen else set([a for a, _ in self.aliases])
+        self._frozen = None
+
+    def __contains__(self, key):
+        return key in self.constants or key in self._declared
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, SharedAttributes)
+            and list(self.constants.items()) == list(other.constants.items())
+            and self.aliases == other.aliases
+            and self.frozen == other.frozen
+        )
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "{}({}, {}, frozen={})".format(
+            self.__class__.__name__,
+            list(self.constants.items()),
+            self.aliases,
+            self.frozen,
+        )
+
+    def attributes(self):
+        """
+        :return list[str]: names of the shared attributes, in order
+        """
+        names = list(self.constants)
+        for _, new in self.aliases:
+            if new not in self.constants and new not in names:
+                names.append(new)
+        return names
+
+    def lookup(self, sample, key):
+        """
+        Get the value of a shared attribute, which the sample
+        does not define itself
+
+        :param peppy.Sample sample: sample to get the value for
+        :param str key: attribute name
+        :return object: attribute value, not expanded
+        :raise KeyError: if the attribute is not available for the sample
+        """
+        return self._resolve(sample, key, len(self.aliases))
+
+    def _resolve(self, sample, key, declared_before):
+        """
+        Get the value of an attribute, considering only the aliases
+        declared before the given position, like a copy made at that point
+
+        :param peppy.Sample sample: sample to get the value for
+        :param str key: attribute name
+        :param int declared_before: position of the alias declaration
+        :return object: attribute value, not expanded
+        :raise KeyError: if the attribute is not available for the sample
+        """
+        if OrderedDict.__contains__(sample, key):
+            return OrderedDict.__getitem__(sample, key)
+        try:
+            return self._resolve_alias(sample, key, declared_before)
+        except KeyError:
+            return self.constants[key]
+
+    def _resolve_alias(self, sample, key, declared_before):
+        """
+        Get the value of an alias from its source attribute; the last
+        declared alias with a source defined in the sample is used
+
+        :param peppy.Sample sample: sample to get the value for
+        :param str key: alias name
+        :param int declared_before: position of the alias declaration
+        :return object: attribute value, expanded like a copied value
+        :raise KeyError: if none of the alias sources is available
+        """
+        if self.frozen:
+            raise KeyError(key)
+        for i, attr in reversed(self._declared.get(key, [])):
+            if i < declared_before:
+                try:
+                    return _expanded(self._resolve(sample, attr, i))
+                except KeyError:
+                    continue
+        raise KeyError(key)
+
+    def aliased(self, sample):
+        """
+        Get the aliases the sample resolves and does not define itself
+
+        :param peppy.Sample sample: sample to get the aliases for
+        :return OrderedDict[str, object]: alias names and values
+        """
+        values = OrderedDict()
+        for _, new in self.aliases:
+            if new in values or OrderedDict.__contains__(sample, new):
+                continue
+            try:
+                values[new] = self._resolve_alias(sample, new, len(self.aliases))
+            except KeyError:
+                continue
+        return values
+
+    def copy(self):
+        """
+        Copy the shared attributes, with the list and mapping
+        constant values copied
+
+        :return SharedAttributes: copy of the shared attributes
+        """
+        constants = [(k, _copied_value(v)) for k, v in self.constants.items()]
+        return self.__class__(constants, self.aliases, self.frozen)
+
+    def with_aliases(self, aliases):
+        """
+        Create a copy of the shared attributes with the aliases added
+
+        :param Iterable[(str, str)] aliases: names of the source attributes
+            and the aliases
+        :return SharedAttributes: shared attributes with the aliases
+        """
+        return self.__class__(
+            self.constants.items(), self.aliases + list(aliases), self.frozen
+        )
+
+    def frozen_aliases(self):
+        """
+        Get a copy of the shared attributes that does not resolve the aliases,
+        for the samples that store them as their own attributes
+
+        :return SharedAttributes: shared attributes with the aliases frozen
+        """
+        if not self.aliases or self.frozen:
+            return self
+        if self._frozen is None:
+            self._frozen = self.__class__(
+                self.constants.items(), self.aliases, frozen=True
+            )
+        return self._frozen
+
+    def without(self, key):
+        """
+        Create a copy of the shared attributes that lacks the attribute
+
+        :param str key: name of the attribute to exclude
+        :return SharedAttributes: shared attributes without the attribute
+        """
+        return self.__class__(
+            [(k, v) for k, v in self.constants.items() if k != key],
+            [(attr, new) for attr, new in self.aliases if new != key],
+            self.frozen,
+        )
+
+
 class Sample(PathExAttMap):
     """
     Class to model Samples based on a pandas Series.
@@ -76,6 +263,26 @@ class Sample(PathExAttMap):
         self._derived_cols_done = []
         self._attributes = list(series.keys())
 
+    def raw_items(self):
+        """
+        Get the attributes with the values as stored, without the path
+        expansion done on item access; a faster alternative to items()
+        for the loops over all the attributes
+
+        :return list[(str, object)]: attribute names and values
+        """
+        shared = dict.get(self, SHARED_ATTRS_KEY)
+        if shared is None:
+            return list(OrderedDict.items(self))
+        return [
+            (
+                (k, OrderedDict.__getitem__(self, k))
+                if dict.__contains__(self, k)
+                else (k, shared.lookup(self, k))
+            )
+            for k in self
+        ]
+
     def get_sheet_dict(self):
         """
         Create a K-V pairs for items originally passed in via the sample sheet.
@@ -88,6 +295,33 @@ class Sample(PathExAttMap):
         """
         return OrderedDict([[k, getattr(self, k)] for k in self._attributes])
 
+    def copy(self, prj=None, shared=None):
+        """
+        Copy the sample. The copy shares the attribute values with the sample,
+        except for the lists and mappings, which are copied. The shared
+        attributes are copied too, see :meth:`SharedAttributes.copy`.
+
+        :param peppy.Project prj: project to bind the copy to; the project
+            of the sample by default
+        :param dict[int, SharedAttributes] shared: copies of the shared
+            attributes by the ids of the copied ones, used to copy the shared
+            attributes of many samples only once
+        :return peppy.Sample: copy of the sample
+        """
+        shared = {} if shared is None else shared
+        items = []
+        for k, v in OrderedDict.items(self):
+            if k == PRJ_REF:
+                v = v if prj is None else prj
+            elif k == SHARED_ATTRS_KEY and isinstance(v, SharedAttributes):
+                if id(v) not in shared:
+                    shared[id(v)] = v.copy()
+                v = shared[id(v)]
+            else:
+                v = _copied_value(v)
+            items.append((k, v))
+        return _restored_sample(self.__class__, items)
+
     def to_dict(self, add_prj_ref=False):
         """
         Serializes itself as dict object.
@@ -96,52 +330,6 @@ class Sample(PathExAttMap):
             Sample object should be included in the YAML representation
         :return dict: dict representation of this Sample
         """
-
-        def _obj2dict(obj, name=None):
-            """
-            Build representation of object as a dict, recursively
-            for all objects that might be attributes of self.
-
-            :param object obj: what to serialize to write to YAML.
-            :param str name: name of the object to represent.
-            :param Iterable[str] to_skip: names of attributes to ignore.
-            """
-            from collections import Mapping
-
-            from attmap import AttMap
-            from pandas import Series, isnull
-
-            if name:
-                _LOGGER.log(5, "Converting to dict: {}".format(name))
-            if isinstance(obj, list):
-                return [_obj2dict(i) for i in obj]
-            if isinstance(obj, AttMap):
-                return {
-                    k: _obj2dict(v, name=k)
-                    for k, v in obj.items()
-                    if not k.startswith("_")
-                }
-            elif isinstance(obj, Mapping):
-                return {
-                    k: _obj2dict(v, name=k)
-                    for k, v in obj.items()
-                    if not k.startswith("_")
-                }
-            if isinstance(obj, set):
-                return [_obj2dict(i) for i in obj]
-            elif isinstance(obj, Series):
-                _LOGGER.warning("Serializing series as mapping, not array-like")
-                return obj.to_dict()
-            elif hasattr(obj, "dtype"):  # numpy data types
-                # TODO: this fails with ValueError for multi-element array.
-                return obj.item()
-            elif isnull(obj):
-                # Missing values as evaluated by pandas.isnull().
-                # This gets correctly written into yaml.
-                return "NaN"
-            else:
-                return obj
-
         serial = _obj2dict(self)
         if add_prj_ref:
             serial.update({"prj": grab_project_data(self[PRJ_REF])})
@@ -187,85 +375,6 @@ class Sample(PathExAttMap):
             with variable substitutions made
         :raises ValueError: if argument to data_sources parameter is null/empty
         """
-
-        def _format_regex(regex, items):
-            """
-            Format derived source with object attributes
-
-            :param str regex: string to format,
-                e.g. {identifier}{file_id}_data.txt
-            :param Iterable[Iterable[Iterable | str]] items: items to format
-                the string with
-            :raise InvalidSampleTableFileException: if after merging
-                subannotations the lengths of multi-value attrs are not even
-            :return Iterable | str: formatted regex string(s)
-            """
-            keys = [i[1] for i in Formatter().parse(regex) if i[1] is not None]
-            if not keys:
-                return [regex]
-            if "$" in regex:
-                _LOGGER.warning(
-                    "Not all environment variables were populated "
-                    "in derived attribute source: {}".format(regex)
-                )
-            attr_lens = [
-                len(v) for k, v in items.items() if (isinstance(v, list) and k in keys)
-            ]
-            if not bool(attr_lens):
-                return [_safe_format(regex, items)]
-            if len(set(attr_lens)) != 1:
-                msg = (
-                    "All attributes to format the {} ({}) have to be the "
-                    "same length, got: {}. Correct your {}".format(
-                        DERIVED_SOURCES_KEY, regex, attr_lens, SUBSAMPLE_SHEET_KEY
-                    )
-                )
-                raise InvalidSampleTableFileException(msg)
-            vals = []
-            for i in range(0, attr_lens[0]):
-                items_cpy = cp(items)
-                for k in keys:
-                    if isinstance(items_cpy[k], list):
-                        items_cpy[k] = items_cpy[k][i]
-                vals.append(_safe_format(regex, items_cpy))
-            return vals
-
-        def _safe_format(s, values):
-            """
-            Safely format string.
-
-            If the values are missing the key is wrapped in curly braces.
-            This is intended to preserve the environment variables specified
-            using curly braces notation, for example: "${ENVVAR}/{sample_attr}"
-            would result in "${ENVVAR}/populated" rather than a KeyError.
-
-            :param str s: string with curly braces placeholders to populate
-            :param Mapping values: key-value pairs to pupulate string with
-            :return str: populated string
-            """
-            return Formatter().vformat(s, (), SafeDict(values))
-
-        def _glob_regex(patterns):
-            """
-            Perform unix style pathname pattern expansion for multiple patterns
-
-            :param Iterable[str] patterns: patterns to expand
-            :return str | Iterable[str]: expanded patterns
-            """
-            outputs = []
-            for p in patterns:
-                if "*" in p or "[" in p:
-                    _LOGGER.debug("Pre-glob: {}".format(p))
-                    val_globbed = sorted(glob.glob(p))
-                    if not val_globbed:
-                        _LOGGER.debug("No files match the glob: '{}'".format(p))
-                    else:
-                        p = val_globbed
-                        _LOGGER.debug("Post-glob: {}".format(p))
-
-                outputs.extend(p if isinstance(p, list) else [p])
-            return outputs if len(outputs) > 1 else outputs[0]
-
         if not data_sources:
             return None
         sn = self[SAMPLE_NAME_ATTR] if SAMPLE_NAME_ATTR in self else "this sample"
@@ -280,37 +389,9 @@ class Sample(PathExAttMap):
                 )
             )
             raise AttributeError(reason)
-
-        try:
-            regex = data_sources[source_key]
-            _LOGGER.debug("Data sources: {}".format(data_sources))
-        except KeyError:
-            _LOGGER.debug(
-                "{}: config lacks entry for {} key: "
-                "'{}' in column '{}'; known: {}".format(
-                    sn, DERIVED_SOURCES_KEY, source_key, attr_name, data_sources.keys()
-                )
-            )
-            return ""
-        deriv_exc_base = (
-            "In sample '{sn}' cannot correctly parse derived "
-            "attribute source: {r}.".format(sn=sn, r=regex)
+        return derive_value(
+            data_sources, source_key, dict(self.raw_items()), attr_name, sn
         )
-        try:
-            vals = _format_regex(regex, dict(self.items()))
-            _LOGGER.debug("Formatted regex: {}".format(vals))
-        except KeyError as ke:
-            _LOGGER.warning(
-                deriv_exc_base + " Can't access {ke} attribute".format(ke=str(ke))
-            )
-        except Exception as e:
-            _LOGGER.warning(
-                deriv_exc_base
-                + " Caught exception: {e}".format(e=getattr(e, "message", repr(e)))
-            )
-        else:
-            return _glob_regex(vals)
-        return None
 
     @property
     def project(self):
@@ -321,28 +402,156 @@ class Sample(PathExAttMap):
         """
         return self[PRJ_REF]
 
+    @property
+    def fingerprint(self):
+        """
+        Content hash of the processed sample attributes. The hash is cached
+        by the project of the sample until an attribute of the sample is set;
+        values changed in place, e.g. appended to a list, are not detected.
+
+        :return str: hexadecimal hash of the sample
+        """
+        prj = dict.get(self, PRJ_REF)
+        try:
+            return prj._get_sample_hashes([self])[0]
+        except AttributeError:
+            # no peppy.Project to cache the hash
+            return sample_hashes(samples_to_dicts([self]))[0]
+
+    def __eq__(self, other):
+        """
+        Compare the samples attribute by attribute. The samples with different
+        content hashes cached by their projects are told apart without the
+        attributes being compared, see :attr:`fingerprint`
+        """
+        if not isinstance(other, Sample):
+            return super(Sample, self).__eq__(other)
+        if self is other:
+            return True
+        if type(self) != type(other):
+            return False
+        try:
+            digest = dict.get(self, PRJ_REF)._sample_hashes.comparable(self)
+            other_digest = dict.get(other, PRJ_REF)._sample_hashes.comparable(other)
+        except AttributeError:
+            # no peppy.Project caching the hashes
+            digest = other_digest = None
+        if digest is not None and other_digest is not None and digest != other_digest:
+            return False
+        items = [(k, v) for k, v in self.raw_items() if not self._excl_from_eq(k)]
+        other_items = [
+            (k, v) for k, v in other.raw_items() if not self._excl_from_eq(k)
+        ]
+        return [k for k, _ in items] == [k for k, _ in other_items] and all(
+            self._cmp(v, other_v) for (_, v), (_, other_v) in zip(items, other_items)
+        )
+
+    def __ne__(self, other):
+        return not self == other
+
     def __setattr__(self, key, value):
-        self._try_touch_samples()
+        self._try_touch_samples(key)
         super(Sample, self).__setattr__(key, value)
 
     def __delattr__(self, item):
-        self._try_touch_samples()
+        self._try_touch_samples(item)
         super(Sample, self).__delattr__(item)
 
     def __setitem__(self, key, value):
-        self._try_touch_samples()
+        self._try_touch_samples(key)
+        self._freeze_aliases(key)
         super(Sample, self).__setitem__(key, value)
 
+    def __delitem__(self, key):
+        self._try_touch_samples(key)
+        self._freeze_aliases(key)
+        shared = dict.get(self, SHARED_ATTRS_KEY)
+        if shared is not None and key != SHARED_ATTRS_KEY and key in shared:
+            # exclude the shared attribute just for this sample
+            OrderedDict.__setitem__(self, SHARED_ATTRS_KEY, shared.without(key))
+        super(Sample, self).__delitem__(key)
+
+    def __getitem__(self, item, expand=True, to_dict=False):
+        try:
+            value = OrderedDict.__getitem__(self, item)
+        except KeyError:
+            try:
+                value = super(Sample, self).__getitem__(item, False)
+            except KeyError:
+                shared = dict.get(self, SHARED_ATTRS_KEY)
+                if shared is None:
+                    raise
+                value = shared.lookup(self, item)
+        return _expanded(value, to_dict) if expand else value
+
+    def __contains__(self, key):
+        if dict.__contains__(self, key):
+            return True
+        shared = dict.get(self, SHARED_ATTRS_KEY)
+        if shared is None:
+            return False
+        try:
+            shared.lookup(self, key)
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        shared = dict.get(self, SHARED_ATTRS_KEY)
+        if shared is None:
+            return super(Sample, self).__iter__()
+        return self._iter_with_shared(shared)
+
+    def __len__(self):
+        if dict.get(self, SHARED_ATTRS_KEY) is None:
+            return super(Sample, self).__len__()
+        return sum([1 for _ in self])
+
+    def _freeze_aliases(self, key):
+        """
+        Store the values of the aliases as own attributes before
+        the attribute they are resolved from is changed
+
+        :param str key: name of the attribute to be changed
+        """
+        shared = dict.get(self, SHARED_ATTRS_KEY)
+        if shared is None or key not in shared.sources:
+            return
+        for attr, value in shared.aliased(self).items():
+            super(Sample, self).__setitem__(attr, value)
+        OrderedDict.__setitem__(self, SHARED_ATTRS_KEY, shared.frozen_aliases())
+
+    def _iter_with_shared(self, shared):
+        """
+        Iterate over the attribute names, listing the shared attributes
+        in the position of the shared attributes key. The attributes set
+        before the shared ones keep their position.
+
+        :param SharedAttributes shared: shared attributes of this sample
+        """
+        preceding = set()
+        block = None
+        for k in super(Sample, self).__iter__():
+            if block is not None:
+                if k not in block:
+                    yield k
+                continue
+            yield k
+            if k != SHARED_ATTRS_KEY:
+                preceding.add(k)
+                continue
+            block = set()
+            for attr in shared.attributes():
+                if attr in preceding:
+                    continue
+                block.add(attr)
+                if attr in self:
+                    yield attr
+
     # The __reduce__ function provides an interface for
     # correct object serialization with the pickle module.
     def __reduce__(self):
-        return (
-            self.__class__,
-            (self.as_series(),),
-            (None, {}),
-            iter([]),
-            iter({PRJ_REF: self[PRJ_REF]}.items()),
-        )
+        return _restored_sample, (self.__class__, list(OrderedDict.items(self)))
 
     def __str__(self, max_attr=10):
         """ Representation in interpreter. """
@@ -361,7 +570,7 @@ class Sample(PathExAttMap):
         counter = 0
         for k, v in pub_attrs.items():
             attrs += "\n{}{}".format(
-                (k + ":").ljust(maxlen), v if not isinstance(v, list) else ", ".join(v)
+                (k + ":").ljust(maxlen), v if not is_multi_value(v) else ", ".join(v)
             )
             if counter == max_attr:
                 attrs += "\n\n...".ljust(maxlen) + "(showing first {})".format(max_attr)
@@ -370,18 +579,318 @@ class Sample(PathExAttMap):
         return head + "\n" + attrs
 
     def _excl_from_eq(self, k):
-        """ Exclude the Project reference from object comparison. """
-        return k == PRJ_REF or super(Sample, self)._excl_from_eq(k)
+        """ Exclude the Project reference and shared attributes from comparison. """
+        return k in (PRJ_REF, SHARED_ATTRS_KEY) or super(Sample, self)._excl_from_eq(k)
 
     def _excl_from_repr(self, k, cls):
         """ Exclude the Project reference from representation. """
         return k.startswith("_") or super(Sample, self)._excl_from_repr(k, cls)
 
-    def _try_touch_samples(self):
+    def _try_touch_samples(self, key=None):
         """
-        Safely sets sample edited flag to true
+        Safely notifies the Project about the sample edit
+
+        :param str key: name of the edited attribute, if known
         """
         try:
-            self[PRJ_REF][SAMPLE_EDIT_FLAG_KEY] = True
-        except (KeyError, AttributeError):
-            pass
+            prj = self[PRJ_REF]
+        except KeyError:
+            return
+        if prj is None:
+            return
+        try:
+            prj._sample_touched(self, key)
+        except AttributeError:
+            # Project reference is a mapping, not a peppy.Project
+            prj[SAMPLE_EDIT_FLAG_KEY] = True
+
+
+def _obj2dict(obj, name=None):
+    """
+    Build representation of object as a dict, recursively
+    for all objects that might be attributes of a Sample.
+
+    :param object obj: what to serialize to write to YAML.
+    :param str name: name of the object to represent.
+    """
+    try:
+        return _SERIALIZERS[type(obj)](obj)
+    except KeyError:
+        pass
+    if name:
+        _LOGGER.log(5, "Converting to dict: {}".format(name))
+    if is_multi_value(obj):
+        return [_obj2dict(i) for i in obj]
+    if isinstance(obj, AttMap):
+        return {
+            k: _obj2dict(v, name=k)
+            for k, v in (obj.raw_items() if isinstance(obj, Sample) else obj.items())
+            if not k.startswith("_")
+        }
+    elif isinstance(obj, Mapping):
+        return {
+            k: _obj2dict(v, name=k) for k, v in obj.items() if not k.startswith("_")
+        }
+    if isinstance(obj, set):
+        return [_obj2dict(i) for i in obj]
+    elif isinstance(obj, Series):
+        _LOGGER.warning("Serializing series as mapping, not array-like")
+        return obj.to_dict()
+    elif hasattr(obj, "dtype"):  # numpy data types
+        # TODO: this fails with ValueError for multi-element array.
+        return obj.item()
+    elif isnull(obj):
+        # Missing values as evaluated by pandas.isnull().
+        # This gets correctly written into yaml.
+        return "NaN"
+    else:
+        return obj
+
+
+def _identity(obj):
+    return obj
+
+
+# serializers of the most common attribute value types, dispatched on the
+# exact type; values of the other types go through the isinstance checks
+_SERIALIZERS = {
+    str: _identity,
+    int: _identity,
+    bool: _identity,
+    float: lambda obj: "NaN" if obj != obj else obj,
+    type(None): lambda obj: "NaN",
+    list: lambda obj: [_obj2dict(i) for i in obj],
+    MultiValue: lambda obj: [_obj2dict(i) for i in obj],
+}
+
+
+def _serialize_column(values):
+    """
+    Serialize the values of an attribute of many samples at once
+
+    :param list values: attribute values
+    :return list: serialized values
+    """
+    types = set(map(type, values))
+    if len(types) == 1:
+        typ = types.pop()
+        if _SERIALIZERS.get(typ) is _identity:
+            return values
+        if issubclass(typ, np.generic):
+            return np.array(values, dtype=typ).tolist()
+    return [_obj2dict(v) for v in values]
+
+
+def has_mutable_values(sample):
+    """
+    Check whether the sample has attribute values that can be changed in place,
+    without the sample noticing
+
+    :param peppy.Sample sample: sample to check
+    :return bool: whether any attribute value is a list, a set or a mapping
+    """
+    return any(
+        isinstance(v, (list, set, Mapping))
+        for k, v in sample.raw_items()
+        if not k.startswith("_")
+    )
+
+
+def samples_to_dicts(samples):
+    """
+    Serialize many samples as dict objects. The attribute values are
+    serialized column-wise, a column at a time.
+
+    :param Iterable[peppy.Sample] samples: samples to serialize
+    :return list[dict]: dict representations identical
+        to the ones produced by :meth:`Sample.to_dict`
+    """
+    keys, columns = [], {}
+    for sample in samples:
+        sample_keys = []
+        for k, v in sample.raw_items():
+            if k.startswith("_"):
+                continue
+            sample_keys.append(k)
+            try:
+                columns[k].append(v)
+            except KeyError:
+                columns[k] = [v]
+        keys.append(sample_keys)
+    values = {k: iter(_serialize_column(v)) for k, v in columns.items()}
+    return [{k: next(values[k]) for k in sample_keys} for sample_keys in keys]
+
+
+def _expanded(value, to_dict=False):
+    """
+    Expand the value the way a PathExAttMap does on item access,
+    with the path expansions memoized
+
+    :param object value: value to expand
+    :param bool to_dict: whether to convert the mappings to dicts
+    :return object: expanded value
+    """
+    if isinstance(value, str):
+        return expand_path(value)
+    if to_dict and isinstance(value, Mapping):
+        return {k: _expanded(v, to_dict) for k, v in value.items()}
+    return value
+
+
+def derive_value(data_sources, source_key, items, attr_name, sample_name):
+    """
+    Populate the data source template selected by the source key.
+
+    :param Mapping data_sources: mapping from key name (as a value in
+        a cell of a tabular data structure) to, e.g., filepath
+    :param str source_key: value of the derived attribute, which selects
+        the data source template
+    :param Mapping items: sample attributes to format the template with
+    :param str attr_name: name of the derived attribute
+    :param str sample_name: name of the sample, used in messages
+    :return str | Iterable[str] | None: populated and globbed data source,
+        an empty string if no template is defined for the source key or None
+        if the template could not be populated
+    """
+    try:
+        regex = data_sources[source_key]
+        _LOGGER.debug("Data sources: {}".format(data_sources))
+    except KeyError:
+        _LOGGER.debug(
+            "{}: config lacks entry for {} key: "
+            "'{}' in column '{}'; known: {}".format(
+                sample_name,
+                DERIVED_SOURCES_KEY,
+                source_key,
+                attr_name,
+                data_sources.keys(),
+            )
+        )
+        return ""
+    deriv_exc_base = (
+        "In sample '{sn}' cannot correctly parse derived "
+        "attribute source: {r}.".format(sn=sample_name, r=regex)
+    )
+    try:
+        vals = _format_regex(regex, items)
+        _LOGGER.debug("Formatted regex: {}".format(vals))
+    except KeyError as ke:
+        _LOGGER.warning(
+            deriv_exc_base + " Can't access {ke} attribute".format(ke=str(ke))
+        )
+    except Exception as e:
+        _LOGGER.warning(
+            deriv_exc_base
+            + " Caught exception: {e}".format(e=getattr(e, "message", repr(e)))
+        )
+    else:
+        return _glob_regex(vals)
+    return None
+
+
+def _format_regex(regex, items):
+    """
+    Format derived source with object attributes
+
+    :param str regex: string to format,
+        e.g. {identifier}{file_id}_data.txt
+    :param Iterable[Iterable[Iterable | str]] items: items to format
+        the string with
+    :raise InvalidSampleTableFileException: if after merging
+        subannotations the lengths of multi-value attrs are not even
+    :return Iterable | str: formatted regex string(s)
+    """
+    keys = [i[1] for i in Formatter().parse(regex) if i[1] is not None]
+    if not keys:
+        return [regex]
+    if "$" in regex:
+        _LOGGER.warning(
+            "Not all environment variables were populated "
+            "in derived attribute source: {}".format(regex)
+        )
+    attr_lens = [len(v) for k, v in items.items() if (is_multi_value(v) and k in keys)]
+    if not bool(attr_lens):
+        return [_safe_format(regex, items)]
+    if len(set(attr_lens)) != 1:
+        msg = (
+            "All attributes to format the {} ({}) have to be the "
+            "same length, got: {}. Correct your {}".format(
+                DERIVED_SOURCES_KEY, regex, attr_lens, SUBSAMPLE_SHEET_KEY
+            )
+        )
+        raise InvalidSampleTableFileException(msg)
+    vals = []
+    for i in range(0, attr_lens[0]):
+        items_cpy = cp(items)
+        for k in keys:
+            if is_multi_value(items_cpy[k]):
+                items_cpy[k] = items_cpy[k][i]
+        vals.append(_safe_format(regex, items_cpy))
+    return vals
+
+
+def _safe_format(s, values):
+    """
+    Safely format string.
+
+    If the values are missing the key is wrapped in curly braces.
+    This is intended to preserve the environment variables specified
+    using curly braces notation, for example: "${ENVVAR}/{sample_attr}"
+    would result in "${ENVVAR}/populated" rather than a KeyError.
+
+    :param str s: string with curly braces placeholders to populate
+    :param Mapping values: key-value pairs to pupulate string with
+    :return str: populated string
+    """
+    return Formatter().vformat(s, (), SafeDict(values))
+
+
+def _glob_regex(patterns):
+    """
+    Perform unix style pathname pattern expansion for multiple patterns
+
+    :param Iterable[str] patterns: patterns to expand
+    :return str | Iterable[str]: expanded patterns
+    """
+    outputs = []
+    for p in patterns:
+        if "*" in p or "[" in p:
+            _LOGGER.debug("Pre-glob: {}".format(p))
+            val_globbed = sorted(glob.glob(p))
+            if not val_globbed:
+                _LOGGER.debug("No files match the glob: '{}'".format(p))
+            else:
+                p = val_globbed
+                _LOGGER.debug("Post-glob: {}".format(p))
+
+        outputs.extend(p if isinstance(p, list) else [p])
+    return outputs if len(outputs) > 1 else outputs[0]
+
+
+def _copied_value(value):
+    """
+    :param object value: attribute value
+    :return object: copy of the value if it is a list or a mapping,
+        the value otherwise
+    """
+    if isinstance(value, list):
+        return [_copied_value(v) for v in value]
+    if isinstance(value, Mapping):
+        return deepcopy(value)
+    return value
+
+
+def _restored_sample(cls, items):
+    """
+    Recreate a pickled sample from its stored attributes,
+    without running the constructor
+
+    :param type cls: class of the sample
+    :param list[(str, object)] items: stored attribute names and values
+    :return peppy.Sample: sample
+    """
+    sample = cls.__new__(cls)
+    OrderedDict.__init__(sample)
+    for k, v in items:
+        OrderedDict.__setitem__(sample, k, v)
+    return sample
@@ -0,0 +1,65 @@
+"""
+Samples shared by a project and its copies until either of them edits them.
+"""
+
+import weakref
+from logging import getLogger
+
+from .const import PKG_NAME
+
+_LOGGER = getLogger(PKG_NAME)
+
+
+class SharedSamples(object):
+    """
+    Samples of a project, shared with the copies of the project.
+
+    The project keeps its Sample objects, the copies create their own
+    on first access, bound to them. The copies of the samples share
+    the attribute values with the original ones, except for the lists and
+    mappings, including the ones of the shared attributes. Before the project edits any of the samples it makes the
+    pending copies create theirs, so that the copies are not affected.
+
+    :param list[peppy.Sample] samples: samples of the project
+    :param peppy.Project owner: project the samples belong to
+    """
+
+    def __init__(self, samples, owner):
+        self.samples = samples
+        self._owner = weakref.ref(owner)
+        self._pending = {}
+
+    def __len__(self):
+        return len(self.samples)
+
+    def share(self, prj):
+        """
+        Share the samples with a copy of the project
+
+        :param peppy.Project prj: project copy
+        """
+        self._pending[id(prj)] = weakref.ref(prj)
+
+    def unpack(self, prj=None):
+        """
+        Get the samples of the project, or create the samples of a copy
+
+        :param peppy.Project prj: project to get the samples for
+        :return list[peppy.Sample]: samples
+        """
+        self._pending.pop(id(prj), None)
+        if prj is not None and prj is self._owner():
+            return list(self.samples)
+        _LOGGER.debug("Copying {} shared samples".format(len(self.samples)))
+        shared = {}
+        return [s.copy(prj=prj, shared=shared) for s in self.samples]
+
+    def detach(self):
+        """
+        Make the pending project copies create their samples
+        """
+        for ref in list(self._pending.values()):
+            prj = ref()
+            if prj is not None:
+                prj._unpack_samples()
+        self._pending = {}
@@ -2,28 +2,61 @@
 
 import logging
 import os
+import re
 from urllib.error import HTTPError
 from urllib.request import urlopen
+from uuid import uuid4
 
 import yaml
 from ubiquerg import expandpath, is_url
 
 from .const import CONFIG_KEY
 
+try:
+    from yaml import CSafeDumper as _YamlDumper
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    # libyaml bindings not available
+    from yaml import SafeDumper as _YamlDumper
+    from yaml import SafeLoader as _YamlLoader
+
 _LOGGER = logging.getLogger(__name__)
 
+_EXPANDED_PATHS = {}
+_MAX_EXPANDED_PATHS = 100000
+_ENV_VAR_REGEX = re.compile(r"\$(\w+|\{[^}]*\})", re.ASCII)
 
-def copy(obj):
-    def copy(self):
-        """
-        Copy self to a new object.
-        """
-        from copy import deepcopy
 
-        return deepcopy(self)
+def expand_path(path):
+    """
+    Expand the user and environment variables in a path, memoizing
+    the expansion; equivalent to :func:`ubiquerg.expandpath`.
+
+    A memoized expansion is reused as long as the environment variables
+    it depends on keep the values they had when the path was expanded.
 
-    obj.copy = copy
-    return obj
+    :param str path: path to expand
+    :return str: expanded path
+    """
+    if "$" not in path and not path.startswith("~"):
+        return path
+    env = os.environ
+    try:
+        expanded, snapshot = _EXPANDED_PATHS[path]
+    except KeyError:
+        pass
+    else:
+        if all([env.get(k) == v for k, v in snapshot]):
+            return expanded
+    names = [n.strip("{}") for n in _ENV_VAR_REGEX.findall(path)]
+    if path.startswith("~"):
+        names.append("HOME")
+    snapshot = tuple([(n, env.get(n)) for n in names])
+    expanded = expandpath(path)
+    if len(_EXPANDED_PATHS) >= _MAX_EXPANDED_PATHS:
+        _EXPANDED_PATHS.clear()
+    _EXPANDED_PATHS[path] = (expanded, snapshot)
+    return expanded
 
 
 def make_abs_via_cfg(maybe_relpath, cfg_path, check_exists=False):
@@ -38,7 +71,7 @@ def make_abs_via_cfg(maybe_relpath, cfg_path, check_exists=False):
         _LOGGER.debug("Already absolute")
         return maybe_relpath
     # Maybe we have env vars that make the path absolute?
-    expanded = expandpath(maybe_relpath)
+    expanded = expand_path(maybe_relpath)
     if os.path.isabs(expanded):
         _LOGGER.debug("Expanded: {}".format(expanded))
         return expanded
@@ -76,6 +109,37 @@ def grab_project_data(prj):
     return data
 
 
+def dump_yaml(data):
+    """
+    Serialize the data in YAML format with the fastest available dumper,
+    the same way as :func:`yaml.safe_dump` does
+
+    :param Mapping data: data to serialize
+    :return str: YAML representation of the data
+    """
+    return yaml.dump(data, Dumper=_YamlDumper, default_flow_style=False)
+
+
+def write_atomically(path, text):
+    """
+    Write a text file atomically: the text is written to a temporary file
+    in the same directory, which then replaces the target file
+
+    :param str path: path to the file to write
+    :param str text: text to write
+    """
+    dirname, basename = os.path.split(path)
+    tmp = os.path.join(dirname, ".{}.{}.tmp".format(basename, uuid4().hex))
+    try:
+        with open(tmp, "x") as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
 def make_list(arg, obj_class):
     """
     Convert an object of predefined class to a list of objects of that class or
@@ -116,7 +180,7 @@ def load_yaml(filepath):
         """
         filepath = os.path.abspath(filepath)
         with open(filepath, "r") as f:
-            data = yaml.safe_load(f)
+            data = yaml.load(f, Loader=_YamlLoader)
         return data
 
     if is_url(filepath):
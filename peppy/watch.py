@@ -0,0 +1,293 @@
+"""
+Change detection of the files a project is loaded from, used to refresh
+the projects kept in memory by long-running processes.
+"""
+
+import os
+import threading
+from hashlib import blake2b
+from logging import getLogger
+
+import pandas as pd
+from ubiquerg import is_url
+
+from .const import PKG_NAME, SUBSAMPLE_NAME_ATTR
+
+_LOGGER = getLogger(PKG_NAME)
+
+_BLOCK_SIZE = 1 << 20
+
+
+def _file_hash():
+    return blake2b(digest_size=16)
+
+
+def file_state(path, content_hash=False):
+    """
+    Get the state of a file the changes are detected by
+
+    :param str path: path to the file
+    :param bool content_hash: whether to hash the file content
+    :return (int, int, str | None) | None: modification time, size and
+        content hash of the file, None if the file does not exist
+    """
+    if is_url(path):
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    digest = None
+    if content_hash:
+        h = _file_hash()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(_BLOCK_SIZE), b""):
+                h.update(block)
+        digest = h.hexdigest()
+    return st.st_mtime_ns, st.st_size, digest
+
+
+def same_file_state(state, other):
+    """
+    :param tuple | None state: state of a file, see :func:`file_state`
+    :param tuple | None other: another state of the file
+    :return bool: whether the modification times and sizes are the same
+    """
+    return state is not None and other is not None and state[:2] == other[:2]
+
+
+def file_changed(state, path, content_hash=False):
+    """
+    Check whether a file changed since its state was recorded.
+
+    A file whose modification time or size changed is considered unchanged
+    only if the content hash is requested and was recorded, and matches.
+
+    :param (int, int, str | None) | None state: recorded state of the file,
+        see :func:`file_state`
+    :param str path: path to the file
+    :param bool content_hash: whether to compare the file content hashes
+    :return (bool, tuple | None): whether the file changed, and its
+        current state
+    """
+    current = file_state(path)
+    if current is None or state is None:
+        return current != state, current
+    if current[:2] == state[:2]:
+        return False, state
+    if not content_hash or state[2] is None:
+        return True, current
+    current = file_state(path, content_hash=True)
+    return current[2] != state[2], current
+
+
+class TableMark(object):
+    """
+    Position up to which a sample table file was read, used to read only
+    the rows appended to the file later.
+
+    :param str path: path to the sample table
+    :param int size: number of bytes read
+    :param int nrows: number of rows read
+    :param bytes header: first line of the table
+    :param str digest: hash of the bytes read
+    :param dict[str, str] types: types the columns were converted to,
+        see :func:`peppy.column_types.resolve_column_types`
+    """
+
+    def __init__(self, path, size, nrows, header, digest, types):
+        self.path = path
+        self.size = size
+        self.nrows = nrows
+        self.header = header
+        self.digest = digest
+        self.types = types
+
+    @classmethod
+    def from_bytes(cls, path, data, nrows, types):
+        """
+        :param str path: path to the sample table
+        :param bytes data: content of the table file
+        :param int nrows: number of rows parsed from the content
+        :param dict[str, str] types: types the columns were converted to
+        :return TableMark: mark at the end of the content
+        """
+        h = _file_hash()
+        h.update(data)
+        header = data.split(b"\n", 1)[0] + b"\n"
+        return cls(path, len(data), nrows, header, h.hexdigest(), types)
+
+    def appended(self):
+        """
+        Read the bytes appended to the table file, after verifying that
+        the part read before did not change
+
+        :return (bytes, TableMark) | None: appended bytes and the mark at their
+            end, which lacks the number of rows; None if the table changed
+            otherwise than by appending rows
+        """
+        h = _file_hash()
+        try:
+            with open(self.path, "rb") as f:
+                prefix = f.read(self.size)
+                tail = f.read()
+        except OSError:
+            return None
+        h.update(prefix)
+        if len(prefix) != self.size or h.hexdigest() != self.digest:
+            _LOGGER.debug("Sample table changed before: {}".format(self.path))
+            return None
+        if tail and not prefix.endswith(b"\n") and tail[:1] not in (b"\n", b"\r"):
+            _LOGGER.debug("Last sample table row extended: {}".format(self.path))
+            return None
+        h.update(tail)
+        mark = TableMark(
+            self.path,
+            self.size + len(tail),
+            None,
+            self.header,
+            h.hexdigest(),
+            self.types,
+        )
+        return tail, mark
+
+
+class SourceRows(object):
+    """
+    Hashes of the sample and subsample table rows of every sample, used to find
+    the samples whose rows changed.
+
+    The positions of the subsample table rows are hashed too if the table lacks
+    the subsample names, which are then generated from the row positions.
+
+    :param list[str] columns: names of the columns of each of the tables
+    :param dict[str, tuple] hashes: hashes of the rows of every sample,
+        in all the tables
+    """
+
+    def __init__(self, columns, hashes):
+        self.columns = columns
+        self.hashes = hashes
+
+    @classmethod
+    def from_tables(cls, df, subsample_dfs, colname):
+        """
+        Hash the rows of the tables
+
+        :param pandas.DataFrame df: sample table
+        :param Iterable[pandas.DataFrame] subsample_dfs: subsample tables
+        :param str colname: name of the column with the sample names
+        :return SourceRows | None: row hashes, None if the rows can't be
+            matched with the samples by the names: the names are missing
+            or the sample names are not unique
+        """
+        tables = [df] + list(subsample_dfs or [])
+        if not all([colname in t.columns for t in tables]):
+            return None
+        names = df[colname]
+        if names.isna().any() or not names.is_unique:
+            return None
+        hashes = {
+            n: [h] for n, h in zip(names, pd.util.hash_pandas_object(df, index=False))
+        }
+        for sst in tables[1:]:
+            for n in hashes:
+                hashes[n].append(())
+            rows = pd.util.hash_pandas_object(sst, index=False).reset_index(drop=True)
+            positional = SUBSAMPLE_NAME_ATTR not in sst.columns
+            for n, group in rows.groupby(sst[colname].to_numpy(), sort=False):
+                if n in hashes:
+                    pos = tuple(group.index) if positional else ()
+                    hashes[n][-1] = (tuple(group), pos)
+        columns = [tuple(t.columns) for t in tables]
+        return cls(columns, {n: tuple(h) for n, h in hashes.items()})
+
+    def changed(self, other):
+        """
+        :param SourceRows other: hashes of the earlier version of the tables
+        :return set[str]: names of the samples whose rows changed or were added
+        """
+        prev = other.hashes
+        return {n for n, h in self.hashes.items() if prev.get(n) != h}
+
+
+class ProjectWatcher(object):
+    """
+    Holder of a project that is refreshed when the files it was loaded from
+    change, see :meth:`peppy.Project.refresh_if_changed`.
+
+    The refreshed project replaces the held one at once, so the readers
+    of :attr:`project` get either the previous or the refreshed project.
+
+    :param peppy.Project prj: project to watch
+    :param float interval: seconds between the checks in a background
+        thread; the checks are made only on :meth:`refresh` calls if not given
+    :param bool content_hash: whether to compare the file content hashes
+        when the modification times or sizes change
+    """
+
+    def __init__(self, prj, interval=None, content_hash=False):
+        self._project = prj
+        self.content_hash = content_hash
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        prj._snapshot_sources(content_hash)
+        if interval is not None:
+            self.start(interval)
+
+    @property
+    def project(self):
+        """
+        :return peppy.Project: current version of the project
+        """
+        return self._project
+
+    def refresh(self):
+        """
+        Refresh the project if any of its files changed
+
+        :return bool: whether the project was refreshed
+        """
+        with self._lock:
+            prj = self._project
+            refreshed = prj.refresh_if_changed(content_hash=self.content_hash)
+            if refreshed is prj:
+                return False
+            self._project = refreshed
+        _LOGGER.info("Refreshed project: {}".format(refreshed.name))
+        return True
+
+    def start(self, interval):
+        """
+        Check for the changes periodically in a background thread
+
+        :param float interval: seconds between the checks
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._poll, args=(interval,), name="peppy-watch", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the background checks
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _poll(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                _LOGGER.warning(
+                    "Could not refresh the project: {}".format(
+                        getattr(e, "message", repr(e))
+                    )
+                )
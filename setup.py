@@ -39,6 +39,7 @@ else:
 if sys.version_info >= (3,):
     extra["use_2to3"] = True
 extra["install_requires"] = DEPENDENCIES
+extra["extras_require"] = {"arrow": ["pyarrow"]}
 
 
 # Additional files to include with package
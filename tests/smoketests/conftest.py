@@ -3,6 +3,7 @@
 import os
 
 import pytest
+from yaml import dump
 
 __author__ = "Michal Stolarczyk"
 __email__ = "michal@virginia.edu"
@@ -31,3 +32,27 @@ def example_pep_cfg_noname_path(request):
         "example_noname",
         request.param,
     )
+
+
+@pytest.fixture
+def typed_pep_cfg_path(tmpdir):
+    """ Create a PEP with a sample table with numeric columns """
+    st = tmpdir.join("sample_table.csv")
+    st.write(
+        "sample_name,read_length,lane,paired,run_date,barcode,score\n"
+        "s1,100,1,true,2021-01-05,007,1.5\n"
+        "s2,50,2,FALSE,2021-02-01,010,\n"
+        "s3,150,1,yes,2020-12-31,011,2.25\n"
+        "s4,,3,no,,012,0.5\n"
+    )
+    cfg = tmpdir.join("project_config.yaml")
+    cfg.write(
+        dump(
+            {
+                "pep_version": "2.0.0",
+                "sample_table": "sample_table.csv",
+                "sample_table_types": {"paired": "bool", "run_date": "datetime"},
+            }
+        )
+    )
+    return str(cfg)
@@ -1,15 +1,25 @@
 """ Classes for peppy.Project smoketesting """
 
 import os
+import pickle
+import shutil
 import tempfile
 
 import pytest
+from numpy import nan
 from pandas import DataFrame
 from yaml import dump, safe_load
 
-from peppy import Project
-from peppy.const import SAMPLE_NAME_ATTR
-from peppy.exceptions import InvalidSampleTableFileException, MissingAmendmentError
+from peppy import Project, Sample
+from peppy.column_types import encode_categorical, resolve_column_types
+from peppy.const import SAMPLE_NAME_ATTR, SHARED_ATTRS_KEY
+from peppy.exceptions import (
+    InvalidSampleTableFileException,
+    MissingAmendmentError,
+    SampleTableFileException,
+)
+from peppy.external_merge import merged_rows, sorted_runs
+from peppy.multi_value import MultiValue
 
 __author__ = "Michal Stolarczyk"
 __email__ = "michal@virginia.edu"
@@ -289,6 +299,492 @@ class ProjectManipulationTests:
         p.samples[0].update({"witam": "i_o_zdrowie_pytam"})
         assert not p.sample_table.equals(s_ori)
 
+    @pytest.mark.parametrize("example_pep_cfg_path", ["basic"], indirect=True)
+    def test_batch_edit_defers_invalidation(self, example_pep_cfg_path):
+        """
+        Verify that Sample modifications within batch edit context invalidate
+        the sample_table once the context is exited
+        """
+        p = Project(cfg=example_pep_cfg_path)
+        s_ori = p.sample_table
+        with p.batch_edit():
+            for s in p.samples:
+                s.witam = "i_o_zdrowie_pytam"
+            assert not p["_samples_touched"]
+            with p.batch_edit():
+                p.samples[0].witam = "czesc"
+            assert not p["_samples_touched"]
+        assert p["_samples_touched"]
+        assert not p.sample_table.equals(s_ori)
+        assert list(p.sample_table["witam"]) == ["czesc", "i_o_zdrowie_pytam"]
+
+    @pytest.mark.parametrize(
+        "example_pep_cfg_path", ["basic", "imply", "subtable2"], indirect=True
+    )
+    def test_sample_table_patching(self, example_pep_cfg_path, monkeypatch):
+        """
+        Verify that the sample_table is patched rather than regenerated after
+        Sample edits and that the result is identical to a regenerated table
+        """
+        p = Project(cfg=example_pep_cfg_path)
+        p.sample_table
+        p.samples[1].witam = "i_o_zdrowie_pytam"
+        p.samples[0].sample_name = "renamed"
+        del p.samples[0]["protocol"]
+        p.add_samples(Sample({"sample_name": "new", "added": "1"}, prj=p))
+
+        def _assert_patched():
+            with monkeypatch.context() as m:
+                m.setattr(Project, "_get_table_from_samples", None)
+                patched = p.sample_table
+            full = p._get_table_from_samples(index=p.st_index)
+            assert patched.equals(full)
+            assert list(patched.columns) == list(full.columns)
+            assert list(patched.dtypes) == list(full.dtypes)
+            assert list(patched.index) == list(full.index)
+            return full
+
+        full = _assert_patched()
+        p.samples[1][full.columns[-2]] = ["a", "b"]
+        p.samples[2].added = 2
+        del p.samples[0][full.columns[1]]
+        _assert_patched()
+
+    @pytest.mark.parametrize("example_pep_cfg_path", ["basic"], indirect=True)
+    def test_batch_edit_table_access(self, example_pep_cfg_path):
+        """
+        Verify that sample_table accessed within batch edit context
+        includes the modifications
+        """
+        p = Project(cfg=example_pep_cfg_path)
+        with p.batch_edit():
+            p.samples[0].witam = "i_o_zdrowie_pytam"
+            assert "witam" in p.sample_table.columns
+
+    @pytest.mark.parametrize("example_pep_cfg_path", ["basic"], indirect=True)
+    @pytest.mark.parametrize("defer", [True, False])
+    def test_sample_table_lazy(self, example_pep_cfg_path, defer):
+        """
+        Verify that sample_table is built on first access only
+        and reflects the sample edits made before
+        """
+        p = Project(cfg=example_pep_cfg_path, defer_samples_creation=defer)
+        assert p["_sample_table"] is None
+        if defer:
+            p.create_samples()
+        p.samples[0].witam = "i_o_zdrowie_pytam"
+        assert p["_sample_table"] is None
+        assert "witam" in p.sample_table.columns
+        assert len(p.sample_table) == len(p.samples)
+        assert p.sample_table is p.sample_table
+
+    @pytest.mark.parametrize("example_pep_cfg_path", ["subtable1"], indirect=True)
+    @pytest.mark.parametrize("keep", [True, False])
+    def test_raw_tables_release(self, example_pep_cfg_path, keep):
+        """
+        Verify that the raw tables are released after the samples creation,
+        unless requested otherwise, and the tables are still available
+        """
+        p = Project(cfg=example_pep_cfg_path, keep_raw_tables=keep)
+        assert (p["_sample_df"] is not None) == keep
+        assert (p["_subsample_df"] is not None) == keep
+        assert isinstance(p.subsample_table, DataFrame)
+        assert len(p.sample_table) == len(p.samples)
+        assert str(p).startswith("Project")
+        p.create_samples()
+        assert len(p.samples) == len(p.sample_table)
+        assert (p["_sample_df"] is not None) == keep
+
+    @pytest.mark.parametrize("add_prj_ref", [False, True])
+    @pytest.mark.parametrize("example_pep_cfg_path", ["subtable1"], indirect=True)
+    def test_write_sample_yamls(self, example_pep_cfg_path, add_prj_ref, tmpdir):
+        """
+        Verify that the sample YAML files written in bulk have the same
+        contents as the ones written by Sample.to_yaml
+        """
+        p = Project(cfg=example_pep_cfg_path)
+        outdir = os.path.join(str(tmpdir), "samples")
+        paths = p.write_sample_yamls(
+            outdir,
+            name_template="{protocol}/{sample_name}.yaml",
+            workers=2,
+            add_prj_ref=add_prj_ref,
+        )
+        assert len(paths) == len(p.samples)
+        for s, path in zip(p.samples, paths):
+            assert path == os.path.join(outdir, s.protocol, s.sample_name + ".yaml")
+            ref = os.path.join(str(tmpdir), "ref.yaml")
+            s.to_yaml(ref, add_prj_ref=add_prj_ref)
+            with open(path) as f, open(ref) as f_ref:
+                assert f.read() == f_ref.read()
+        assert sorted(os.listdir(os.path.dirname(paths[0]))) == sorted(
+            os.path.basename(path) for path in paths
+        )
+
+    @pytest.mark.parametrize("example_pep_cfg_path", ["subtable1"], indirect=True)
+    def test_from_sample_yamls(self, example_pep_cfg_path, tmpdir):
+        """
+        Verify that a project is recreated from the sample YAML files
+        """
+        p = Project(cfg=example_pep_cfg_path)
+        p.write_sample_yamls(str(tmpdir), workers=2, add_prj_ref=True)
+        for path in [str(tmpdir), os.path.join(str(tmpdir), "*.yaml")]:
+            pr = Project.from_sample_yamls(path, workers=2)
+            assert pr.to_dicts() == p.to_dicts()
+            assert all([s["_project"] is pr for s in pr.samples])
+            assert list(pr.sample_table.index) == list(p.sample_table.index)
+        with open(os.path.join(str(tmpdir), "invalid.yaml"), "w") as f:
+            f.write("- not a sample\n")
+        with pytest.raises(InvalidSampleTableFileException):
+            Project.from_sample_yamls(str(tmpdir))
+
+    @pytest.mark.parametrize("protocol", [2, 5])
+    @pytest.mark.parametrize(
+        "example_pep_cfg_path", ["subtable1", "imply", "subtables"], indirect=True
+    )
+    def test_pickle(self, example_pep_cfg_path, protocol):
+        """
+        Verify that a pickled project has the same samples, unpacked
+        on first access and bound to the unpickled project
+        """
+        p = Project(cfg=example_pep_cfg_path)
+        buffers = []
+        callback = buffers.append if protocol == 5 else None
+        data = pickle.dumps(p, protocol=protocol, buffer_callback=callback)
+        assert bool(buffers) == (protocol == 5)
+        pr = pickle.loads(data, buffers=buffers)
+        assert pr["_deferred_samples"] is not None
+        assert list(pr.keys()) == list(p.keys())
+        assert pr.to_dicts() == p.to_dicts()
+        assert pr["_deferred_samples"] is None
+        assert all([s["_project"] is pr for s in pr.samples])
+        assert pr.sample_table.equals(p.sample_table)
+        assert str(pickle.loads(pickle.dumps(pr))) == str(p)
+        s = pickle.loads(pickle.dumps(p.samples[0]))
+        assert s.to_dict() == p.samples[0].to_dict()
+
+    @pytest.mark.parametrize(
+        "example_pep_cfg_path", ["subtable1", "imply", "append"], indirect=True
+    )
+    def test_copy(self, example_pep_cfg_path):
+        """
+        Verify that a project copy shares the samples until either
+        of the projects edits them
+        """
+        p = Project(cfg=example_pep_cfg_path)
+        table = p.sample_table
+        pc = p.copy()
+        assert pc["_deferred_samples"] is p["_deferred_samples"]
+        assert pc.sample_table is table
+        assert pc.to_dicts() == p.to_dicts()
+        assert all([s["_project"] is pc for s in pc.samples])
+        assert all([a is not b for a, b in zip(p.samples, pc.samples)])
+        pc.samples[0].new_attr = "copy"
+        assert "new_attr" not in p.samples[0]
+        assert "new_attr" in pc.sample_table.columns
+        assert "new_attr" not in p.sample_table.columns
+        pc2 = p.copy()
+        p.samples[0].new_attr = "original"
+        assert "new_attr" not in pc2.samples[0]
+        assert pc2.samples[0]["_project"] is pc2
+        pc.config.name = "copy"
+        assert p.config.get("name") != "copy"
+
+    @pytest.mark.parametrize("example_pep_cfg_path", ["append"], indirect=True)
+    @pytest.mark.parametrize("vectorized", [False, True])
+    def test_copy_shared_constants(self, example_pep_cfg_path, vectorized, tmpdir):
+        """
+        Verify that the list and mapping values of the appended attributes
+        are not shared with the project copies
+        """
+        with open(example_pep_cfg_path) as f:
+            cfg = safe_load(f)
+        cfg["sample_table"] = os.path.join(
+            os.path.dirname(example_pep_cfg_path), cfg["sample_table"]
+        )
+        cfg["sample_modifiers"]["append"] = {"genome": {"name": "hg38"}, "tags": ["a"]}
+        cfg_path = str(tmpdir.join("project_config.yaml"))
+        with open(cfg_path, "w") as f:
+            dump(cfg, f)
+        p = Project(cfg=cfg_path, vectorized_modifiers=vectorized)
+        pc = p.copy()
+        pc.samples[0].genome["name"] = "mm10"
+        pc.samples[0].tags.append("b")
+        assert p.samples[0].genome["name"] == "hg38"
+        assert p.samples[0].tags == ["a"]
+
+    @pytest.mark.parametrize(
+        "example_pep_cfg_path", ["subtable1", "imply", "append"], indirect=True
+    )
+    def test_fingerprint(self, example_pep_cfg_path):
+        """
+        Verify that the fingerprints are equal for identical projects and
+        samples, and change when the samples are edited
+        """
+        p1 = Project(cfg=example_pep_cfg_path)
+        p2 = Project(cfg=example_pep_cfg_path)
+        assert p1.fingerprint == p2.fingerprint
+        assert p1 == p2
+        assert [s.fingerprint for s in p1.samples] == [
+            s.fingerprint for s in p2.samples
+        ]
+        assert p1.samples[0] == p2.samples[0]
+        p2.samples[0].new_attr = "val"
+        assert p1.samples[0] != p2.samples[0]
+        assert p1.fingerprint != p2.fingerprint
+        assert p1 != p2
+        del p2.samples[0]["new_attr"]
+        assert p1 == p2
+        p1.samples[1].protocol_list = ["a"]
+        p2.samples[1].protocol_list = ["a"]
+        assert p1.samples[1].fingerprint == p2.samples[1].fingerprint
+        p2.samples[1].protocol_list.append("b")
+        assert p1.samples[1] != p2.samples[1]
+        assert p1 != p2
+
+    @pytest.mark.parametrize("example_pep_cfg_path", ["basic"], indirect=True)
+    def test_equality_of_attribute_types(self, example_pep_cfg_path):
+        """
+        Verify that the samples with the attributes equal with different types
+        are equal, and the ones with None and NaN attributes are not
+        """
+        p1 = Project(cfg=example_pep_cfg_path)
+        p2 = Project(cfg=example_pep_cfg_path)
+        p1.samples[0].num = 1
+        p2.samples[0].num = 1.0
+        assert p1.samples[0].fingerprint == p2.samples[0].fingerprint
+        assert p1.samples[0] == p2.samples[0]
+        assert p1 == p2
+        p1.samples[0].num = None
+        p2.samples[0].num = float("nan")
+        assert p1.samples[0] != p2.samples[0]
+        assert p1 != p2
+        p1.samples[0].num = float("nan")
+        assert p1.samples[0] != p2.samples[0]
+        p1.samples[0].num = "NaN"
+        assert p1.samples[0] != p2.samples[0]
+        p1.samples[0].num = {"a", "b"}
+        p2.samples[0].num = ["a", "b"]
+        assert p1.samples[0] != p2.samples[0]
+
+    @pytest.mark.parametrize("example_pep_cfg_path", ["subtable1"], indirect=True)
+    def test_diff(self, example_pep_cfg_path):
+        """
+        Verify that diff finds the added, removed and changed samples
+        and the changed attributes
+        """
+        p1 = Project(cfg=example_pep_cfg_path)
+        p2 = Project(cfg=example_pep_cfg_path)
+        assert not p1.diff(p2)
+        removed = p2.samples[0]
+        p2._samples.remove(removed)
+        p2.add_samples(Sample({SAMPLE_NAME_ATTR: "new_sample"}))
+        edited = p2.samples[0]
+        edited.new_attr = "val"
+        edited.protocol = "edited"
+        old_protocol = p1.get_sample(edited.sample_name).protocol
+        d = p1.diff(p2)
+        assert d.added == ["new_sample"]
+        assert d.removed == [removed.sample_name]
+        assert [c.name for c in d.changed] == [edited.sample_name]
+        assert d.changed[0].added == {"new_attr": "val"}
+        assert d.changed[0].removed == {}
+        assert d.changed[0].changed == {"protocol": (old_protocol, "edited")}
+        assert not d.config_changed
+
+    @pytest.mark.parametrize("example_pep_cfg_path", ["subtable1"], indirect=True)
+    @pytest.mark.parametrize("vectorized", [False, True])
+    def test_refresh_if_changed(self, example_pep_cfg_path, vectorized, tmpdir):
+        """
+        Verify that a watched project is refreshed when its tables change,
+        recreating only the samples whose rows changed
+        """
+        pep_dir = os.path.join(str(tmpdir), "pep")
+        shutil.copytree(os.path.dirname(example_pep_cfg_path), pep_dir)
+        cfg = os.path.join(pep_dir, "project_config.yaml")
+        watcher = Project(cfg=cfg, vectorized_modifiers=vectorized).watch()
+        p = watcher.project
+        assert not watcher.refresh()
+        fingerprint = p.fingerprint
+        with open(os.path.join(pep_dir, "subsample_table.csv"), "a") as f:
+            f.write("\nfrog_2,sub_c,data/frog2c_data.txt\n")
+        assert watcher.refresh()
+        pr = watcher.project
+        assert pr is not p
+        assert pr.fingerprint != fingerprint
+        assert not pr.diff(Project(cfg=cfg))
+        changed = p.diff(pr).changed
+        assert [c.name for c in changed] == ["frog_2"]
+        assert all([s["_project"] is pr for s in pr.samples])
+        assert len(p.samples[1].file) + 1 == len(pr.samples[1].file)
+        with open(os.path.join(pep_dir, "sample_table.csv"), "a") as f:
+            f.write("frog_4,anySampleType,multi\n")
+        assert watcher.refresh()
+        assert pr.diff(watcher.project).added == ["frog_4"]
+        with open(cfg, "a") as f:
+            f.write("description: refreshed\n")
+        assert watcher.refresh()
+        assert watcher.project.description == "refreshed"
+        assert not watcher.refresh()
+
+    @pytest.mark.parametrize(
+        "example_pep_cfg_path", ["subtable1", "append", "imply"], indirect=True
+    )
+    def test_refresh_appended_rows(self, example_pep_cfg_path, tmpdir):
+        """
+        Verify that the rows appended to the sample table are added as samples,
+        and that the samples are recreated if the earlier rows change
+        """
+        pep_dir = os.path.join(str(tmpdir), "pep")
+        shutil.copytree(os.path.dirname(example_pep_cfg_path), pep_dir)
+        cfg = os.path.join(pep_dir, "project_config.yaml")
+        st = os.path.join(pep_dir, "sample_table.csv")
+        p = Project(cfg=cfg)
+        assert p.refresh_appended_rows() == []
+        nrows = len(p.sample_table)
+        with open(st) as f:
+            rows = f.read().splitlines()
+        with open(st, "a") as f:
+            f.write("\n".join(["new_" + r for r in rows[1:]]) + "\n")
+        added = p.refresh_appended_rows()
+        names = ["new_" + r.split(",")[0] for r in rows[1:]]
+        assert [s.sample_name for s in added] == names
+        assert len(p.sample_table) == nrows + len(added)
+        assert p.to_dicts() == Project(cfg=cfg).to_dicts()
+        assert p.select(sample_name=added[0].sample_name) == [added[0]]
+        with open(st, "w") as f:
+            f.write("\n".join(rows[:2]) + "\n")
+        assert len(p.refresh_appended_rows()) == 1
+        assert p.to_dicts() == Project(cfg=cfg).to_dicts()
+
+    @pytest.mark.parametrize(
+        "example_pep_cfg_path", ["subtable1", "subtables", "derive"], indirect=True
+    )
+    def test_load_sample(self, example_pep_cfg_path, tmpdir):
+        """
+        Verify that a sample loaded with the row indexes is identical to the one
+        loaded with the whole project, and that stale indexes are rewritten
+        """
+        pep_dir = os.path.join(str(tmpdir), "pep")
+        shutil.copytree(os.path.dirname(example_pep_cfg_path), pep_dir)
+        cfg = os.path.join(pep_dir, "project_config.yaml")
+        p = Project(cfg=cfg)
+        paths = p.write_row_indexes()
+        assert paths and all([os.path.exists(pth) for pth in paths])
+        for s in p.samples:
+            loaded = Project.load_sample(cfg, s.sample_name)
+            assert loaded.to_dict() == s.to_dict()
+            assert loaded["_project"].samples == [loaded]
+        with pytest.raises(ValueError):
+            Project.load_sample(cfg, "nonexistent")
+        st = p.config["sample_table"]
+        idx_path = st + ".rowidx.json"
+        os.utime(st, ns=(0, 0))
+        os.remove(idx_path)
+        s = p.samples[0]
+        assert Project.load_sample(cfg, s.sample_name).to_dict() == s.to_dict()
+        assert os.path.exists(idx_path)
+
+    @pytest.mark.parametrize("example_pep_cfg_path", ["imply"], indirect=True)
+    def test_select(self, example_pep_cfg_path):
+        """
+        Verify that select returns the samples matching all the attributes
+        """
+        p = Project(cfg=example_pep_cfg_path)
+        organisms = ["human", "mouse"]
+        assert p.select(organism=organisms) == [
+            s for s in p.samples if s["organism"] in organisms
+        ]
+        assert p.select(organism="human", genome="hg38") == [
+            s for s in p.samples if s["organism"] == "human" and s["genome"] == "hg38"
+        ]
+        assert p.select(organism="frog", genome="hg38") == []
+        assert p.select(nonexistent="attr") == []
+
+    @pytest.mark.parametrize("example_pep_cfg_path", ["imply"], indirect=True)
+    def test_select_after_edits(self, example_pep_cfg_path):
+        """
+        Verify that select reflects the sample edits and added samples
+        """
+        p = Project(cfg=example_pep_cfg_path)
+        assert p.select(organism="axolotl") == []
+        p.samples[0].organism = "axolotl"
+        assert p.select(organism="axolotl") == [p.samples[0]]
+        with p.batch_edit():
+            p.samples[0].organism = "human"
+            p.samples[1].organism = "axolotl"
+        assert p.select(organism="axolotl") == [p.samples[1]]
+        p.add_samples(Sample({"sample_name": "new", "organism": "axolotl"}))
+        assert p.select(organism="axolotl") == [p.samples[1], p.samples[-1]]
+        p.samples.sort(key=lambda s: s.organism)
+        assert [s.organism for s in p.select(organism="axolotl")] == [
+            "axolotl",
+            "axolotl",
+        ]
+        assert p.select(organism="human") == [
+            s for s in p.samples if s.organism == "human"
+        ]
+
+    @pytest.mark.parametrize("example_pep_cfg_path", ["subtable1"], indirect=True)
+    def test_select_merged_attributes(self, example_pep_cfg_path):
+        """
+        Verify that samples with list attributes match any of the elements
+        """
+        p = Project(cfg=example_pep_cfg_path)
+        file = p.samples[0]["file"][1]
+        assert p.select(file=file) == [p.samples[0]]
+
+    @pytest.mark.parametrize("example_pep_cfg_path", ["subtable1"], indirect=True)
+    @pytest.mark.parametrize("vectorized", [False, True])
+    def test_merged_attributes_views(self, example_pep_cfg_path, vectorized):
+        """
+        Verify that the merged attributes are read-only views that share
+        a column and compare equal to lists
+        """
+        p = Project(cfg=example_pep_cfg_path, vectorized_modifiers=vectorized)
+        s1, s2 = p.samples[0], p.samples[1]
+        assert isinstance(s1["file"], MultiValue)
+        assert s1["file"] == s1.to_dict()["file"] and len(s1["file"]) == 3
+        assert s1["subsample_name"] == ["sub_a", "sub_b", "sub_c"]
+        assert s1["subsample_name"].column is s2["subsample_name"].column
+        assert isinstance(s1.to_dict()["subsample_name"], list)
+        with pytest.raises(AttributeError):
+            s1["subsample_name"].append("sub_d")
+        with pytest.raises(TypeError):
+            s1["subsample_name"][0] = "sub_d"
+
+    @pytest.mark.parametrize("example_pep_cfg_path", ["imply"], indirect=True)
+    def test_group_by(self, example_pep_cfg_path):
+        """
+        Verify that group_by partitions the samples by the attribute values
+        """
+        p = Project(cfg=example_pep_cfg_path)
+        groups = p.group_by("organism")
+        assert list(groups) == list(dict.fromkeys(s["organism"] for s in p.samples))
+        for organism, samples in groups.items():
+            assert samples == p.select(organism=organism)
+        pairs = p.group_by("organism", "genome")
+        for (organism, genome), samples in pairs.items():
+            assert samples == p.select(organism=organism, genome=genome)
+        assert sum([len(v) for v in pairs.values()]) == len(
+            [s for s in p.samples if "genome" in s]
+        )
+
+    @pytest.mark.parametrize("keep", [False, True])
+    @pytest.mark.parametrize("example_pep_cfg_path", ["subtable1"], indirect=True)
+    def test_subsamples_of(self, example_pep_cfg_path, keep):
+        """
+        Verify that the subsample rows of a sample are looked up
+        in the cached, indexed subsample table
+        """
+        p = Project(cfg=example_pep_cfg_path, keep_raw_tables=keep)
+        sst = p.subsample_table
+        assert p.subsample_table is sst
+        rows = p.subsamples_of("frog_1")
+        assert list(rows["subsample_name"]) == ["sub_a", "sub_b", "sub_c"]
+        assert rows.equals(sst[sst["sample_name"] == "frog_1"])
+        assert len(p.subsamples_of("frog_3")) == 0
+
     @pytest.mark.parametrize("example_pep_cfg_path", ["subtable1"], indirect=True)
     def test_subsample_table_property(self, example_pep_cfg_path):
         """
@@ -321,6 +817,38 @@ class SampleModifiersTests:
         p = Project(cfg=example_pep_cfg_path)
         assert all([s["read_type"] == "SINGLE" for s in p.samples])
 
+    @pytest.mark.parametrize("example_pep_cfg_path", ["append"], indirect=True)
+    def test_append_shared(self, example_pep_cfg_path):
+        """
+        Verify that the appended attribute is stored once and shows up
+        as a regular attribute of the samples
+        """
+        p = Project(cfg=example_pep_cfg_path)
+        shared = p.samples[0][SHARED_ATTRS_KEY]
+        for s in p.samples:
+            assert s[SHARED_ATTRS_KEY] is shared
+            assert not dict.__contains__(s, "read_type")
+            assert "read_type" in s and s.read_type == "SINGLE"
+            assert s.to_dict()["read_type"] == "SINGLE"
+            assert len(s) == len(list(s.keys()))
+        assert list(p.sample_table["read_type"]) == ["SINGLE"] * len(p.samples)
+
+    @pytest.mark.parametrize("example_pep_cfg_path", ["append"], indirect=True)
+    def test_append_edits(self, example_pep_cfg_path):
+        """
+        Verify that the samples can override and remove the appended attribute
+        """
+        p = Project(cfg=example_pep_cfg_path)
+        s0, s1 = p.samples[0], p.samples[1]
+        keys = s0.keys()
+        s0.read_type = "PAIRED"
+        assert s0.read_type == "PAIRED" and s1.read_type == "SINGLE"
+        assert s0.keys() == keys
+        del s1["read_type"]
+        assert "read_type" not in s1
+        assert all([s.read_type == "SINGLE" for s in p.samples[2:]])
+        assert list(p.sample_table["read_type"][:2]) == ["PAIRED", nan]
+
     @pytest.mark.parametrize("example_pep_cfg_path", ["imports"], indirect=True)
     def test_imports(self, example_pep_cfg_path):
         """ Verify that the imported attribute is added to the samples """
@@ -348,6 +876,39 @@ class SampleModifiersTests:
         p = Project(cfg=example_pep_cfg_path)
         assert all([s["organism"] == s["animal"] for s in p.samples])
 
+    @pytest.mark.parametrize("example_pep_cfg_path", ["duplicate"], indirect=True)
+    @pytest.mark.parametrize("vectorized", [False, True])
+    def test_duplicate_alias(self, example_pep_cfg_path, vectorized):
+        """
+        Verify that the duplicated attribute is resolved from the original
+        and shows up as a regular attribute of the samples
+        """
+        p = Project(cfg=example_pep_cfg_path, vectorized_modifiers=vectorized)
+        shared = p.samples[0][SHARED_ATTRS_KEY]
+        for s in p.samples:
+            assert s[SHARED_ATTRS_KEY] is shared
+            assert not dict.__contains__(s, "animal")
+            assert list(s.keys())[-1] == "animal"
+            assert s.to_dict()["animal"] == s.organism
+        assert list(p.sample_table["animal"]) == list(p.sample_table["organism"])
+
+    @pytest.mark.parametrize("example_pep_cfg_path", ["duplicate"], indirect=True)
+    def test_duplicate_edits(self, example_pep_cfg_path):
+        """
+        Verify that the duplicated attribute keeps its value
+        when the original is changed
+        """
+        p = Project(cfg=example_pep_cfg_path)
+        s0, s1 = p.samples[0], p.samples[1]
+        keys = s0.keys()
+        s0.organism = "axolotl"
+        assert s0.animal == "pig" and s0.keys() == keys
+        s1.animal = "frog"
+        assert s1.animal == "frog" and s1.organism == "pig"
+        del s1["animal"]
+        assert "animal" not in s1
+        assert list(p.sample_table["animal"][:2]) == ["pig", nan]
+
     @pytest.mark.parametrize("example_pep_cfg_path", ["derive"], indirect=True)
     def test_derive(self, example_pep_cfg_path):
         """
@@ -425,3 +986,296 @@ class PostInitSampleCreationTests:
         """
         p, pd = _get_pair_to_post_init_test(example_pep_cfg_path)
         _cmp_all_samples_attr(p, pd, "file_path")
+
+
+def _sample_items(s):
+    """
+    Get the sample attributes in order, excluding the project reference
+
+    :param peppy.Sample s: sample to get the items for
+    :return list[tuple]: key-value pairs
+    """
+    return [(k, v) for k, v in s.items() if k != "_project"]
+
+
+class VectorizedModifiersTests:
+    @pytest.mark.parametrize("example_pep_cfg_path", EXAMPLE_TYPES, indirect=True)
+    def test_samples_identical(self, example_pep_cfg_path):
+        """
+        Verify that the vectorized sample modifiers produce samples identical
+        to the ones produced by the object-based modifiers
+        """
+        p = Project(cfg=example_pep_cfg_path)
+        pv = Project(cfg=example_pep_cfg_path, vectorized_modifiers=True)
+        assert len(p.samples) == len(pv.samples)
+        for s, sv in zip(p.samples, pv.samples):
+            assert _sample_items(s) == _sample_items(sv)
+        assert p.sample_table.equals(pv.sample_table)
+
+    @pytest.mark.parametrize(
+        "example_pep_cfg_noname_path", ["project_config_noname.yaml"], indirect=True
+    )
+    def test_custom_index(self, example_pep_cfg_noname_path):
+        """
+        Verify that the sample names are set from the custom index
+        """
+        p = Project(cfg=example_pep_cfg_noname_path, sample_table_index="id")
+        pv = Project(
+            cfg=example_pep_cfg_noname_path,
+            sample_table_index="id",
+            vectorized_modifiers=True,
+        )
+        assert [_sample_items(s) for s in p.samples] == [
+            _sample_items(s) for s in pv.samples
+        ]
+
+    @pytest.mark.parametrize(
+        "example_pep_cfg_noname_path", ["project_config_noname.yaml"], indirect=True
+    )
+    def test_missing_sample_name(self, example_pep_cfg_noname_path):
+        """
+        Verify that if sample_name column is missing in the sample table an
+        error is issued
+        """
+        with pytest.raises(InvalidSampleTableFileException):
+            Project(cfg=example_pep_cfg_noname_path, vectorized_modifiers=True)
+
+    @pytest.mark.parametrize("example_pep_cfg_path", ["amendments1"], indirect=True)
+    def test_amendments_activation(self, example_pep_cfg_path):
+        """
+        Verify that the vectorized modifiers are used after amendment activation
+        """
+        p = Project(cfg=example_pep_cfg_path, vectorized_modifiers=True)
+        p.activate_amendments("newLib")
+        assert p._vectorized_modifiers
+        assert all([s["protocol"] == "ABCD" for s in p.samples])
+
+
+class StreamingSamplesTests:
+    @pytest.mark.parametrize("chunksize", [1, 1000])
+    @pytest.mark.parametrize("example_pep_cfg_path", EXAMPLE_TYPES, indirect=True)
+    def test_samples_identical(self, example_pep_cfg_path, chunksize, tmpdir):
+        """
+        Verify that the streamed samples are identical to the ones created
+        in memory, in the order of the sample names
+        """
+        pv = Project(cfg=example_pep_cfg_path, vectorized_modifiers=True)
+        p = Project(cfg=example_pep_cfg_path, defer_samples_creation=True)
+        streamed = p.iter_samples(chunksize=chunksize, tmpdir=str(tmpdir))
+        expected = sorted(pv.samples, key=lambda s: s[SAMPLE_NAME_ATTR])
+        assert [_sample_items(s) for s in streamed] == [
+            _sample_items(s) for s in expected
+        ]
+        assert not p.samples
+        assert os.listdir(str(tmpdir)) == []
+
+    @pytest.mark.parametrize(
+        "example_pep_cfg_noname_path", ["project_config_noname.yaml"], indirect=True
+    )
+    def test_missing_sample_name(self, example_pep_cfg_noname_path):
+        """
+        Verify that the samples can't be streamed without the sample names
+        """
+        p = Project(cfg=example_pep_cfg_noname_path, defer_samples_creation=True)
+        with pytest.raises(InvalidSampleTableFileException):
+            list(p.iter_samples())
+
+    def test_multi_pass_merge(self, tmpdir):
+        """
+        Verify that the runs are merged in multiple passes
+        if there are more runs than can be merged at once
+        """
+        df = DataFrame({"sample_name": ["c", "a", "b", "a", "c", "b", "a"]})
+        chunks = [df.iloc[i : i + 2] for i in range(0, len(df), 2)]
+        columns, runs = sorted_runs(chunks, "sample_name", str(tmpdir), fan_in=2)
+        assert columns == ["sample_name"] and len(runs) == 2
+        assert [r[:2] for r in merged_rows(runs)] == [
+            ("a", 1),
+            ("a", 3),
+            ("a", 6),
+            ("b", 2),
+            ("b", 5),
+            ("c", 0),
+            ("c", 4),
+        ]
+
+
+class ArrowExportTests:
+    @pytest.mark.parametrize("example_pep_cfg_path", EXAMPLE_TYPES, indirect=True)
+    def test_to_arrow(self, example_pep_cfg_path):
+        """
+        Verify that the Arrow table includes all the processed samples
+        and their attributes
+        """
+        pytest.importorskip("pyarrow")
+        p = Project(cfg=example_pep_cfg_path)
+        t = p.to_arrow()
+        assert t.num_rows == len(p.samples)
+        assert set(t.column_names) == set(p.sample_table.columns)
+        assert t.column(SAMPLE_NAME_ATTR).to_pylist() == [
+            s[SAMPLE_NAME_ATTR] for s in p.samples
+        ]
+
+    @pytest.mark.parametrize("example_pep_cfg_path", ["subtable1"], indirect=True)
+    def test_merged_attributes_are_lists(self, example_pep_cfg_path):
+        """
+        Verify that attributes merged from the subsample table
+        are list-typed columns
+        """
+        pa = pytest.importorskip("pyarrow")
+        p = Project(cfg=example_pep_cfg_path)
+        col = p.to_arrow().column("file")
+        assert pa.types.is_list(col.type)
+        assert col.to_pylist()[0] == list(p.samples[0]["file"])
+
+    @pytest.mark.parametrize("example_pep_cfg_path", ["basic"], indirect=True)
+    def test_mixed_types(self, example_pep_cfg_path):
+        """
+        Verify that attributes of mixed types are exported as strings
+        """
+        pytest.importorskip("pyarrow")
+        p = Project(cfg=example_pep_cfg_path)
+        p.samples[0].mixed = 1
+        p.samples[1].mixed = "a"
+        assert p.to_arrow().column("mixed").to_pylist() == ["1", "a"]
+
+    @pytest.mark.parametrize("example_pep_cfg_path", ["subtable2"], indirect=True)
+    def test_write_arrow_ipc(self, example_pep_cfg_path, tmpdir):
+        """
+        Verify that the written Arrow IPC file can be memory-mapped
+        and read back
+        """
+        pa = pytest.importorskip("pyarrow")
+        p = Project(cfg=example_pep_cfg_path)
+        path = os.path.join(str(tmpdir), "samples.arrow")
+        p.write_arrow_ipc(path)
+        with pa.memory_map(path) as source:
+            assert pa.ipc.open_file(source).read_all().equals(p.to_arrow())
+
+
+class TypedColumnsTests:
+    def test_default_strings(self, typed_pep_cfg_path):
+        """
+        Verify that undeclared columns are strings unless inference is requested
+        """
+        p = Project(cfg=typed_pep_cfg_path)
+        assert p.samples[0]["read_length"] == "100"
+        assert p.samples[0]["paired"] is True
+
+    @pytest.mark.parametrize("vectorized", [False, True])
+    def test_inferred_types(self, typed_pep_cfg_path, vectorized):
+        """
+        Verify that numeric columns are converted if inference is requested
+        and columns with leading zeros are kept as strings
+        """
+        p = Project(
+            cfg=typed_pep_cfg_path,
+            infer_column_types=True,
+            vectorized_modifiers=vectorized,
+        )
+        s = p.samples[0]
+        assert (s["read_length"], s["lane"], s["score"]) == (100, 1, 1.5)
+        assert isinstance(s["read_length"], int)
+        assert s["barcode"] == "007"
+        assert s["sample_name"] == "s1"
+        assert "read_length" not in p.samples[3]
+
+    def test_invalid_type(self, typed_pep_cfg_path):
+        """
+        Verify that an error is raised if a column can't be converted
+        """
+        with open(typed_pep_cfg_path) as f:
+            cfg = safe_load(f)
+        cfg["sample_table_types"] = {"barcode": "bool"}
+        with open(typed_pep_cfg_path, "w") as f:
+            dump(cfg, f)
+        with pytest.raises(SampleTableFileException):
+            Project(cfg=typed_pep_cfg_path)
+
+    def test_where(self, typed_pep_cfg_path):
+        """
+        Verify that where returns the samples satisfying the comparison
+        """
+        p = Project(cfg=typed_pep_cfg_path, infer_column_types=True)
+        names = lambda samples: [s["sample_name"] for s in samples]
+        assert names(p.where("read_length", ">=", 100)) == ["s1", "s3"]
+        assert names(p.where("read_length", "<", 100)) == ["s2"]
+        assert names(p.where("lane", "==", 1)) == ["s1", "s3"]
+        assert names(p.where("lane", "!=", 1)) == ["s2", "s4"]
+        p.samples[0].read_length = 10
+        assert names(p.where("read_length", "<", 100)) == ["s1", "s2"]
+        with pytest.raises(ValueError):
+            p.where("lane", "~", 1)
+
+    def test_where_untyped(self, typed_pep_cfg_path):
+        """
+        Verify that comparing string attributes with numbers is an error
+        """
+        p = Project(cfg=typed_pep_cfg_path)
+        with pytest.raises(TypeError):
+            p.where("read_length", ">=", 100)
+
+    def test_order_by(self, typed_pep_cfg_path):
+        """
+        Verify that samples are ordered by the attribute values
+        and the ones that lack the attribute are placed last
+        """
+        p = Project(cfg=typed_pep_cfg_path, infer_column_types=True)
+        names = lambda samples: [s["sample_name"] for s in samples]
+        assert names(p.order_by("score")) == ["s4", "s1", "s3", "s2"]
+        assert names(p.order_by("score", descending=True)) == ["s3", "s1", "s4", "s2"]
+        assert names(p.order_by("lane")) == ["s1", "s3", "s2", "s4"]
+        assert names(p.order_by("run_date")) == ["s3", "s1", "s2", "s4"]
+
+
+class CategoricalColumnsTests:
+    @pytest.mark.parametrize("example_pep_cfg_path", ["imply"], indirect=True)
+    @pytest.mark.parametrize("vectorized", [False, True])
+    def test_encoded_columns(self, example_pep_cfg_path, vectorized):
+        """
+        Verify that the low cardinality columns are encoded and the samples
+        share the attribute values
+        """
+        p = Project(
+            cfg=example_pep_cfg_path,
+            categorical_threshold=3,
+            vectorized_modifiers=vectorized,
+        )
+        assert p.sample_table["organism"].dtype.name == "category"
+        assert p.sample_table["genome"].dtype.name == "category"
+        assert p.sample_table["sample_name"].dtype.name != "category"
+        humans = p.select(organism="human")
+        assert humans[0]["organism"] is humans[1]["organism"]
+        summary = p.memory_summary()
+        assert "organism" in summary["categorical_columns"]
+        assert summary["sample_table"] > 0 and summary["samples"] > 0
+
+    @pytest.mark.parametrize("example_pep_cfg_path", ["imply"], indirect=True)
+    def test_not_encoded_by_default(self, example_pep_cfg_path):
+        """
+        Verify that no columns are encoded if the threshold is not set
+        """
+        p = Project(cfg=example_pep_cfg_path)
+        assert p.memory_summary()["categorical_columns"] == []
+        assert p.sample_table["organism"].dtype.name != "category"
+
+    def test_encode_default_text_dtype(self):
+        """
+        Verify that the text columns are encoded and their types inferred
+        with the default text dtype of the installed pandas
+        """
+        df = DataFrame({"name": ["a", "b", "c"], "lane": ["1", "1", "2"]})
+        assert resolve_column_types(df, infer=True) == {"lane": "int"}
+        encoded = encode_categorical(df, 2, skip=["name"])
+        assert encoded["lane"].dtype.name == "category"
+        assert encoded["name"].dtype.name != "category"
+
+    @pytest.mark.parametrize("example_pep_cfg_path", ["imply"], indirect=True)
+    def test_encoded_column_edits(self, example_pep_cfg_path):
+        """
+        Verify that the sample table reflects edits of the encoded attributes
+        """
+        p = Project(cfg=example_pep_cfg_path, categorical_threshold=3)
+        p.sample_table
+        p.samples[0].organism = "axolotl"
+        assert list(p.sample_table["organism"]) == [s["organism"] for s in p.samples]
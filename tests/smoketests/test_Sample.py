@@ -1,9 +1,12 @@
 import os
 import tempfile
 
+import numpy as np
 import pytest
+from numpy import nan
 
-from peppy import Project
+from peppy import Project, Sample
+from peppy.sample import samples_to_dicts
 
 __author__ = "Michal Stolarczyk"
 __email__ = "michal@virginia.edu"
@@ -66,3 +69,60 @@ class SampleTests:
         p = Project(cfg=example_pep_cfg_path)
         for sample in p.samples:
             assert len(sample.get_sheet_dict()) == len(p.sample_table.columns)
+
+    def test_no_project(self):
+        """
+        Verify that a Sample can be created and edited without a Project
+        """
+        s = Sample({"sample_name": "test"})
+        s.protocol = "RNA-seq"
+        assert s.project is None
+        assert s.to_dict()["protocol"] == "RNA-seq"
+
+    def test_path_expansion(self, monkeypatch):
+        """
+        Verify that the path expansion follows the environment variables
+        """
+        s = Sample({"sample_name": "test", "path": "$PEPPY_TEST_DIR/file.txt"})
+        monkeypatch.setenv("PEPPY_TEST_DIR", "/data")
+        assert s.path == "/data/file.txt"
+        monkeypatch.setenv("PEPPY_TEST_DIR", "/other")
+        assert s["path"] == "/other/file.txt"
+        monkeypatch.delenv("PEPPY_TEST_DIR")
+        assert s.path == "$PEPPY_TEST_DIR/file.txt"
+        s.home = "~/file.txt"
+        assert s.home == os.path.expanduser("~/file.txt")
+
+    def test_raw_items(self, monkeypatch):
+        """
+        Verify that the raw items are the unexpanded attribute values
+        """
+        monkeypatch.setenv("PEPPY_TEST_DIR", "/data")
+        s = Sample({"sample_name": "test", "path": "$PEPPY_TEST_DIR/file.txt"})
+        assert s.raw_items() == s.items(expand=False)
+        assert dict(s.raw_items())["path"] == "$PEPPY_TEST_DIR/file.txt"
+
+    def test_samples_to_dicts(self):
+        """
+        Verify that the bulk serialization is identical to the per sample one
+        """
+        samples = [
+            Sample({"sample_name": "a", "n": np.int64(1), "f": 1.5, "l": ["x", 1]}),
+            Sample({"sample_name": "b", "n": np.int64(2), "f": nan, "m": {"k": 1}}),
+            Sample({"sample_name": "c", "x": None, "_private": 1}),
+        ]
+        assert samples_to_dicts(samples) == [s.to_dict() for s in samples]
+        assert samples_to_dicts(samples)[1] == {
+            "sample_name": "b",
+            "n": 2,
+            "f": "NaN",
+            "m": {"k": 1},
+        }
+
+    @pytest.mark.parametrize("example_pep_cfg_path", EXAMPLE_TYPES, indirect=True)
+    def test_project_to_dicts(self, example_pep_cfg_path):
+        """
+        Verify that the samples of a project are serialized in bulk
+        """
+        p = Project(cfg=example_pep_cfg_path)
+        assert p.to_dicts() == [s.to_dict() for s in p.samples]